@@ -0,0 +1,267 @@
+# almacen.py
+# Movimientos de stock del inventario.
+#
+# - Cada cambio de existencia es un solo UPDATE condicionado
+#   (SET cantidad = cantidad - n WHERE id = :id AND cantidad >= n), así dos
+#   workers no pueden vender la misma pieza: si no alcanza, no se actualiza
+#   ninguna fila y se lanza StockInsuficiente.
+# - Cada entrada y salida queda en `movimientos_inventario` (solo se
+#   insertan), en la misma transacción que el cambio de stock.
+# - Los cortes (`flask almacen corte`, p. ej. diario desde cron) guardan la
+#   existencia y el costo de cada pieza; la existencia a una fecha se calcula
+#   con el último corte anterior más los movimientos posteriores, sin
+#   recorrer todo el historial.
+# - Recibir una orden de compra da entrada a todas sus partidas a la vez: un
+#   UPDATE ... FROM sobre las partidas (existencia y costo promedio
+#   ponderado) y un INSERT ... SELECT de sus movimientos, sin importar
+#   cuántas partidas traiga la entrega.
+from collections import defaultdict
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+from flask_login import current_user
+from sqlalchemy import DateTime, Integer, String, and_, case, func, insert, literal, select, update
+
+from extensions import db
+from models import Inventario, MovimientoInventario, CorteInventario, OrdenCompra, PartidaCompra
+
+
+class StockInsuficiente(Exception):
+    def __init__(self, parte_id, solicitada):
+        super().__init__(f'Stock insuficiente de la pieza {parte_id} (se pidieron {solicitada})')
+        self.parte_id = parte_id
+        self.solicitada = solicitada
+
+
+def _usuario_id():
+    # Fuera de un request (CLI, trabajos) no hay usuario
+    return current_user.id if current_user and current_user.is_authenticated else None
+
+
+def _mover(parte_id, cantidad, tipo, condicion=None, costo_unitario=None, **referencias):
+    consulta = (
+        update(Inventario)
+        .where(Inventario.id == parte_id)
+        .values(cantidad=Inventario.cantidad + cantidad)
+        .returning(Inventario.cantidad, Inventario.costo)
+    )
+    if condicion is not None:
+        consulta = consulta.where(condicion)
+    fila = db.session.execute(consulta).first()
+    if fila is None:
+        return None
+
+    movimiento = MovimientoInventario(
+        parte_id=parte_id,
+        tipo=tipo,
+        cantidad=cantidad,
+        existencia=fila.cantidad,
+        costo_unitario=costo_unitario if costo_unitario is not None else fila.costo,
+        usuario_id=_usuario_id(),
+        **referencias
+    )
+    db.session.add(movimiento)
+    return movimiento
+
+
+def salida(parte_id, cantidad, orden_trabajo_id=None, nota=None):
+    """Descuenta `cantidad` piezas si hay suficientes; si no, StockInsuficiente."""
+    if cantidad is None or cantidad <= 0:
+        raise ValueError('La cantidad debe ser mayor que cero')
+    movimiento = _mover(parte_id, -cantidad, 'salida', condicion=Inventario.cantidad >= cantidad,
+                        orden_trabajo_id=orden_trabajo_id, nota=nota)
+    if movimiento is None:
+        raise StockInsuficiente(parte_id, cantidad)
+    return movimiento
+
+
+def entrada(parte_id, cantidad, costo_unitario=None, orden_compra_id=None, nota=None):
+    """Suma `cantidad` piezas al stock."""
+    if cantidad is None or cantidad <= 0:
+        raise ValueError('La cantidad debe ser mayor que cero')
+    movimiento = _mover(parte_id, cantidad, 'entrada', costo_unitario=costo_unitario,
+                        orden_compra_id=orden_compra_id, nota=nota)
+    if movimiento is None:
+        raise LookupError(f'La pieza {parte_id} no existe')
+    return movimiento
+
+
+def registrar_inicial(pieza, nota='Alta de pieza'):
+    """Movimiento de la existencia con la que se da de alta una pieza (ya con id)."""
+    db.session.add(MovimientoInventario(
+        parte_id=pieza.id,
+        tipo='inicial',
+        cantidad=pieza.cantidad or 0,
+        existencia=pieza.cantidad or 0,
+        costo_unitario=pieza.costo,
+        usuario_id=_usuario_id(),
+        nota=nota,
+    ))
+
+
+def recibir(orden_compra_id, nota=None):
+    """
+    Da entrada a todas las partidas de la orden de compra (en la transacción
+    de la sesión) y la marca 'Recibida'. El costo de cada pieza queda en el
+    promedio ponderado de su existencia y lo recibido. Regresa el número de
+    partidas; ValueError si la orden no existe o ya se recibió.
+    """
+    # Marcarla primero: dos workers no pueden recibir la misma orden
+    marcada = db.session.execute(
+        update(OrdenCompra)
+        .where(OrdenCompra.id == orden_compra_id, OrdenCompra.estado != 'Recibida')
+        .values(estado='Recibida')
+    ).rowcount
+    if not marcada:
+        raise ValueError(f'La orden de compra {orden_compra_id} no existe o ya fue recibida')
+
+    # SET usa los valores anteriores de la fila en SQLite y PostgreSQL
+    nueva = Inventario.cantidad + PartidaCompra.cantidad
+    costo = case(
+        (and_(Inventario.cantidad > 0, nueva > 0),
+         (Inventario.cantidad * Inventario.costo + PartidaCompra.cantidad * PartidaCompra.costo_unitario) / nueva),
+        else_=PartidaCompra.costo_unitario,
+    )
+    partidas = db.session.execute(
+        update(Inventario)
+        .where(Inventario.id == PartidaCompra.parte_id, PartidaCompra.orden_compra_id == orden_compra_id,
+               PartidaCompra.cantidad > 0)
+        .values(cantidad=nueva, costo=costo)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    # Un movimiento por partida con la existencia ya actualizada
+    db.session.execute(insert(MovimientoInventario).from_select(
+        ['parte_id', 'fecha', 'tipo', 'cantidad', 'existencia', 'costo_unitario', 'orden_compra_id',
+         'usuario_id', 'nota'],
+        select(PartidaCompra.parte_id, literal(datetime.utcnow(), DateTime), literal('entrada', String),
+               PartidaCompra.cantidad, Inventario.cantidad, PartidaCompra.costo_unitario,
+               literal(orden_compra_id, Integer), literal(_usuario_id(), Integer), literal(nota, String))
+        .join(Inventario, Inventario.id == PartidaCompra.parte_id)
+        .where(PartidaCompra.orden_compra_id == orden_compra_id, PartidaCompra.cantidad > 0)
+    ))
+    # Las piezas que ya estén en la sesión traían la existencia y el costo anteriores
+    for obj in db.session.identity_map.values():
+        if isinstance(obj, Inventario):
+            db.session.expire(obj, ['cantidad', 'costo'])
+    return partidas
+
+
+# ────────────────────────────────────────────────
+#           Cortes y existencia a una fecha
+# ────────────────────────────────────────────────
+
+def _ultimo_corte(fecha=None):
+    consulta = select(CorteInventario.fecha, CorteInventario.ultimo_movimiento_id)
+    if fecha is not None:
+        consulta = consulta.where(CorteInventario.fecha <= fecha)
+    return db.session.execute(consulta.order_by(CorteInventario.fecha.desc()).limit(1)).first()
+
+
+def existencias(fecha=None, hasta_movimiento=None):
+    """
+    {parte_id: (cantidad, costo)} a `fecha` (o hasta el movimiento indicado).
+    Parte del último corte anterior y suma los movimientos posteriores.
+    """
+    corte = _ultimo_corte(fecha)
+    resultado = {}
+    desde = 0
+    if corte is not None:
+        desde = corte.ultimo_movimiento_id
+        filas = db.session.query(CorteInventario.parte_id, CorteInventario.cantidad, CorteInventario.costo).filter(
+            CorteInventario.fecha == corte.fecha
+        )
+        resultado = {parte_id: (cantidad, costo) for parte_id, cantidad, costo in filas}
+
+    filtros = [MovimientoInventario.id > desde]
+    if fecha is not None:
+        filtros.append(MovimientoInventario.fecha <= fecha)
+    if hasta_movimiento is not None:
+        filtros.append(MovimientoInventario.id <= hasta_movimiento)
+
+    deltas = db.session.query(
+        MovimientoInventario.parte_id, func.sum(MovimientoInventario.cantidad), func.max(MovimientoInventario.id)
+    ).filter(*filtros).group_by(MovimientoInventario.parte_id).all()
+
+    # Costo vigente: el del último movimiento de cada pieza después del corte
+    ultimos = [ultimo_id for _, _, ultimo_id in deltas]
+    costos = dict(
+        db.session.query(MovimientoInventario.parte_id, MovimientoInventario.costo_unitario)
+        .filter(MovimientoInventario.id.in_(ultimos))
+    ) if ultimos else {}
+
+    for parte_id, delta, _ in deltas:
+        cantidad, costo = resultado.get(parte_id, (0, None))
+        nuevo_costo = costos.get(parte_id)
+        resultado[parte_id] = (cantidad + delta, nuevo_costo if nuevo_costo is not None else costo)
+    return resultado
+
+
+def valuacion(fecha=None):
+    """Valor a costo del inventario a `fecha`."""
+    return sum(cantidad * (costo or 0) for cantidad, costo in existencias(fecha).values())
+
+
+def crear_corte():
+    """
+    Guarda un corte con todos los movimientos registrados hasta ahora.
+    Se calcula desde el historial (corte anterior + movimientos), así que es
+    consistente aunque haya movimientos en curso.
+    """
+    ultimo = db.session.query(func.max(MovimientoInventario.id)).scalar() or 0
+    fecha = datetime.utcnow()
+    filas = [
+        {'fecha': fecha, 'ultimo_movimiento_id': ultimo, 'parte_id': parte_id, 'cantidad': cantidad, 'costo': costo}
+        for parte_id, (cantidad, costo) in existencias(hasta_movimiento=ultimo).items()
+    ]
+    if filas:
+        db.session.execute(CorteInventario.__table__.insert(), filas)
+    db.session.commit()
+    return fecha, len(filas)
+
+
+def diferencias():
+    """Piezas cuyo stock actual no coincide con la suma de sus movimientos."""
+    calculadas = existencias()
+    actuales = defaultdict(int, db.session.query(Inventario.id, Inventario.cantidad))
+    return {
+        parte_id: (actuales[parte_id], calculadas.get(parte_id, (0, None))[0])
+        for parte_id in set(actuales) | set(calculadas)
+        if actuales[parte_id] != calculadas.get(parte_id, (0, None))[0]
+    }
+
+
+# ────────────────────────────────────────────────
+#                  Comandos CLI
+# ────────────────────────────────────────────────
+
+cli = AppGroup('almacen', help='Cortes y verificación del historial de inventario.')
+
+
+@cli.command('corte')
+def corte_comando():
+    """Guarda un corte de existencias (programarlo, p. ej., cada noche)."""
+    fecha, piezas = crear_corte()
+    click.echo(f'Corte {fecha:%Y-%m-%d %H:%M:%S} con {piezas} piezas')
+
+
+@cli.command('existencias')
+@click.option('--fecha', type=click.DateTime(), default=None, help='Fecha y hora (UTC); por defecto, ahora.')
+def existencias_comando(fecha):
+    """Existencia y valuación a una fecha."""
+    datos = existencias(fecha)
+    for parte_id, (cantidad, costo) in sorted(datos.items()):
+        click.echo(f'{parte_id}\t{cantidad}\t{costo}')
+    click.echo(f'Valuación: {sum(c * (costo or 0) for c, costo in datos.values()):,.2f}')
+
+
+@cli.command('verificar')
+def verificar_comando():
+    """Compara el stock actual contra el historial de movimientos."""
+    faltantes = diferencias()
+    for parte_id, (actual, calculada) in sorted(faltantes.items()):
+        click.echo(f'Pieza {parte_id}: stock {actual}, historial {calculada}')
+    if faltantes:
+        raise SystemExit(1)
+    click.echo('El stock coincide con el historial')
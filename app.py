@@ -1,33 +1,83 @@
 import os
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, make_response, render_template_string
-from flask_migrate import Migrate
-from models import db, Cliente, Vehiculo, Inventario, OrdenCompra, OrdenTrabajo, orden_trabajo_partes,User
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, abort, make_response, render_template_string, send_file, Response, stream_with_context
+from models import db, Cliente, Vehiculo, Inventario, OrdenCompra, OrdenTrabajo, orden_trabajo_partes,User, Trabajo
 from sqlalchemy import desc, func, or_
 from datetime import date, datetime
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_sqlalchemy import SQLAlchemy
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.security import check_password_hash
-import pdfkit
 import io
-from extensions import db, migrate
+from extensions import db
+import busqueda as indices_busqueda
+import contadores
+import generador_pdf
+import trabajos
+import almacen
+import importacion
+import exportacion
+import versiones
+import estaticos
+import arranque
+import perfilado
+import sinteticos
+import sesiones
+import planes
+import basedatos
+import tablero
+import cotizaciones
+import compras
+import fragmentos
+import reportes
+import reabasto
+from paginacion import paginar
+from consultas import (consulta_clientes, consulta_vehiculos, consulta_inventario, consulta_ordenes, consulta_compras,
+                       fecha_param, presupuesto_consultas, sugerencias_clientes, sugerencias_partes)
 
 app = Flask(__name__)
+# Detrás del router de Heroku / proxy de Docker: IP y esquema del cliente desde X-Forwarded-*
+# (PROXY_SALTOS = proxies de confianza delante de gunicorn; 0 si se expone directo)
+_saltos = int(os.getenv('PROXY_SALTOS', '1'))
+if _saltos:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=_saltos, x_proto=_saltos)
 
 # Clave secreta (usa variable de entorno en producción)
 app.secret_key = os.getenv('SECRET_KEY') or 'XnB4@lK009g#3120vWxyN43'  # Cambia esta para local
 
-database_url = os.getenv('DATABASE_URL')
+database_url = basedatos.normalizar_url(os.getenv('DATABASE_URL'))
 if database_url:
     app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_pre_ping': True}  # Mejora para Postgres
 else:
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///app.db'  # Local por defecto
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = basedatos.opciones_motor(app.config['SQLALCHEMY_DATABASE_URI'])  # Pool / pragmas (ver basedatos.py)
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SQLALCHEMY_ECHO'] = False  # Desactiva logs SQL en producción
+app.config['PERFILADO'] = os.getenv('PERFILADO') == '1'  # Tiempos por request y SQL (ver perfilado.py)
+app.config['PERFILADO_TOKEN'] = os.getenv('PERFILADO_TOKEN')
+app.config['HASH_CONTRASENAS'] = os.getenv('HASH_CONTRASENAS', 'scrypt:32768:8:1')  # Ver sesiones.py
+app.config['CACHE_FRAGMENTOS'] = os.getenv('CACHE_FRAGMENTOS', '1') != '0'  # {% cache %} en plantillas (ver fragmentos.py)
 
 db.init_app(app)
-migrate.init_app(app, db)
+basedatos.init_app(app)
+indices_busqueda.init_app(app)
+if arranque.desde_cli():
+    arranque.init_migraciones(app)  # `flask db ...`; los workers no cargan alembic
+estaticos.init_app(app)
+perfilado.init_app(app)
+fragmentos.init_app(app)
+
+app.cli.add_command(indices_busqueda.cli)
+app.cli.add_command(trabajos.cli)
+app.cli.add_command(almacen.cli)
+app.cli.add_command(importacion.cli)
+app.cli.add_command(estaticos.cli)
+app.cli.add_command(arranque.cli)
+app.cli.add_command(sinteticos.cli)
+app.cli.add_command(planes.cli)
+app.cli.add_command(tablero.cli)
+app.cli.add_command(reportes.cli)
+app.cli.add_command(reabasto.cli)
 
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -35,7 +85,7 @@ login_manager.login_view = 'login'  # Redirige a login si no autenticado
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return sesiones.cargar_usuario(user_id)  # En caché unos segundos (ver sesiones.py)
 
 @app.route('/')
 def index():
@@ -51,8 +101,12 @@ def login():
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
-        user = User.query.filter_by(username=username).first()
-        if user and user.check_password(password):
+        try:
+            user = sesiones.autenticar(username, password)
+        except sesiones.DemasiadosIntentos as e:
+            flash(str(e), 'warning')
+            return render_template('login.html'), 429, {'Retry-After': str(e.espera)}
+        if user:
             login_user(user)
             return redirect(url_for('index'))
         flash('Usuario o contraseña incorrectos', 'danger')
@@ -93,6 +147,8 @@ ZONAS_VEHICULO = [
 # Módulo Clientes (CRUD)
 @app.route('/clientes', methods=['GET', 'POST'])
 @login_required
+@versiones.cache_http('cliente', 'vehiculo')
+@presupuesto_consultas(8)
 def clientes():
     if request.method == 'POST':
         nombre = request.form.get('nombre')
@@ -108,59 +164,36 @@ def clientes():
         
         if nombre and marca and modelo and ano and placa:  # Requerir vehículo al alta
             nuevo_cliente = Cliente(nombre=nombre, telefono=telefono, email=email)
+            nuevo_vehiculo = Vehiculo(marca=marca, modelo=modelo, ano=ano, placa=placa, kms_actual=kms_actual, cliente=nuevo_cliente)
             db.session.add(nuevo_cliente)
-            db.session.commit()
-            
-            nuevo_vehiculo = Vehiculo(marca=marca, modelo=modelo, ano=ano, placa=placa, kms_actual=kms_actual, cliente_id=nuevo_cliente.id)
-            db.session.add(nuevo_vehiculo)
-            db.session.commit()
+            db.session.commit()  # Cliente y vehículo en una sola transacción
             flash('Cliente y vehículo agregados correctamente', 'success')
         else:
             flash('Faltan datos de cliente o vehículo', 'danger')
         return redirect(url_for('clientes'))
 
-    # GET: filtros, búsqueda y paginación
-    page = request.args.get('page', 1, type=int)
+    # GET: filtros, búsqueda y paginación por cursor
+    cursor = request.args.get('cursor')
     busqueda = request.args.get('busqueda', '').strip()
     filtro_vehiculos = request.args.get('filtro_vehiculos', 'todos')  # todos, con_vehiculos, sin_vehiculos
 
-    query = Cliente.query
-
-    # Búsqueda por nombre, teléfono o email
-    if busqueda:
-        query = query.filter(
-            db.or_(
-                Cliente.nombre.ilike(f'%{busqueda}%'),
-                Cliente.telefono.ilike(f'%{busqueda}%'),
-                Cliente.email.ilike(f'%{busqueda}%')
-            )
-        )
-
-    # Filtro por si tiene vehículos o no
-    if filtro_vehiculos == 'con_vehiculos':
-        query = query.join(Vehiculo, isouter=True).group_by(Cliente.id).having(db.func.count(Vehiculo.id) > 0)
-    elif filtro_vehiculos == 'sin_vehiculos':
-        query = query.outerjoin(Vehiculo).group_by(Cliente.id).having(db.func.count(Vehiculo.id) == 0)
-
-    # Orden por nombre alfabético
-    query = query.order_by(Cliente.nombre.asc())
+    query = consulta_clientes(busqueda, filtro_vehiculos)
 
-    paginacion = query.paginate(page=page, per_page=20, error_out=False)
+    total = contadores.total('clientes', ('clientes', busqueda, filtro_vehiculos), query)
+    paginacion = paginar(query, [Cliente.nombre, Cliente.id], cursor=cursor, por_pagina=20, total=total)
     clientes_lista = paginacion.items
 
-    # Contadores para dashboard
-    total_clientes = Cliente.query.count()
-    con_vehiculos = Cliente.query.join(Vehiculo).distinct().count()
-    sin_vehiculos = total_clientes - con_vehiculos
+    # Contadores para dashboard (en caché, ver contadores.py)
+    conteos = contadores.obtener('clientes')
 
     return render_template('clientes.html',
                            clientes=clientes_lista,
                            paginacion=paginacion,
                            busqueda=busqueda,
                            filtro_vehiculos=filtro_vehiculos,
-                           total_clientes=total_clientes,
-                           con_vehiculos=con_vehiculos,
-                           sin_vehiculos=sin_vehiculos)
+                           total_clientes=conteos['total_clientes'],
+                           con_vehiculos=conteos['con_vehiculos'],
+                           sin_vehiculos=conteos['sin_vehiculos'])
 
 # Editar cliente
 @app.route('/clientes/edit/<int:id>', methods=['GET', 'POST'])
@@ -198,6 +231,8 @@ def eliminar_cliente(id):
 # Similar para Vehículos
 @app.route('/vehiculos', methods=['GET', 'POST'])
 @login_required
+@versiones.cache_http('vehiculo', 'cliente', 'orden_trabajo')
+@presupuesto_consultas(8)
 def vehiculos():
     if request.method == 'POST':
         marca = request.form.get('marca')
@@ -216,6 +251,9 @@ def vehiculos():
         except ValueError:
             flash('Año o cliente inválido', 'danger')
             return redirect(url_for('vehiculos'))
+        if db.session.get(Cliente, cliente_id) is None:
+            flash('Elige un cliente de la lista', 'danger')
+            return redirect(url_for('vehiculos'))
 
         # Verificar si la placa ya existe (para evitar duplicados)
         if Vehiculo.query.filter_by(placa=placa).first():
@@ -237,53 +275,35 @@ def vehiculos():
         return redirect(url_for('vehiculos'))
 
     # GET
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     busqueda = request.args.get('busqueda', '').strip()
     filtro_cliente = request.args.get('cliente_id', 'todos')
 
-    query = Vehiculo.query
-
-    # Búsqueda por placa, marca, modelo
-    if busqueda:
-        query = query.filter(
-            db.or_(
-                Vehiculo.placa.ilike(f'%{busqueda}%'),
-                Vehiculo.marca.ilike(f'%{busqueda}%'),
-                Vehiculo.modelo.ilike(f'%{busqueda}%')
-            )
-        )
-
-    # Filtro por cliente específico
-    if filtro_cliente != 'todos':
-        try:
-            cliente_id = int(filtro_cliente)
-            query = query.filter(Vehiculo.cliente_id == cliente_id)
-        except ValueError:
-            pass
-
-    # Orden por placa o marca
-    query = query.order_by(Vehiculo.placa.asc())
+    query = consulta_vehiculos(busqueda, filtro_cliente)
 
-    paginacion = query.paginate(page=page, per_page=20, error_out=False)
+    total = contadores.total('clientes', ('vehiculos', busqueda, filtro_cliente), query)
+    paginacion = paginar(query, [Vehiculo.placa, Vehiculo.id], cursor=cursor, por_pagina=20, total=total)
     vehiculos_lista = paginacion.items
 
-    clientes = Cliente.query.order_by(Cliente.nombre.asc()).all()
+    # Nombre del cliente filtrado para el autocompletado (el resto se pide por JS)
+    cliente_filtro = db.session.get(Cliente, int(filtro_cliente)) if filtro_cliente.isdigit() else None
 
-    # Contadores
-    total_vehiculos = Vehiculo.query.count()
-    # Puedes agregar más si quieres (por marca, año, etc.)
+    # Contadores (en caché, ver contadores.py)
+    total_vehiculos = contadores.obtener('clientes')['total_vehiculos']
 
     return render_template('vehiculos.html',
                            vehiculos=vehiculos_lista,
                            paginacion=paginacion,
                            busqueda=busqueda,
-                           clientes=clientes,
+                           cliente_filtro=cliente_filtro,
                            filtro_cliente=filtro_cliente,
                            total_vehiculos=total_vehiculos)
 
 # Inventarios
 @app.route('/inventarios', methods=['GET', 'POST'])
 @login_required
+@versiones.cache_http('inventario')
+@presupuesto_consultas(10)
 def inventarios():
     if request.method == 'POST':
         nombre_parte = request.form.get('nombre_parte')
@@ -305,91 +325,118 @@ def inventarios():
                 descripcion=descripcion
             )
             db.session.add(nueva_pieza)
+            db.session.flush()
+            almacen.registrar_inicial(nueva_pieza)
             db.session.commit()
             flash(f'Pieza "{nombre_parte}" agregada correctamente (ID: {nueva_pieza.id})', 'success')
         else:
             flash('Error: Completa los campos obligatorios (nombre, cantidad, costo y precio público)', 'danger')
 
         # Redirect limpio a página 1 con todos los filtros para ver la nueva pieza inmediatamente
-        return redirect(url_for('inventarios', page=1, busqueda='', filtro_stock='todos'))
+        return redirect(url_for('inventarios', busqueda='', filtro_stock='todos'))
 
-    # GET: filtros y paginación
-    page = request.args.get('page', 1, type=int)
+    # GET: filtros y paginación por cursor
+    cursor = request.args.get('cursor')
     busqueda = request.args.get('busqueda', '')
     filtro_stock = request.args.get('filtro_stock', 'todos')
 
-    query = Inventario.query
-
-    if busqueda:
-        query = query.filter(
-            or_(
-                Inventario.nombre_parte.ilike(f'%{busqueda}%'),
-                Inventario.numero_parte.ilike(f'%{busqueda}%')
-            )
-        )
-
-    if filtro_stock == 'con_stock':
-        query = query.filter(Inventario.cantidad > 0)
-    elif filtro_stock == 'bajo':
-        query = query.filter(Inventario.cantidad <= 20, Inventario.cantidad > 0)
-    elif filtro_stock == 'critico':
-        query = query.filter(Inventario.cantidad <= 5)
-
-    items_pag = query.order_by(Inventario.id.desc()).paginate(page=page, per_page=10)
+    query = consulta_inventario(busqueda, filtro_stock)
+    total = contadores.total('inventario', (busqueda, filtro_stock), query)
+    items_pag = paginar(query, [Inventario.id], descendente=True, cursor=cursor, por_pagina=10, total=total)
 
-    total_piezas = Inventario.query.count()
-    total_valor_stock = db.session.query(db.func.sum(Inventario.cantidad * Inventario.precio)).scalar() or 0  # Usa 'precio' del modelo
-    bajo_stock = Inventario.query.filter(Inventario.cantidad <= 20, Inventario.cantidad > 0).count()
-    critico_stock = Inventario.query.filter(Inventario.cantidad <= 5).count()
+    conteos = contadores.obtener('inventario')  # Valor de stock usa 'precio' del modelo
 
     return render_template('inventarios.html',
                            items=items_pag.items,
                            paginacion=items_pag,
                            busqueda=busqueda,
                            filtro_stock=filtro_stock,
-                           total_piezas=total_piezas,
-                           total_valor_stock=total_valor_stock,
-                           bajo_stock=bajo_stock,
-                           critico_stock=critico_stock)
+                           total_piezas=conteos['total_piezas'],
+                           total_valor_stock=conteos['valor_stock'],
+                           bajo_stock=conteos['bajo_stock'],
+                           critico_stock=conteos['critico_stock'])
 
 # Órdenes de Compra
 @app.route('/ordenes_compra', methods=['GET', 'POST'])
 @login_required
+@versiones.cache_http('orden_compra')
 def ordenes_compra():
     if request.method == 'POST':
-        proveedor = request.form['proveedor']
-        total = float(request.form['total'])
-        parte_id = request.form.get('parte_id')
-        cantidad_comprada = request.form.get('cantidad_comprada')
-        
-        nueva_orden = OrdenCompra(proveedor=proveedor, total=total)
+        proveedor = request.form['proveedor'].strip()
+        try:
+            partidas = compras.leer_partidas(request.form)
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('ordenes_compra'))
+        recibir = request.form.get('recibir') == '1'
+
+        # Con partidas el total es su suma; sin ellas, solo se registra el gasto
+        total = 0 if partidas else request.form.get('total', type=float) or 0
+        nueva_orden = OrdenCompra(proveedor=proveedor, total=total, estado='Pendiente' if partidas else 'Recibida')
         db.session.add(nueva_orden)
+        db.session.flush()
+        try:
+            if partidas:
+                compras.agregar_partidas(nueva_orden.id, partidas)
+            if partidas and recibir:
+                # Todas las partidas al inventario en la misma transacción que la compra
+                almacen.recibir(nueva_orden.id)
+        except LookupError as e:
+            db.session.rollback()
+            flash(str(e), 'danger')
+            return redirect(url_for('ordenes_compra'))
         db.session.commit()
-        
-        # Lógica operativa: Si se especifica parte, agregar a inventario
-        if parte_id and cantidad_comprada:
-            try:
-                cantidad_comprada = int(cantidad_comprada)
-                item = Inventario.query.get(int(parte_id))
-                if item:
-                    item.cantidad += cantidad_comprada
-                    db.session.commit()
-                    flash(f'Se agregaron {cantidad_comprada} unidades a {item.nombre_parte}.', 'success')
-                else:
-                    flash('Parte no encontrada.', 'error')
-            except ValueError:
-                flash('Cantidad inválida.', 'error')
-        
+        if partidas and recibir:
+            contadores.invalidar('inventario')  # Movimientos insertados sin el ORM
+            flash(f'Orden {nueva_orden.id} recibida: {len(partidas)} partidas al inventario.', 'success')
+        else:
+            flash(f'Orden de compra {nueva_orden.id} creada.', 'success')
         return redirect(url_for('ordenes_compra'))
     
-    ordenes = OrdenCompra.query.all()
-    items = Inventario.query.all()  # Para select en template
-    return render_template('ordenes_compra.html', ordenes=ordenes, items=items)
+    # GET: filtros y paginación por cursor
+    cursor = request.args.get('cursor')
+    proveedor = request.args.get('proveedor', '').strip()
+    desde = request.args.get('desde', '')
+    hasta = request.args.get('hasta', '')
+
+    query = consulta_compras(proveedor, fecha_param(desde), fecha_param(hasta))
+    total = contadores.total('compras', (proveedor, desde, hasta), query)
+    paginacion = paginar(query, [OrdenCompra.id], descendente=True, cursor=cursor, por_pagina=20, total=total)
+
+    return render_template('ordenes_compra.html', ordenes=paginacion.items, paginacion=paginacion,
+                           proveedor=proveedor, desde=desde, hasta=hasta)
+
+
+@app.route('/ordenes_compra/<int:orden_id>')
+@login_required
+@versiones.cache_http('orden_compra', 'orden_compra_partidas', 'inventario')
+def detalle_orden_compra(orden_id):
+    orden = OrdenCompra.query.get_or_404(orden_id)
+    return render_template('detalle_orden_compra.html', orden=orden, lineas=compras.lineas(orden_id))
+
+
+@app.route('/ordenes_compra/<int:orden_id>/recibir', methods=['POST'])
+@login_required
+def recibir_orden_compra(orden_id):
+    """Recibe la entrega completa: cantidades y costos de la factura, todas las partidas en un request."""
+    try:
+        compras.ajustar_partidas(orden_id, compras.leer_partidas(request.form, permitir_cero=True))
+        recibidas = almacen.recibir(orden_id, nota=request.form.get('nota') or None)
+    except ValueError as e:
+        db.session.rollback()
+        flash(str(e), 'danger')
+        return redirect(url_for('detalle_orden_compra', orden_id=orden_id))
+    db.session.commit()
+    contadores.invalidar('inventario')  # Movimientos insertados sin el ORM
+    flash(f'Orden recibida: {recibidas} partidas al inventario.', 'success')
+    return redirect(url_for('detalle_orden_compra', orden_id=orden_id))
 
 
 
 @app.route('/ordenes_servicio', methods=['GET', 'POST'])
 @login_required
+@versiones.cache_http('orden_trabajo', 'vehiculo', 'cliente')
+@presupuesto_consultas(10)
 def ordenes_servicio():
     if request.method == 'POST':
         cliente_id = request.form.get('cliente_id')
@@ -416,10 +463,8 @@ def ordenes_servicio():
             fecha_creacion=datetime.utcnow(),
         )
 
-        # Folio automático
-        ultima_orden = OrdenTrabajo.query.order_by(desc(OrdenTrabajo.id)).first()
-        siguiente_num = (ultima_orden.id + 1) if ultima_orden else 1
-        nueva_orden.folio = f"F-{siguiente_num:04d}"   # Ej: F-0001, F-0002...
+        # Folio automático (contador en BD, ver folios.py). Ej: F-0001, F-0002...
+        nueva_orden.generar_folio()
 
         # Fecha compromiso (opcional)
         if fecha_compromiso_str:
@@ -457,55 +502,83 @@ def ordenes_servicio():
     # ────────────────────────────────────────────────
     #                  GET - Listado + filtros
     # ────────────────────────────────────────────────
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     estado_filtro = request.args.get('estado', 'todas')
     busqueda = request.args.get('busqueda', '').strip()
+    desde = request.args.get('desde', '')
+    hasta = request.args.get('hasta', '')
 
-    query = OrdenTrabajo.query
-
-    if estado_filtro != 'todas':
-        query = query.filter(OrdenTrabajo.estado == estado_filtro)
-
-    if busqueda:
-        query = query.join(Vehiculo).join(Cliente).filter(
-            db.or_(
-                Vehiculo.placa.ilike(f'%{busqueda}%'),
-                Cliente.nombre.ilike(f'%{busqueda}%'),
-                OrdenTrabajo.folio.ilike(f'%{busqueda}%')
-            )
-        )
-
-    query = query.order_by(desc(OrdenTrabajo.fecha_creacion))
+    query = consulta_ordenes(estado_filtro, busqueda, fecha_param(desde), fecha_param(hasta))
 
-    paginacion = query.paginate(page=page, per_page=15, error_out=False)
+    total = contadores.total('ordenes', (estado_filtro, busqueda, desde, hasta), query)
+    paginacion = paginar(query, [OrdenTrabajo.fecha_creacion, OrdenTrabajo.id], descendente=True,
+                         cursor=cursor, por_pagina=15, total=total)
     ordenes = paginacion.items
 
-    # Contadores para dashboard
-    hoy = date.today()
-    total_pendientes = OrdenTrabajo.query.filter_by(estado='Pendiente').count()
-    total_progreso = OrdenTrabajo.query.filter_by(estado='En progreso').count()
-    total_completadas_hoy = OrdenTrabajo.query.filter(OrdenTrabajo.estado=='Completado', OrdenTrabajo.fecha_entrega==date.today()).count()
-    total_abiertas = total_pendientes + total_progreso
-
-    clientes = Cliente.query.order_by(Cliente.nombre).all()
+    # Contadores para dashboard (en caché, ver contadores.py)
+    conteos = contadores.obtener('ordenes')
 
     return render_template(
         'ordenes_servicio.html',
         ordenes=ordenes,
-        clientes=clientes,
         paginacion=paginacion,
         estado_filtro=estado_filtro,
         busqueda=busqueda,
-        total_pendientes=total_pendientes,
-        total_progreso=total_progreso,
-        total_completadas_hoy=total_completadas_hoy,
-        total_abiertas=total_abiertas,
+        desde=desde,
+        hasta=hasta,
+        total_pendientes=conteos['pendientes'],
+        total_progreso=conteos['en_progreso'],
+        total_completadas_hoy=conteos['completadas_hoy'],
+        total_abiertas=conteos['abiertas'],
         checklist_items=CHECKLIST_ITEMS,
         zonas_vehiculo=ZONAS_VEHICULO
     )
 
+@app.route('/tablero')
+@login_required
+def tablero_ordenes():
+    """Tablero kanban de órdenes; se actualiza solo con /tablero/eventos (ver tablero.py)."""
+    ultimo_evento = tablero.ultimo_evento()  # Antes de leer las columnas: nada se pierde en medio
+    # La plantilla llama columnas() solo si el fragmento no está en caché
+    return render_template('tablero.html', columnas=tablero.columnas, ultimo_evento=ultimo_evento)
+
+
+@app.route('/tablero/eventos')
+@login_required
+def tablero_eventos():
+    """Stream SSE con los cambios de órdenes (altas, estados, refacciones)."""
+    desde = request.headers.get('Last-Event-ID') or request.args.get('desde', '0')
+    try:
+        desde = int(desde)
+    except ValueError:
+        desde = 0
+    continuo = tablero.transmision_continua(request.environ)  # Worker síncrono: sondeo corto
+    respuesta = Response(tablero.flujo(app, desde, continuo), mimetype='text/event-stream')
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    respuesta.headers['X-Accel-Buffering'] = 'no'  # nginx no debe juntar eventos en su buffer
+    return respuesta
+
+
+@app.route('/reportes')
+@login_required
+@versiones.cache_http('resumen_ordenes_dia', 'resumen_entregas_dia', 'consumo_partes_mes', 'inventario')
+@presupuesto_consultas(6)
+def reportes_taller():
+    """Indicadores del taller; solo lee las tablas de resumen (ver reportes.py)."""
+    hasta = fecha_param(request.args.get('hasta')) or date.today()
+    desde = fecha_param(request.args.get('desde'))
+    if desde is None:
+        inicio = hasta.year * 12 + hasta.month - 12  # Doce meses contando el de `hasta`
+        desde = date(inicio // 12, inicio % 12 + 1, 1)
+    por_mes = request.args.get('agrupar') != 'dia'
+    periodos, total = reportes.periodos(desde, hasta, por_mes)
+    return render_template('reportes.html', periodos=periodos, total=total, estados=reportes.ESTADOS,
+                           partes=reportes.consumo_partes(desde, hasta), desde=desde, hasta=hasta, por_mes=por_mes)
+
+
 @app.route('/ordenes_servicio/<int:orden_id>')
 @login_required
+@versiones.cache_http('orden_trabajo', 'orden_trabajo_partes', 'inventario', 'vehiculo', 'cliente')
 def detalle_orden(orden_id):
     """
     Muestra el detalle de una orden de servicio.
@@ -523,8 +596,7 @@ def detalle_orden(orden_id):
         func.sum(orden_trabajo_partes.c.cantidad_usada)
     ).filter_by(orden_id=orden.id).scalar() or 0
 
-    # 3. Partes disponibles en inventario para el selector de agregar
-    partes_disponibles = Inventario.query.filter(Inventario.cantidad > 0).all()
+    # 3. Las partes disponibles se buscan con autocompletado (/inventarios/sugerencias)
 
     # 4. (Opcional) Si quieres pasar un diccionario con cantidades por parte
     cantidades_usadas = {}
@@ -541,25 +613,18 @@ def detalle_orden(orden_id):
         orden=orden,
         partes_usadas=partes_usadas,
         cantidades_usadas=cantidades_usadas,       # para usar en el template
-        partes_disponibles=partes_disponibles,
         total_piezas_usadas=total_piezas_usadas
     )
 
 def get_dashboard_counts():
-    from models import OrdenTrabajo, Inventario
-    
-    pendientes = OrdenTrabajo.query.filter_by(estado='Pendiente').count()
-    en_progreso = OrdenTrabajo.query.filter_by(estado='En progreso').count()
-    critico_stock = Inventario.query.filter(Inventario.cantidad <= 5).count()
-    
-    return {
-        'pendientes': pendientes,
-        'en_progreso': en_progreso,
-        'critico_stock': critico_stock
-    }
+    return contadores.dashboard()
 
 @app.context_processor
 def inject_dashboard_counts():
+    # Login, páginas de error y plantillas fuera de un request (trabajos en
+    # segundo plano) no muestran contadores: no se consultan
+    if not current_user or not current_user.is_authenticated:
+        return {}
     return dict(dashboard_counts=get_dashboard_counts())
 
 
@@ -580,13 +645,14 @@ def update_estado_orden(orden_id):
         flash(f'Estado inválido. Debe ser uno de: {", ".join(estados_validos)}', 'danger')
         return redirect(request.referrer or url_for('ordenes_servicio'))
     
-    # Actualizar el estado
+    # Actualizar el estado; la fecha de entrega es el día en que se completa (ver reportes.py)
+    if nuevo_estado == 'Completado' and orden.estado != 'Completado':
+        orden.fecha_entrega = date.today()
+    elif nuevo_estado != 'Completado':
+        orden.fecha_entrega = None
     orden.estado = nuevo_estado
     
-    # Opcional: si se completa, podrías agregar lógica extra aquí
     if nuevo_estado == 'Completado':
-        # Ejemplo: podrías guardar fecha de finalización si agregas el campo
-        # orden.fecha_fin = date.today()
         flash('¡Orden marcada como completada!', 'success')
     elif nuevo_estado == 'Cancelado':
         flash('Orden cancelada correctamente.', 'warning')
@@ -601,6 +667,7 @@ def update_estado_orden(orden_id):
 
 @app.route('/vehiculos_por_cliente/<int:cliente_id>')
 @login_required
+@versiones.cache_http('vehiculo')
 def vehiculos_por_cliente(cliente_id):
     """API para cargar vehículos de un cliente específico (usado por JS)"""
     vehiculos = Vehiculo.query.filter_by(cliente_id=cliente_id).all()
@@ -613,6 +680,42 @@ def vehiculos_por_cliente(cliente_id):
     } for v in vehiculos])
 
 
+@app.route('/clientes/sugerencias')
+@login_required
+@versiones.cache_http('cliente')
+def sugerencias_clientes_api():
+    """API de autocompletado de clientes: ?q=prefijo&limite=10&cursor=..."""
+    pagina = sugerencias_clientes(request.args.get('q', '').strip(), request.args.get('cursor'),
+                                  request.args.get('limite'))
+    return jsonify({
+        'resultados': [{
+            'id': c.id,
+            'nombre': c.nombre,
+            'texto': f"{c.nombre} — {c.telefono}" if c.telefono else c.nombre
+        } for c in pagina.items],
+        'cursor': pagina.cursor_siguiente,
+    })
+
+
+@app.route('/inventarios/sugerencias')
+@login_required
+@versiones.cache_http('inventario')
+def sugerencias_partes_api():
+    """API de autocompletado de piezas: ?q=prefijo&limite=10&cursor=...&con_stock=1"""
+    pagina = sugerencias_partes(request.args.get('q', '').strip(), request.args.get('cursor'),
+                                request.args.get('limite'), solo_con_stock=request.args.get('con_stock') == '1')
+    return jsonify({
+        'resultados': [{
+            'id': p.id,
+            'nombre_parte': p.nombre_parte,
+            'numero_parte': p.numero_parte,
+            'cantidad': p.cantidad,
+            'texto': f"{p.nombre_parte} ({p.numero_parte or 's/n'}) — stock: {p.cantidad}"
+        } for p in pagina.items],
+        'cursor': pagina.cursor_siguiente,
+    })
+
+
 @app.route('/ordenes_servicio/agregar_refaccion/<int:orden_id>', methods=['POST'])
 @login_required
 def agregar_refaccion_orden(orden_id):
@@ -624,14 +727,25 @@ def agregar_refaccion_orden(orden_id):
     parte_id = request.form.get('parte_id', type=int)
     cantidad = request.form.get('cantidad_usada', type=int)
     
-    parte = Inventario.query.get_or_404(parte_id)
-    if parte.cantidad < cantidad:
+    if not parte_id or db.session.get(Inventario, parte_id) is None:
+        flash('Elige una pieza de la lista', 'danger')
+        return redirect(url_for('detalle_orden', orden_id=orden_id))
+    if not cantidad or cantidad <= 0:
+        flash('Cantidad inválida', 'danger')
+        return redirect(url_for('detalle_orden', orden_id=orden_id))
+
+    # Descontar stock con un UPDATE condicionado (sin carreras entre workers)
+    try:
+        almacen.salida(parte_id, cantidad, orden_trabajo_id=orden_id)
+    except almacen.StockInsuficiente:
+        db.session.rollback()
         flash('Stock insuficiente', 'danger')
         return redirect(url_for('detalle_orden', orden_id=orden_id))
     
-    # Agregar a relación
-    db.session.execute(orden_trabajo_partes.insert().values(orden_id=orden_id, parte_id=parte_id, cantidad_usada=cantidad))
-    parte.cantidad -= cantidad  # Actualizar stock
+    # Agregar a la orden con el precio de hoy (si la pieza ya estaba, se suma la cantidad)
+    cotizaciones.agregar_refaccion(orden_id, parte_id, cantidad)
+    tablero.refaccion_agregada(orden_id, parte_id, cantidad)  # Aviso al tablero en vivo
+    reportes.refaccion_agregada(orden_id, parte_id, cantidad)  # Consumo de piezas del mes
     db.session.commit()
     flash('Refacción agregada', 'success')
     return redirect(url_for('detalle_orden', orden_id=orden_id))
@@ -648,52 +762,144 @@ def update_trabajo_realizado(orden_id):
 
 @app.route('/cotizacion/<int:orden_id>')
 @login_required
+@versiones.cache_http('orden_trabajo', 'orden_trabajo_partes', 'inventario', 'vehiculo', 'cliente')
 def generar_cotizacion(orden_id):
     orden = OrdenTrabajo.query.get_or_404(orden_id)
-    
-    # Obtener refacciones usadas (asumiendo que ya tienes la relación many-to-many)
-    refacciones = orden.get_partes_con_cantidad()  # Esto devuelve lista de (pieza, cantidad)
-    
-    # Calcular totales
-    subtotal = sum(pieza.precio_publico * cantidad for pieza, cantidad in refacciones if pieza.precio_publico)
-    iva = subtotal * 0.16
-    total = subtotal + iva
-    
-    return render_template('cotizacion.html', 
-                          orden=orden, 
-                          refacciones=refacciones,
-                          subtotal=subtotal,
-                          iva=iva,
-                          total=total)
+
+    # Refacciones con precio congelado y totales en SQL; el PDF reusa el mismo cálculo (ver cotizaciones.py)
+    cotizacion = cotizaciones.obtener(orden)
+
+    return render_template('cotizacion.html', orden=orden, cotizacion=cotizacion)
 
 @app.route('/cotizacion/pdf/<int:orden_id>')
 @login_required
 def generar_cotizacion_pdf(orden_id):
     orden = OrdenTrabajo.query.get_or_404(orden_id)
-    refacciones = orden.get_partes_con_cantidad()
-    subtotal = sum(pieza.precio_publico * cantidad for pieza, cantidad in refacciones if pieza.precio_publico)
-    iva = subtotal * 0.16
-    total = subtotal + iva
 
-    html_string = render_template('cotizacion_pdf.html', orden=orden, refacciones=refacciones, subtotal=subtotal, iva=iva, total=total)
-    
-    pdf = pdfkit.from_string(html_string, False)
-    
-    response = make_response(pdf)
-    response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = f'attachment; filename=cotizacion_{orden.id}.pdf'
-    return response    
-
-with app.app_context():
-    db.drop_all()
-    db.create_all()  # Crea tablas si no existen
-    if not User.query.filter_by(username='admin').first():
-            admin = User(username='admin')
-            admin.set_password('ChitoWorkShop#123')  # ← Cambia esta contraseña por una segura
-            db.session.add(admin)
-            db.session.commit()
-            print("Usuario admin creado automáticamente")
-            
-            
+    # PDF en caché por contenido: si la cotización no cambió no se vuelve a generar
+    clave, ruta = generador_pdf.cotizacion_en_cache(orden)
+    if ruta is None:
+        # Renderizar ocupa el worker: lo hace la cola de trabajos (ver trabajos.py)
+        trabajo = trabajos.encolar('cotizacion_pdf', {'orden_id': orden.id})
+        respuesta = trabajo.to_dict()
+        respuesta['url_estado'] = url_for('estado_trabajo', trabajo_id=trabajo.id)
+        return jsonify(respuesta), 202, {'Location': respuesta['url_estado']}
+
+    return send_file(ruta, mimetype='application/pdf', as_attachment=True,
+                     download_name=f'cotizacion_{orden.id}.pdf', etag=clave, conditional=True)
+
+# Exportación en streaming (ver exportacion.py)
+@app.route('/exportar/<tabla>.<any(csv, xlsx):formato>')
+@login_required
+def exportar(tabla, formato):
+    filtros = {
+        'estado': request.args.get('estado', 'todas'),
+        'busqueda': request.args.get('busqueda', '').strip(),
+        'filtro_stock': request.args.get('filtro_stock', 'todos'),
+        'proveedor': request.args.get('proveedor', '').strip(),
+        'desde': fecha_param(request.args.get('desde')),
+        'hasta': fecha_param(request.args.get('hasta')),
+    }
+    try:
+        contenido = exportacion.generar(tabla, formato, filtros)
+    except exportacion.ErrorExportacion as e:
+        return jsonify({'error': str(e)}), 400
+
+    mimetype = 'text/csv; charset=utf-8' if formato == 'csv' else \
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    return Response(
+        stream_with_context(contenido),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={exportacion.nombre_archivo(tabla, formato)}'},
+    )
+
+
+# Carga masiva desde CSV / Excel (ver importacion.py)
+@app.route('/importar', methods=['GET', 'POST'])
+@login_required
+def importar():
+    resultado = None
+    tipo = request.form.get('tipo', 'clientes')
+    if request.method == 'POST':
+        archivo = request.files.get('archivo')
+        if not archivo or not archivo.filename:
+            flash('Selecciona un archivo CSV o XLSX', 'danger')
+            return redirect(url_for('importar'))
+        try:
+            resultado = importacion.importar(tipo, archivo.stream, archivo.filename)
+        except importacion.ErrorImportacion as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('importar'))
+        flash(f'Importación terminada: {resultado}', 'success' if not resultado.con_error else 'warning')
+    return render_template('importar.html', resultado=resultado, tipo=tipo, tipos=importacion.TIPOS)
+
+
+# Trabajos en segundo plano (ver trabajos.py)
+@app.route('/trabajos/<tipo>', methods=['POST'])
+@login_required
+def encolar_trabajo(tipo):
+    """Encola un trabajo y regresa de inmediato con su id (202)."""
+    if tipo not in trabajos.tipos_registrados():
+        return jsonify({'error': f'Tipo de trabajo desconocido: {tipo}'}), 400
+    try:
+        trabajo = trabajos.encolar(tipo, request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400  # Parámetros que la tarea no acepta
+    respuesta = trabajo.to_dict()
+    respuesta['url_estado'] = url_for('estado_trabajo', trabajo_id=trabajo.id)
+    return jsonify(respuesta), 202
+
+
+@app.route('/trabajos/<int:trabajo_id>')
+@login_required
+def estado_trabajo(trabajo_id):
+    trabajo = Trabajo.query.get_or_404(trabajo_id)
+    respuesta = trabajo.to_dict()
+    if trabajo.estado == 'completado' and trabajo.resultado_ruta:
+        respuesta['url_descarga'] = url_for('descargar_trabajo', trabajo_id=trabajo.id)
+    return jsonify(respuesta)
+
+
+@app.route('/trabajos/<int:trabajo_id>/descarga')
+@login_required
+def descargar_trabajo(trabajo_id):
+    trabajo = Trabajo.query.get_or_404(trabajo_id)
+    if trabajo.estado != 'completado' or not trabajo.resultado_ruta or not os.path.exists(trabajo.resultado_ruta):
+        return jsonify({'error': 'El resultado no está disponible'}), 404
+    return send_file(trabajo.resultado_ruta, mimetype=trabajo.resultado_mimetype,
+                     as_attachment=True, download_name=trabajo.resultado_nombre)
+
+
+
+# Perfilado de requests y SQL (solo con PERFILADO=1, ver perfilado.py)
+@app.route('/metrics')
+def metricas():
+    if not perfilado.activo():
+        abort(404)
+    if not perfilado.acceso_metricas():
+        abort(403)
+    return Response(perfilado.metricas_texto(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/admin/perfilado', methods=['GET', 'POST'])
+@login_required
+def perfilado_admin():
+    if not perfilado.activo():
+        abort(404)
+    if not perfilado.es_admin():
+        abort(403)
+    if request.method == 'POST':
+        perfilado.reiniciar()
+        flash('Estadísticas reiniciadas', 'success')
+        return redirect(url_for('perfilado_admin'))
+
+    por_endpoint, recientes, lentas = perfilado.resumen()
+    endpoints = sorted(por_endpoint.items(), key=lambda item: item[1]['tiempo'], reverse=True)
+    return render_template('perfilado.html', endpoints=endpoints, recientes=recientes, lentas=lentas,
+                           limite_lenta=app.config.get('PERFILADO_CONSULTA_LENTA_MS', perfilado.CONSULTA_LENTA_MS))
+
+if not arranque.desde_cli():
+    arranque.calentar_pool(app)
+
 #if __name__ == '__main__':
     #app.run(debug=True)
\ No newline at end of file
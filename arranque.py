@@ -0,0 +1,147 @@
+# arranque.py
+# Preparación de la base y arranque rápido de los workers.
+#
+# Importar app.py ya no toca la base: antes cada import (cada worker de
+# gunicorn, cada `flask db upgrade`) hacía drop_all/create_all y borraba los
+# datos. El esquema se prepara una vez por despliegue:
+#
+#   flask arranque inicializar        # esquema + índices de búsqueda + admin
+#   flask arranque inicializar --reiniciar   # borra todo y empieza de cero
+#   flask arranque sembrar            # solo el usuario admin
+#
+# Al importar la app en un worker solo se calienta el pool de conexiones
+# (POOL_CALENTAR conexiones abiertas de antemano) para que el primer request
+# no pague la conexión. Flask-Migrate/alembic solo se cargan en la CLI.
+import os
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import inspect, text
+
+import busqueda
+from extensions import db
+from models import User
+
+ADMIN_USUARIO = 'admin'
+ADMIN_CONTRASENA = 'ChitoWorkShop#123'  # Solo si no se define ADMIN_PASSWORD
+
+
+def desde_cli():
+    """True si la app se está cargando para un comando `flask ...`."""
+    return click.get_current_context(silent=True) is not None
+
+
+def init_migraciones(app):
+    """Registra Flask-Migrate (y el grupo `flask db`); importar alembic tarda ~0.5 s."""
+    from flask_migrate import Migrate
+    Migrate(app, db, directory=os.path.join(app.root_path, 'migrations'))  # Sin importar el cwd
+
+
+# ────────────────────────────────────────────────
+#            Calentamiento del pool
+# ────────────────────────────────────────────────
+
+def calentar_pool(app):
+    """
+    Abre POOL_CALENTAR conexiones y las deja en el pool. Si la base no
+    responde no detiene el arranque: el primer request lo reintentará.
+    """
+    cantidad = int(app.config.get('POOL_CALENTAR', 2))
+    if cantidad <= 0:
+        return 0
+    with app.app_context():
+        engine = db.engine
+        # Con `gunicorn --preload` el import pasa en el proceso maestro: los
+        # hijos no deben compartir esos sockets, así que empiezan con pool nuevo
+        os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
+        conexiones = []
+        try:
+            for _ in range(cantidad):
+                conexion = engine.connect()
+                conexiones.append(conexion)
+                conexion.execute(text('SELECT 1'))
+        except Exception as error:
+            app.logger.warning('No se pudo calentar el pool de conexiones: %s', error)
+        finally:
+            for conexion in conexiones:
+                conexion.close()  # Regresa al pool, abierta
+    return len(conexiones)
+
+
+# ────────────────────────────────────────────────
+#              Esquema y datos iniciales
+# ────────────────────────────────────────────────
+
+def sembrar(usuario=ADMIN_USUARIO, contrasena=None):
+    """Crea el usuario administrador si no existe. Regresa True si lo creó."""
+    if User.query.filter_by(username=usuario).first():
+        return False
+    admin = User(username=usuario)
+    admin.set_password(contrasena or os.getenv('ADMIN_PASSWORD') or ADMIN_CONTRASENA)
+    db.session.add(admin)
+    db.session.commit()
+    return True
+
+
+def inicializar(reiniciar=False):
+    """
+    Deja la base lista: si no tiene historial de migraciones crea el esquema
+    desde los modelos y la marca en la última revisión; si lo tiene, aplica
+    las migraciones pendientes. Después instala los índices de búsqueda.
+    Regresa 'creada' o 'actualizada'.
+    """
+    import flask_migrate
+
+    if 'migrate' not in current_app.extensions:
+        init_migraciones(current_app)  # Llamada fuera de la CLI
+    if reiniciar:
+        db.drop_all()
+        with db.engine.begin() as conexion:
+            conexion.execute(text('DROP TABLE IF EXISTS alembic_version'))
+
+    if inspect(db.engine).has_table('alembic_version'):
+        flask_migrate.upgrade()
+        busqueda.instalar()
+        return 'actualizada'
+
+    # Base nueva (o creada por versiones anteriores con create_all): las
+    # migraciones no construyen el esquema desde cero, los modelos sí
+    db.create_all()
+    flask_migrate.stamp()
+    busqueda.instalar(reconstruir=True)
+    return 'creada'
+
+
+# ────────────────────────────────────────────────
+#                  Comandos CLI
+# ────────────────────────────────────────────────
+
+cli = AppGroup('arranque', help='Preparación de la base de datos.')
+
+
+@cli.command('inicializar')
+@click.option('--reiniciar', is_flag=True, help='Borra todas las tablas antes de crearlas.')
+@click.option('--sin-admin', is_flag=True, help='No crear el usuario admin.')
+def inicializar_comando(reiniciar, sin_admin):
+    """Crea o actualiza el esquema, los índices de búsqueda y el usuario admin."""
+    if reiniciar:
+        click.confirm('Se borrarán todos los datos. ¿Continuar?', abort=True)
+    inicio = time.perf_counter()
+    estado = inicializar(reiniciar=reiniciar)
+    click.echo(f'Base {estado} en {time.perf_counter() - inicio:.2f} s ({db.engine.url.get_backend_name()})')
+    if not sin_admin and sembrar():
+        click.echo('Usuario admin creado')
+
+
+@cli.command('sembrar')
+@click.option('--usuario', default=ADMIN_USUARIO, show_default=True)
+@click.option('--contrasena', default=None, help='Por defecto, la variable ADMIN_PASSWORD.')
+def sembrar_comando(usuario, contrasena):
+    """Crea el usuario administrador si no existe."""
+    if sembrar(usuario, contrasena):
+        click.echo(f'Usuario {usuario} creado')
+    else:
+        click.echo(f'El usuario {usuario} ya existe')
+
@@ -0,0 +1,85 @@
+# basedatos.py
+# Perfil de conexión según DATABASE_URL.
+#
+# SQLite (local y despliegues chicos): con el modo de diario por defecto un
+# escritor bloquea a los lectores y varios workers de gunicorn terminan en
+# "database is locked". Al abrir cada conexión se ajusta:
+#   journal_mode=WAL       lectores y un escritor al mismo tiempo
+#   synchronous=NORMAL     en WAL no se pierde integridad, solo (si se va la
+#                          luz) las últimas transacciones
+#   busy_timeout           SQLITE_BUSY_TIMEOUT_MS ms esperando el candado de
+#                          escritura antes de fallar (5000)
+#   mmap_size, cache_size  SQLITE_MMAP_MB (256) y SQLITE_CACHE_MB (64)
+#   temp_store=MEMORY      ordenamientos temporales sin archivo
+# SQLITE_WAL=0 deja SQLite como viene (sirve para comparar, ver
+# benchmarks/concurrencia.py).
+#
+# PostgreSQL: pool por worker de DB_POOL_SIZE conexiones (5) más
+# DB_POOL_OVERFLOW temporales (10), recicladas cada DB_POOL_RECYCLE s (1800)
+# para no chocar con cortes de inactividad del proveedor; un request espera
+# hasta DB_POOL_TIMEOUT s (30) por una conexión libre. El total posible es
+# workers × (size + overflow): debe quedar debajo de max_connections.
+import os
+
+from sqlalchemy import event
+
+from extensions import db
+
+
+def normalizar_url(url):
+    """Acepta el esquema postgres:// que dan Heroku/Render (SQLAlchemy 2 solo conoce postgresql://)."""
+    if url and url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def _entero(nombre, defecto):
+    return int(os.getenv(nombre, defecto))
+
+
+def opciones_motor(url):
+    """SQLALCHEMY_ENGINE_OPTIONS para la base de `url`."""
+    if url.startswith('postgresql'):
+        return {
+            'pool_pre_ping': True,
+            'pool_size': _entero('DB_POOL_SIZE', 5),
+            'max_overflow': _entero('DB_POOL_OVERFLOW', 10),
+            'pool_recycle': _entero('DB_POOL_RECYCLE', 1800),
+            'pool_timeout': _entero('DB_POOL_TIMEOUT', 30),
+        }
+    if url.startswith('sqlite'):
+        return {}  # Los ajustes van por conexión (ver _ajustar_sqlite)
+    return {'pool_pre_ping': True}
+
+
+def _ajustar_sqlite(conexion_dbapi, registro):
+    cursor = conexion_dbapi.cursor()
+    try:
+        # busy_timeout primero: cambiar a WAL necesita el candado un instante
+        cursor.execute(f"PRAGMA busy_timeout = {_entero('SQLITE_BUSY_TIMEOUT_MS', 5000)}")
+        cursor.execute('PRAGMA journal_mode = WAL')
+        cursor.execute('PRAGMA synchronous = NORMAL')
+        cursor.execute(f"PRAGMA mmap_size = {_entero('SQLITE_MMAP_MB', 256) * 1024 * 1024}")
+        cursor.execute(f"PRAGMA cache_size = -{_entero('SQLITE_CACHE_MB', 64) * 1024}")  # Negativo: KiB
+        cursor.execute('PRAGMA temp_store = MEMORY')
+    finally:
+        cursor.close()
+
+
+def init_app(app):
+    """Registra los ajustes de SQLite en el engine de la app (después de db.init_app)."""
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name == 'sqlite' and os.getenv('SQLITE_WAL', '1') != '0':
+        event.listen(engine, 'connect', _ajustar_sqlite)
+
+
+def ajustes_actuales():
+    """{pragma: valor} de una conexión del engine (para revisar el perfil aplicado)."""
+    if db.engine.dialect.name != 'sqlite':
+        return {}
+    with db.engine.connect() as conexion:
+        return {
+            pragma: conexion.exec_driver_sql(f'PRAGMA {pragma}').scalar()
+            for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size', 'cache_size', 'temp_store')
+        }
@@ -0,0 +1,98 @@
+"""
+Tiempo de arranque de un worker: `import app` y primer request.
+
+Cada corrida es un proceso nuevo (como un worker de gunicorn recién
+creado) que mide cuánto tarda el import de app.py (incluye el
+calentamiento del pool) y cuánto tarda en responder el primer GET /login.
+Al final muestra los módulos que más tardan en importarse.
+
+Uso:
+    python benchmarks/arranque.py --corridas 10
+    DATABASE_URL=postgresql://... python benchmarks/arranque.py
+
+Sin DATABASE_URL usa una base SQLite temporal (creada con
+`arranque.inicializar`, fuera de la medición).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_MEDIR = '''
+import json, sys, time
+sys.path.insert(0, {raiz!r})
+inicio = time.perf_counter()
+import app
+importado = time.perf_counter()
+respuesta = app.app.test_client().get('/login')
+fin = time.perf_counter()
+assert respuesta.status_code == 200, respuesta.status_code
+print(json.dumps({{'import': importado - inicio, 'primer_request': fin - importado}}))
+'''
+
+
+def _correr(codigo, *opciones):
+    salida = subprocess.run([sys.executable, *opciones, '-c', codigo], cwd=RAIZ,
+                            capture_output=True, text=True, check=True)
+    return salida
+
+
+def _preparar_base():
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'arranque.db')
+    _correr(f'import sys; sys.path.insert(0, {RAIZ!r})\n'
+            'import app, arranque\n'
+            'with app.app.app_context():\n'
+            '    arranque.inicializar()\n')
+
+
+def _modulos_lentos(cantidad):
+    """Los `cantidad` imports directos de app.py con más tiempo acumulado (python -X importtime)."""
+    salida = _correr(f'import sys; sys.path.insert(0, {RAIZ!r}); import app', '-X', 'importtime')
+    tiempos = []
+    for linea in salida.stderr.splitlines():
+        partes = linea.split('|')
+        if len(partes) != 3 or not partes[1].strip().isdigit():
+            continue
+        modulo = partes[2]
+        if len(modulo) - len(modulo.lstrip()) == 3:  # Importados por app.py (un nivel abajo)
+            tiempos.append((int(partes[1]) / 1000, modulo.strip()))
+    return sorted(tiempos, reverse=True)[:cantidad]
+
+
+def _resumen(nombre, valores):
+    valores = sorted(v * 1000 for v in valores)
+    print(f'{nombre:>15}: min {valores[0]:7.1f} ms  mediana {statistics.median(valores):7.1f} ms  '
+          f'max {valores[-1]:7.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corridas', type=int, default=10)
+    parser.add_argument('--modulos', type=int, default=10, help='módulos más lentos a mostrar (0 = ninguno)')
+    args = parser.parse_args()
+
+    if not os.getenv('DATABASE_URL'):
+        _preparar_base()
+
+    _correr(f'import sys; sys.path.insert(0, {RAIZ!r}); import app')  # Genera los .pyc
+    medidas = [json.loads(_correr(_MEDIR.format(raiz=RAIZ)).stdout.splitlines()[-1])
+               for _ in range(args.corridas)]
+
+    print(f'{args.corridas} arranques ({os.environ["DATABASE_URL"].split(":")[0]})')
+    _resumen('import app', [m['import'] for m in medidas])
+    _resumen('primer request', [m['primer_request'] for m in medidas])
+    _resumen('total', [m['import'] + m['primer_request'] for m in medidas])
+
+    if args.modulos:
+        print('\nImports más lentos (acumulado):')
+        for milisegundos, modulo in _modulos_lentos(args.modulos):
+            print(f'{milisegundos:9.1f} ms  {modulo}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Prueba de carga de las vistas principales con el cliente de pruebas de Flask.
+
+Recorre cada URL varias veces con un usuario con sesión, mide la latencia
+(p50/p90/p95/p99) y cuenta las consultas SQL por request. Con --guardar
+escribe los resultados como línea base; con una línea base existente marca
+las URLs cuyo p95 empeoró más de --tolerancia o que hacen más consultas.
+
+Uso:
+    python benchmarks/carga.py --escala 100k                      # base nueva con datos sintéticos
+    python benchmarks/carga.py --escala 100k --guardar            # guarda la línea base
+    DATABASE_URL=sqlite:////tmp/taller.db python benchmarks/carga.py --sin-generar
+
+Sin DATABASE_URL crea una base SQLite temporal y la llena con
+`flask sinteticos generar` (ver sinteticos.py). Regresa 1 si hay regresiones.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+LINEA_BASE = os.path.join(RAIZ, 'benchmarks', 'linea_base.json')
+MARGEN_MS = 2.0  # Diferencias menores no cuentan como regresión (ruido)
+
+
+def _urls(orden_id):
+    return [
+        '/clientes',
+        '/clientes?busqueda=garcia',
+        '/clientes?filtro_vehiculos=con_vehiculos',
+        '/vehiculos',
+        '/vehiculos?busqueda=nissan',
+        '/inventarios',
+        '/inventarios?filtro_stock=bajo',
+        '/inventarios?busqueda=filtro',
+        '/ordenes_servicio',
+        '/ordenes_servicio?estado=Pendiente',
+        '/ordenes_servicio?busqueda=hernandez',
+        f'/ordenes_servicio/{orden_id}',
+        '/ordenes_compra',
+        '/clientes/sugerencias?q=jos',
+        '/inventarios/sugerencias?q=bal',
+        f'/cotizacion/{orden_id}',
+        '/reportes',
+    ]
+
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    indice = (len(valores) - 1) * p / 100
+    bajo = int(indice)
+    alto = min(bajo + 1, len(valores) - 1)
+    return valores[bajo] + (valores[alto] - valores[bajo]) * (indice - bajo)
+
+
+def medir(cliente, url, repeticiones, consultas):
+    """Percentiles de latencia (ms) y consultas por request, o None si la URL no responde 200."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        respuesta = cliente.get(url)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        if respuesta.status_code != 200:
+            return None
+    return {
+        'p50': _percentil(tiempos, 50),
+        'p90': _percentil(tiempos, 90),
+        'p95': _percentil(tiempos, 95),
+        'p99': _percentil(tiempos, 99),
+        'promedio': statistics.fmean(tiempos),
+        'consultas': max(consultas[url]),
+    }
+
+
+def comparar(resultados, base, tolerancia):
+    """Lista de (url, motivo) de las URLs que empeoraron contra la línea base."""
+    regresiones = []
+    for url, actual in resultados.items():
+        anterior = base.get(url)
+        if anterior is None:
+            continue
+        if actual['p95'] > anterior['p95'] * (1 + tolerancia) and actual['p95'] - anterior['p95'] > MARGEN_MS:
+            regresiones.append((url, f"p95 {anterior['p95']:.1f} -> {actual['p95']:.1f} ms"))
+        if actual['consultas'] > anterior['consultas']:
+            regresiones.append((url, f"consultas {anterior['consultas']} -> {actual['consultas']}"))
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escala', default='1k', help='1k, 10k, 100k o 1m (datos sintéticos a generar)')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--sin-generar', action='store_true', help='usar los datos que ya tiene DATABASE_URL')
+    parser.add_argument('--repeticiones', type=int, default=30, help='requests por URL')
+    parser.add_argument('--linea-base', default=LINEA_BASE)
+    parser.add_argument('--guardar', action='store_true', help='guardar los resultados como línea base')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='aumento de p95 permitido (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    if not os.getenv('DATABASE_URL'):
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'carga.db')
+
+    from flask import g, request
+    from app import app
+    import arranque
+    import consultas as consultas_sql
+    import sinteticos
+    from extensions import db
+    from models import orden_trabajo_partes
+
+    consultas_sql.activar_conteo()  # g.consultas_sql en todas las vistas, no solo las de presupuesto
+
+    app.config['CACHE_HTTP'] = False  # Medir la vista completa, no el 304
+    with app.app_context():
+        arranque.inicializar()
+        arranque.sembrar()
+        if not args.sin_generar:
+            inicio = time.perf_counter()
+            conteo = sinteticos.generar(sinteticos.ESCALAS[args.escala], semilla=args.semilla)
+            print(f'Datos generados en {time.perf_counter() - inicio:.1f} s: {conteo}')
+        # Una orden con refacciones, para que detalle y cotización tengan qué pintar
+        orden_id = db.session.query(db.func.max(orden_trabajo_partes.c.orden_id)).scalar()
+    if orden_id is None:
+        raise SystemExit('No hay órdenes con refacciones; quita --sin-generar')
+
+    consultas = {}
+
+    @app.after_request
+    def _contar(respuesta):
+        consultas.setdefault(request.full_path.rstrip('?'), []).append(g.get('consultas_sql', 0))
+        return respuesta
+
+    cliente = app.test_client()
+    contrasena = os.getenv('ADMIN_PASSWORD') or arranque.ADMIN_CONTRASENA
+    cliente.post('/login', data={'username': arranque.ADMIN_USUARIO, 'password': contrasena})
+
+    resultados = {}
+    fallidas = []
+    for url in _urls(orden_id):
+        cliente.get(url)  # Calentar (compilar la plantilla, llenar cachés)
+        consultas.pop(url, None)
+        resultado = medir(cliente, url, args.repeticiones, consultas)
+        if resultado is None:
+            fallidas.append(url)
+        else:
+            resultados[url] = resultado
+
+    base = {}
+    if os.path.exists(args.linea_base):
+        with open(args.linea_base, encoding='utf-8') as f:
+            base = json.load(f)['resultados']
+
+    print(f'\n{"URL":45} {"p50":>8} {"p95":>8} {"p99":>8} {"SQL":>4} {"base p95":>9}')
+    for url, r in resultados.items():
+        anterior = f"{base[url]['p95']:9.1f}" if url in base else f'{"—":>9}'
+        print(f"{url[:45]:45} {r['p50']:8.1f} {r['p95']:8.1f} {r['p99']:8.1f} {r['consultas']:4} {anterior}")
+
+    regresiones = comparar(resultados, base, args.tolerancia)
+    regresiones += [(url, 'no respondió 200') for url in fallidas]
+    if args.guardar:
+        with open(args.linea_base, 'w', encoding='utf-8') as f:
+            json.dump({'escala': args.escala, 'repeticiones': args.repeticiones, 'resultados': resultados},
+                      f, indent=2, ensure_ascii=False)
+        print(f'\nLínea base guardada en {args.linea_base}')
+    if regresiones:
+        print('\nRegresiones:')
+        for url, motivo in regresiones:
+            print(f'  {url}: {motivo}')
+        sys.exit(1)
+    if base:
+        print('\nSin regresiones contra la línea base')
+
+
+if __name__ == '__main__':
+    main()
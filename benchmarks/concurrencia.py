@@ -0,0 +1,122 @@
+"""
+Prueba de concurrencia de escrituras con y sin el perfil de SQLite (basedatos.py).
+
+Varios procesos, como workers de gunicorn, registran entradas de almacén
+(UPDATE del stock + movimiento, una transacción por entrada) mientras leen
+el listado de órdenes, durante --segundos. Se mide cuántas escrituras se
+confirmaron por segundo, la latencia de cada una y cuántas fallaron con
+"database is locked".
+
+Uso:
+    python benchmarks/concurrencia.py --procesos 8 --segundos 10
+    DATABASE_URL=postgresql://... python benchmarks/concurrencia.py   # solo el perfil de pool
+
+Sin DATABASE_URL corre dos veces sobre bases SQLite temporales nuevas:
+SQLITE_WAL=0 (SQLite como viene) y el perfil de producción (WAL y pragmas).
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+def _preparar(escala):
+    from app import app
+    import arranque
+    import basedatos
+    import sinteticos
+    from extensions import db
+    from models import Inventario
+
+    with app.app_context():
+        arranque.inicializar()
+        sinteticos.generar(sinteticos.ESCALAS[escala], semilla=0)
+        ajustes = basedatos.ajustes_actuales()
+        piezas = [pieza_id for pieza_id, in db.session.query(Inventario.id)]
+        db.engine.dispose()
+    return ajustes, piezas
+
+
+def _trabajador(args):
+    from app import app
+    import almacen
+    from consultas import consulta_ordenes
+    from extensions import db
+    from sqlalchemy.exc import OperationalError
+
+    piezas, segundos, lecturas, semilla = args
+    aleatorio = random.Random(semilla)
+    latencias, fallidas = [], 0
+    with app.app_context():
+        fin = time.monotonic() + segundos
+        while time.monotonic() < fin:
+            for _ in range(lecturas):
+                consulta = consulta_ordenes()
+                consulta.order_by(None).count()
+                consulta.limit(15).all()
+                db.session.rollback()
+            inicio = time.perf_counter()
+            try:
+                almacen.entrada(aleatorio.choice(piezas), 1, nota='Prueba de concurrencia')
+                db.session.commit()
+                latencias.append((time.perf_counter() - inicio) * 1000)
+            except OperationalError:
+                db.session.rollback()
+                fallidas += 1
+    return latencias, fallidas
+
+
+def correr(args, nombre, entorno):
+    os.environ.update(entorno)
+    contexto = multiprocessing.get_context('spawn')  # Cada proceso importa la app con su entorno
+    with contexto.Pool(1) as pool:
+        ajustes, piezas = pool.apply(_preparar, (args.escala,))
+    tareas = [(piezas, args.segundos, args.lecturas, semilla) for semilla in range(args.procesos)]
+    with contexto.Pool(args.procesos) as pool:
+        resultados = pool.map(_trabajador, tareas)
+
+    latencias = sorted(latencia for parcial, _ in resultados for latencia in parcial)
+    fallidas = sum(fallas for _, fallas in resultados)
+    print(f'\n{nombre}')
+    if ajustes:
+        print('  ' + ', '.join(f'{pragma}={valor}' for pragma, valor in ajustes.items()))
+    if not latencias:
+        print(f'  0 escrituras confirmadas, {fallidas} fallidas')
+        return 0
+    p95 = latencias[int((len(latencias) - 1) * 0.95)]
+    por_segundo = len(latencias) / args.segundos
+    print(f'  {len(latencias)} escrituras ({por_segundo:.0f}/s), {fallidas} fallidas, '
+          f'latencia p50 {statistics.median(latencias):.1f} ms, p95 {p95:.1f} ms')
+    return por_segundo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--procesos', type=int, default=8)
+    parser.add_argument('--segundos', type=float, default=10)
+    parser.add_argument('--lecturas', type=int, default=2, help='lecturas del listado por cada escritura')
+    parser.add_argument('--escala', default='1k', help='datos sintéticos (ver sinteticos.py)')
+    args = parser.parse_args()
+
+    if os.getenv('DATABASE_URL'):
+        correr(args, os.getenv('DATABASE_URL').split('://')[0], {})
+        return
+
+    directorio = tempfile.mkdtemp()
+    sin_perfil = correr(args, 'SQLite como viene (SQLITE_WAL=0)', {
+        'DATABASE_URL': 'sqlite:///' + os.path.join(directorio, 'simple.db'), 'SQLITE_WAL': '0'})
+    con_perfil = correr(args, 'SQLite con perfil de producción', {
+        'DATABASE_URL': 'sqlite:///' + os.path.join(directorio, 'wal.db'), 'SQLITE_WAL': '1'})
+    if sin_perfil:
+        print(f'\nEscrituras por segundo: x{con_perfil / sin_perfil:.1f}')
+
+
+if __name__ == '__main__':
+    main()
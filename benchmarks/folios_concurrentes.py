@@ -0,0 +1,90 @@
+"""
+Prueba de estrés del asignador de folios (folios.py).
+
+Lanza varios procesos que crean órdenes de trabajo al mismo tiempo, como
+lo harían varios workers de gunicorn, y verifica que todas se guardaron y
+que ningún folio se repitió.
+
+Uso:
+    python benchmarks/folios_concurrentes.py --procesos 8 --ordenes 200 --bloque 1
+    DATABASE_URL=postgresql://... python benchmarks/folios_concurrentes.py
+
+Sin DATABASE_URL usa una base SQLite temporal.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+def _trabajador(args):
+    from app import app
+    from extensions import db
+    from models import OrdenTrabajo
+
+    vehiculo_id, cantidad, bloque = args
+    app.config['FOLIO_BLOQUE'] = bloque
+    with app.app_context():
+        db.engine.dispose(close=False)  # Conexiones propias en el proceso hijo
+        for _ in range(cantidad):
+            orden = OrdenTrabajo(vehiculo_id=vehiculo_id, falla_reportada='Prueba de estrés')
+            orden.generar_folio()
+            db.session.add(orden)
+            db.session.commit()
+    return cantidad
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--procesos', type=int, default=8)
+    parser.add_argument('--ordenes', type=int, default=200, help='órdenes por proceso')
+    parser.add_argument('--bloque', type=int, default=1, help='FOLIO_BLOQUE (números reservados por vez)')
+    args = parser.parse_args()
+
+    if not os.getenv('DATABASE_URL'):
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'folios.db')
+
+    from app import app
+    from extensions import db
+    from models import Cliente, Vehiculo, OrdenTrabajo
+
+    with app.app_context():
+        db.create_all()
+        cliente = Cliente(nombre='Estrés')
+        db.session.add(cliente)
+        db.session.flush()
+        vehiculo = Vehiculo(marca='X', modelo='Y', ano=2020, placa=f'EST-{os.getpid()}', cliente_id=cliente.id)
+        db.session.add(vehiculo)
+        db.session.commit()
+        vehiculo_id = vehiculo.id
+        previas = OrdenTrabajo.query.count()
+        db.engine.dispose()
+
+    inicio = time.perf_counter()
+    contexto = multiprocessing.get_context('fork')
+    with contexto.Pool(args.procesos) as pool:
+        creadas = sum(pool.map(_trabajador, [(vehiculo_id, args.ordenes, args.bloque)] * args.procesos))
+    duracion = time.perf_counter() - inicio
+
+    with app.app_context():
+        total = OrdenTrabajo.query.count() - previas
+        distintos = db.session.query(db.func.count(db.distinct(OrdenTrabajo.folio))).filter(
+            OrdenTrabajo.vehiculo_id == vehiculo_id
+        ).scalar()
+
+    print(f'{creadas} órdenes en {duracion:.2f}s ({creadas / duracion:.0f}/s) '
+          f'con {args.procesos} procesos, bloque={args.bloque}')
+    print(f'guardadas={total} folios_distintos={distintos}')
+    if total != creadas or distintos != creadas:
+        print('ERROR: faltan órdenes o hay folios repetidos')
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Tiempo de render de plantillas con y sin caché de fragmentos (fragmentos.py).
+
+Pinta cada vista --repeticiones veces con CACHE_FRAGMENTOS
+apagado y luego encendido, y reporta por vista el tiempo de render de la
+plantilla (de before_render_template a template_rendered, incluye las
+consultas que se hagan desde la plantilla) y el del request completo.
+
+Uso:
+    python benchmarks/plantillas.py --escala 10k
+    DATABASE_URL=sqlite:////tmp/taller.db python benchmarks/plantillas.py --sin-generar
+
+Sin DATABASE_URL crea una base SQLite temporal con datos sintéticos.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+def _urls(orden_id):
+    # El listado y el detalle no usan fragmentos (se pintan en ~1 ms); quedan como referencia
+    return ['/tablero', '/ordenes_servicio', f'/ordenes_servicio/{orden_id}']
+
+
+def medir(cliente, url, repeticiones, renders):
+    """(mediana de render, mediana del request) en ms."""
+    cliente.get(url)  # Calentar: compilar la plantilla y llenar la caché si está encendida
+    renders.clear()
+    totales = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        respuesta = cliente.get(url)
+        totales.append((time.perf_counter() - inicio) * 1000)
+        if respuesta.status_code != 200:
+            raise SystemExit(f'{url} respondió {respuesta.status_code}')
+    return statistics.median(renders), statistics.median(totales)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escala', default='1k', help='1k, 10k, 100k o 1m (datos sintéticos a generar)')
+    parser.add_argument('--sin-generar', action='store_true', help='usar los datos que ya tiene DATABASE_URL')
+    parser.add_argument('--repeticiones', type=int, default=50)
+    args = parser.parse_args()
+
+    if not os.getenv('DATABASE_URL'):
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'plantillas.db')
+
+    from flask import before_render_template, template_rendered
+    from app import app
+    import arranque
+    import fragmentos
+    import sinteticos
+    from extensions import db
+    from models import orden_trabajo_partes
+
+    app.config['CACHE_HTTP'] = False  # Medir la vista completa, no el 304
+    with app.app_context():
+        arranque.inicializar()
+        arranque.sembrar()
+        if not args.sin_generar:
+            sinteticos.generar(sinteticos.ESCALAS[args.escala], semilla=0)
+        orden_id = db.session.query(db.func.max(orden_trabajo_partes.c.orden_id)).scalar()
+    if orden_id is None:
+        raise SystemExit('No hay órdenes con refacciones; quita --sin-generar')
+
+    renders, inicio_render = [], []
+    before_render_template.connect(lambda *a, **k: inicio_render.append(time.perf_counter()), app, weak=False)
+    template_rendered.connect(
+        lambda *a, **k: renders.append((time.perf_counter() - inicio_render.pop()) * 1000), app, weak=False)
+
+    cliente = app.test_client()
+    contrasena = os.getenv('ADMIN_PASSWORD') or arranque.ADMIN_CONTRASENA
+    cliente.post('/login', data={'username': arranque.ADMIN_USUARIO, 'password': contrasena})
+
+    resultados = {}
+    for activa in (False, True):
+        app.config['CACHE_FRAGMENTOS'] = activa
+        fragmentos.limpiar()
+        for url in _urls(orden_id):
+            resultados[url, activa] = medir(cliente, url, args.repeticiones, renders)
+
+    print(f'\n{"URL":32} {"render sin":>11} {"render con":>11} {"request sin":>12} {"request con":>12}')
+    for url in _urls(orden_id):
+        (render_sin, total_sin), (render_con, total_con) = resultados[url, False], resultados[url, True]
+        print(f'{url:32} {render_sin:9.2f}ms {render_con:9.2f}ms {total_sin:10.2f}ms {total_con:10.2f}ms')
+    print(f'\nCaché: {fragmentos.estadisticas()}')
+
+
+if __name__ == '__main__':
+    main()
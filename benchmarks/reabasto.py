@@ -0,0 +1,74 @@
+"""
+Tiempo de `flask reabasto sugerir` con un catálogo grande (ver reabasto.py).
+
+Crea una base SQLite temporal con --piezas piezas y --ordenes órdenes de las
+últimas --semanas semanas (tres refacciones por orden), y mide el cálculo
+de puntos de reorden y la escritura de las órdenes de compra sugeridas.
+
+Uso:
+    python benchmarks/reabasto.py --piezas 100000 --ordenes 200000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--piezas', type=int, default=100_000)
+    parser.add_argument('--ordenes', type=int, default=200_000)
+    parser.add_argument('--semanas', type=int, default=26)
+    parser.add_argument('--proveedores', type=int, default=40)
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'reabasto.db')
+
+    from sqlalchemy import text
+    from app import app
+    import arranque
+    import reabasto
+    from extensions import db
+    from models import Cliente, Inventario, OrdenTrabajo, Vehiculo, orden_trabajo_partes
+
+    rnd = random.Random(args.semilla)
+    ahora = datetime.utcnow()
+    with app.app_context():
+        arranque.inicializar()
+        inicio = time.perf_counter()
+        db.session.execute(Cliente.__table__.insert(), [{'id': 1, 'nombre': 'Cliente de prueba'}])
+        db.session.execute(Vehiculo.__table__.insert(), [
+            {'id': 1, 'marca': 'Nissan', 'modelo': 'Tsuru', 'ano': 2010, 'placa': 'PRUEBA', 'cliente_id': 1}])
+        db.session.execute(Inventario.__table__.insert(), [
+            {'id': i, 'nombre_parte': f'Pieza {i}', 'cantidad': rnd.randint(0, 30), 'costo': 10.0, 'precio': 20.0,
+             'proveedor': f'Proveedor {i % args.proveedores}'} for i in range(1, args.piezas + 1)])
+        dias = args.semanas * 7
+        db.session.execute(OrdenTrabajo.__table__.insert(), [
+            {'id': i, 'vehiculo_id': 1, 'falla_reportada': 'Servicio', 'estado': 'Completado', 'version': 0,
+             'fecha_creacion': ahora - timedelta(days=rnd.random() * dias)} for i in range(1, args.ordenes + 1)])
+        db.session.execute(orden_trabajo_partes.insert(), [
+            {'orden_id': orden, 'parte_id': parte, 'cantidad_usada': rnd.randint(1, 4), 'precio_unitario': 20.0}
+            for orden in range(1, args.ordenes + 1) for parte in rnd.sample(range(1, args.piezas + 1), 3)])
+        db.session.commit()
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+        print(f'Datos generados en {time.perf_counter() - inicio:.1f} s')
+
+        inicio = time.perf_counter()
+        datos = reabasto.calcular(args.semanas)
+        print(f'Cálculo: {time.perf_counter() - inicio:.2f} s para {len(datos["ids"])} piezas')
+        resultado = reabasto.sugerir(args.semanas)
+        db.session.commit()
+        print(f'Sugerencias: {resultado.segundos:.2f} s, {resultado.sugeridas} piezas por pedir '
+              f'en {resultado.ordenes} órdenes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+# busqueda.py
+# Búsqueda indexada para clientes, vehículos, inventario y órdenes.
+#
+# - SQLite: tablas FTS5 de contenido externo (cliente_fts, vehiculo_fts,
+#   inventario_fts, orden_trabajo_fts) mantenidas por triggers. El tokenizer
+#   unicode61 con remove_diacritics ignora acentos ("jose" encuentra "José")
+#   y cada palabra se busca por prefijo: "pér" encuentra "Pérez", pero
+#   "4567" ya no encuentra "8711234567" (LIKE '%texto%' sí lo hacía). Los
+#   listados lo avisan junto al buscador (`busqueda_por_prefijo`).
+# - PostgreSQL: índices GIN trigram sobre f_unaccent(columna), que sirven
+#   para ILIKE '%texto%' sin recorrer la tabla completa.
+# - Otros motores: ILIKE sin índice (comportamiento original).
+#
+# Las triggers y los índices se mantienen solos en cada INSERT/UPDATE/DELETE,
+# incluidas las cargas masivas. `flask busqueda reconstruir` regenera los
+# índices FTS desde las tablas base (p. ej. después de restaurar un respaldo).
+import re
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import column, func, select, text
+
+from extensions import db
+from models import Cliente, Vehiculo, Inventario, OrdenTrabajo
+
+# tabla -> columnas indexadas
+TABLAS = {
+    'cliente': ('nombre', 'telefono', 'email'),
+    'vehiculo': ('placa', 'marca', 'modelo'),
+    'inventario': ('nombre_parte', 'numero_parte'),
+    'orden_trabajo': ('folio',),
+}
+
+_PALABRAS = re.compile(r'\w+', re.UNICODE)
+
+
+def _dialecto():
+    return db.session.get_bind().dialect.name
+
+
+# ────────────────────────────────────────────────
+#                 Instalación (DDL)
+# ────────────────────────────────────────────────
+
+def _ddl_sqlite():
+    sentencias = []
+    for tabla, columnas in TABLAS.items():
+        fts = f'{tabla}_fts'
+        cols = ', '.join(columnas)
+        nuevos = ', '.join(f'new.{c}' for c in columnas)
+        viejos = ', '.join(f'old.{c}' for c in columnas)
+        sentencias += [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{tabla}', "
+            f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabla} BEGIN "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {nuevos}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabla} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {viejos}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {tabla} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {viejos}); "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {nuevos}); END",
+        ]
+    return sentencias
+
+
+def _ddl_postgresql():
+    sentencias = [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        'CREATE EXTENSION IF NOT EXISTS unaccent',
+        # unaccent() no es IMMUTABLE; el envoltorio permite usarla en índices
+        "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text AS "
+        "$$ SELECT public.unaccent('public.unaccent', $1) $$ "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT",
+    ]
+    for tabla, columnas in TABLAS.items():
+        for c in columnas:
+            sentencias.append(
+                f'CREATE INDEX IF NOT EXISTS ix_{tabla}_{c}_trgm ON {tabla} '
+                f'USING gin (f_unaccent({c}) gin_trgm_ops)'
+            )
+    return sentencias
+
+
+def ddl(dialecto):
+    """Sentencias para crear los índices de búsqueda en el motor indicado."""
+    if dialecto == 'sqlite':
+        return _ddl_sqlite()
+    if dialecto == 'postgresql':
+        return _ddl_postgresql()
+    return []
+
+
+def instalar(reconstruir=False):
+    """Crea (si no existen) los índices de búsqueda del motor actual."""
+    dialecto = _dialecto()
+    for sentencia in ddl(dialecto):
+        db.session.execute(text(sentencia))
+    if reconstruir and dialecto == 'sqlite':
+        for tabla in TABLAS:
+            db.session.execute(text(f"INSERT INTO {tabla}_fts({tabla}_fts) VALUES ('rebuild')"))
+    db.session.commit()
+
+
+# ────────────────────────────────────────────────
+#                     Filtros
+# ────────────────────────────────────────────────
+
+def _expresion_fts(termino):
+    """'José Pé' -> '"José"* "Pé"*' (cada palabra por prefijo, todas requeridas)."""
+    palabras = _PALABRAS.findall(termino)
+    return ' '.join('"{}"*'.format(p.replace('"', '""')) for p in palabras)
+
+
+def _ids_fts(tabla, expresion, columna=None):
+    """Subconsulta con los ids de `tabla` que cumplen la expresión FTS."""
+    if columna:
+        expresion = f'{columna} : ({expresion})'
+    parametro = f'q_{tabla}_{columna or "todo"}'
+    return text(
+        f'SELECT rowid FROM {tabla}_fts WHERE {tabla}_fts MATCH :{parametro}'
+    ).bindparams(**{parametro: expresion}).columns(column('rowid'))
+
+
+def _coincide(col, termino, dialecto):
+    patron = '%' + termino.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    if dialecto == 'postgresql':
+        return func.f_unaccent(col).ilike(func.f_unaccent(patron), escape='\\')
+    return col.ilike(patron, escape='\\')
+
+
+def filtrar_clientes(query, termino):
+    """Filtra por nombre, teléfono o email."""
+    dialecto = _dialecto()
+    if dialecto == 'sqlite':
+        expresion = _expresion_fts(termino)
+        return query.filter(Cliente.id.in_(_ids_fts('cliente', expresion))) if expresion else query
+    return query.filter(db.or_(*(
+        _coincide(c, termino, dialecto) for c in (Cliente.nombre, Cliente.telefono, Cliente.email)
+    )))
+
+
+def filtrar_vehiculos(query, termino):
+    """Filtra por placa, marca o modelo."""
+    dialecto = _dialecto()
+    if dialecto == 'sqlite':
+        expresion = _expresion_fts(termino)
+        return query.filter(Vehiculo.id.in_(_ids_fts('vehiculo', expresion))) if expresion else query
+    return query.filter(db.or_(*(
+        _coincide(c, termino, dialecto) for c in (Vehiculo.placa, Vehiculo.marca, Vehiculo.modelo)
+    )))
+
+
+def filtrar_inventario(query, termino):
+    """Filtra por nombre o número de parte."""
+    dialecto = _dialecto()
+    if dialecto == 'sqlite':
+        expresion = _expresion_fts(termino)
+        return query.filter(Inventario.id.in_(_ids_fts('inventario', expresion))) if expresion else query
+    return query.filter(db.or_(*(
+        _coincide(c, termino, dialecto) for c in (Inventario.nombre_parte, Inventario.numero_parte)
+    )))
+
+
+def filtrar_ordenes(query, termino):
+    """
+    Filtra por folio, placa o nombre del cliente. Cada rama se resuelve con
+    el índice de su propia tabla y se combina por id, sin el doble JOIN.
+    """
+    dialecto = _dialecto()
+    if dialecto == 'sqlite':
+        expresion = _expresion_fts(termino)
+        if not expresion:
+            return query
+        por_folio = _ids_fts('orden_trabajo', expresion)
+        por_placa = _ids_fts('vehiculo', expresion, columna='placa')
+        por_cliente = select(Vehiculo.id).where(
+            Vehiculo.cliente_id.in_(_ids_fts('cliente', expresion, columna='nombre'))
+        )
+    else:
+        por_folio = select(OrdenTrabajo.id).where(_coincide(OrdenTrabajo.folio, termino, dialecto))
+        por_placa = select(Vehiculo.id).where(_coincide(Vehiculo.placa, termino, dialecto))
+        por_cliente = select(Vehiculo.id).where(Vehiculo.cliente_id.in_(
+            select(Cliente.id).where(_coincide(Cliente.nombre, termino, dialecto))
+        ))
+    return query.filter(db.or_(
+        OrdenTrabajo.id.in_(por_folio),
+        OrdenTrabajo.vehiculo_id.in_(por_placa),
+        OrdenTrabajo.vehiculo_id.in_(por_cliente),
+    ))
+
+
+def init_app(app):
+    """`busqueda_por_prefijo` en las plantillas: True si la base busca por inicio de palabra (SQLite)."""
+    with app.app_context():
+        dialecto = db.engine.dialect.name
+    app.jinja_env.globals['busqueda_por_prefijo'] = dialecto == 'sqlite'
+
+
+# ────────────────────────────────────────────────
+#                  Comandos CLI
+# ────────────────────────────────────────────────
+
+cli = AppGroup('busqueda', help='Índices de búsqueda de texto.')
+
+
+@cli.command('instalar')
+def instalar_comando():
+    """Crea los índices/triggers de búsqueda si no existen."""
+    instalar()
+    click.echo(f'Índices de búsqueda instalados ({_dialecto()})')
+
+
+@cli.command('reconstruir')
+def reconstruir_comando():
+    """Regenera los índices FTS desde las tablas base."""
+    instalar(reconstruir=True)
+    click.echo('Índices de búsqueda reconstruidos')
@@ -0,0 +1,116 @@
+# compras.py
+# Partidas de las órdenes de compra.
+#
+# - Una orden se captura con todas sus partidas en un solo POST (listas
+#   parte_id / cantidad / costo_unitario) y se guardan con un INSERT
+#   executemany. El total de la orden es la suma de sus partidas, en SQL.
+# - Al recibir, lo que de verdad llegó (cantidades y costos de la factura)
+#   se aplica con un UPDATE executemany sobre las partidas; las que llegan
+#   en cero se quedan sin entrada. La entrada al stock es almacen.recibir().
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy import Float, Numeric, bindparam, cast, func, insert, select, update
+
+from extensions import db
+from models import Inventario, OrdenCompra, PartidaCompra
+
+Partida = namedtuple('Partida', 'parte_id cantidad costo_unitario')
+Linea = namedtuple('Linea', 'parte_id nombre_parte numero_parte existencia cantidad costo_unitario importe')
+
+
+def _numero(valor, tipo, nombre, renglon):
+    try:
+        return tipo(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f'Partida {renglon}: {nombre} inválido')
+
+
+def leer_partidas(formulario, permitir_cero=False):
+    """
+    Partidas de un formulario con listas paralelas `parte_id`, `cantidad` y
+    `costo_unitario` (costo vacío = None). Los renglones sin pieza se ignoran.
+    ValueError con el renglón si una cantidad o costo no es válido o si la
+    pieza ya venía en otro renglón (cada partida lleva su propio costo);
+    cantidad cero solo con `permitir_cero`.
+    """
+    partes = formulario.getlist('parte_id')
+    cantidades = formulario.getlist('cantidad')
+    costos = formulario.getlist('costo_unitario')
+    partidas = OrderedDict()
+    renglones = {}  # parte_id -> renglón donde apareció
+    for renglon, parte_id in enumerate(partes, start=1):
+        if not parte_id.strip():
+            continue
+        parte_id = _numero(parte_id, int, 'pieza', renglon)
+        cantidad = _numero(cantidades[renglon - 1] if renglon <= len(cantidades) else None, int, 'cantidad', renglon)
+        if cantidad < 0 or (cantidad == 0 and not permitir_cero):
+            raise ValueError(f'Partida {renglon}: la cantidad debe ser mayor que cero')
+        costo = costos[renglon - 1].strip() if renglon <= len(costos) else ''
+        costo = _numero(costo, float, 'costo', renglon) if costo else None
+        if costo is not None and costo < 0:
+            raise ValueError(f'Partida {renglon}: el costo no puede ser negativo')
+        if parte_id in renglones:
+            raise ValueError(f'Partida {renglon}: la pieza ya está en la partida {renglones[parte_id]}; '
+                             'junta las cantidades en un solo renglón')
+        renglones[parte_id] = renglon
+        partidas[parte_id] = Partida(parte_id, cantidad, costo)
+    return list(partidas.values())
+
+
+def _actualizar_total(orden_compra_id):
+    importe = func.sum(PartidaCompra.cantidad * PartidaCompra.costo_unitario)
+    db.session.execute(
+        update(OrdenCompra)
+        .where(OrdenCompra.id == orden_compra_id)
+        .values(total=select(func.coalesce(func.round(cast(importe, Numeric), 2, type_=Float), 0))
+                .where(PartidaCompra.orden_compra_id == orden_compra_id)
+                .scalar_subquery())
+    )
+
+
+def agregar_partidas(orden_compra_id, partidas):
+    """
+    Guarda las partidas de una orden nueva (sin costo: el costo actual de la
+    pieza) y su total. LookupError si alguna pieza no existe.
+    """
+    costos = dict(db.session.execute(
+        select(Inventario.id, Inventario.costo).where(Inventario.id.in_([p.parte_id for p in partidas]))
+    ).all())
+    faltantes = [p.parte_id for p in partidas if p.parte_id not in costos]
+    if faltantes:
+        raise LookupError(f"Piezas que no existen: {', '.join(map(str, faltantes))}")
+    db.session.execute(insert(PartidaCompra.__table__), [
+        {'orden_compra_id': orden_compra_id, 'parte_id': p.parte_id, 'cantidad': p.cantidad,
+         'costo_unitario': p.costo_unitario if p.costo_unitario is not None else costos[p.parte_id] or 0}
+        for p in partidas
+    ])
+    _actualizar_total(orden_compra_id)
+
+
+def ajustar_partidas(orden_compra_id, partidas):
+    """
+    Cantidades y costos recibidos de partidas que ya están en la orden (las
+    demás se ignoran); sin costo se conserva el de la orden. Recalcula el total.
+    """
+    if partidas:
+        db.session.execute(
+            update(PartidaCompra.__table__)
+            .where(PartidaCompra.orden_compra_id == orden_compra_id,
+                   PartidaCompra.parte_id == bindparam('_parte_id'))
+            .values(cantidad=bindparam('_cantidad'),
+                    costo_unitario=func.coalesce(bindparam('_costo', type_=Float), PartidaCompra.costo_unitario)),
+            [{'_parte_id': p.parte_id, '_cantidad': p.cantidad, '_costo': p.costo_unitario} for p in partidas]
+        )
+    _actualizar_total(orden_compra_id)
+
+
+def lineas(orden_compra_id):
+    """Partidas de la orden con el nombre y la existencia actual de cada pieza."""
+    return [Linea(*fila) for fila in db.session.execute(
+        select(PartidaCompra.parte_id, Inventario.nombre_parte, Inventario.numero_parte, Inventario.cantidad,
+               PartidaCompra.cantidad, PartidaCompra.costo_unitario,
+               PartidaCompra.cantidad * PartidaCompra.costo_unitario)
+        .join(Inventario, Inventario.id == PartidaCompra.parte_id)
+        .where(PartidaCompra.orden_compra_id == orden_compra_id)
+        .order_by(Inventario.nombre_parte, PartidaCompra.parte_id)
+    )]
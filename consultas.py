@@ -0,0 +1,223 @@
+# consultas.py
+# Consultas de los listados (clientes, vehículos, inventario y órdenes).
+# Cada listado se carga en una sola consulta: las relaciones que pinta la
+# plantilla van con joined loading y los conteos por fila se calculan en SQL.
+from datetime import date, datetime, time, timedelta
+from functools import wraps
+
+from flask import current_app, g, has_request_context
+from sqlalchemy import desc, event, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import contains_eager, joinedload, load_only
+
+import busqueda
+from extensions import db
+from models import Cliente, Vehiculo, Inventario, OrdenTrabajo, OrdenCompra
+from paginacion import paginar
+
+
+def consulta_clientes(texto='', filtro_vehiculos='todos'):
+    """Clientes con `num_vehiculos` calculado como subconsulta correlacionada."""
+    num_vehiculos = (
+        select(func.count(Vehiculo.id))
+        .where(Vehiculo.cliente_id == Cliente.id)
+        .correlate(Cliente)
+        .scalar_subquery()
+    )
+    query = Cliente.query.options(db.with_expression(Cliente.num_vehiculos, num_vehiculos))
+
+    # Búsqueda por nombre, teléfono o email
+    if texto:
+        query = busqueda.filtrar_clientes(query, texto)
+
+    # Filtro por si tiene vehículos o no (EXISTS en vez de GROUP BY/HAVING)
+    if filtro_vehiculos == 'con_vehiculos':
+        query = query.filter(Cliente.vehiculos.any())
+    elif filtro_vehiculos == 'sin_vehiculos':
+        query = query.filter(~Cliente.vehiculos.any())
+
+    return query.order_by(Cliente.nombre.asc())
+
+
+def consulta_vehiculos(texto='', filtro_cliente='todos'):
+    """Vehículos con su cliente precargado y `num_ordenes` calculado en SQL."""
+    num_ordenes = (
+        select(func.count(OrdenTrabajo.id))
+        .where(OrdenTrabajo.vehiculo_id == Vehiculo.id)
+        .correlate(Vehiculo)
+        .scalar_subquery()
+    )
+    query = Vehiculo.query.options(
+        joinedload(Vehiculo.cliente),
+        db.with_expression(Vehiculo.num_ordenes, num_ordenes),
+    )
+
+    # Búsqueda por placa, marca, modelo
+    if texto:
+        query = busqueda.filtrar_vehiculos(query, texto)
+
+    # Filtro por cliente específico
+    if filtro_cliente != 'todos':
+        try:
+            query = query.filter(Vehiculo.cliente_id == int(filtro_cliente))
+        except ValueError:
+            pass
+
+    return query.order_by(Vehiculo.placa.asc())
+
+
+def filtrar_inventario(query, texto='', filtro_stock='todos'):
+    """Filtros del listado de inventario; sirve igual para Query que para select()."""
+    if texto:
+        query = busqueda.filtrar_inventario(query, texto)
+
+    if filtro_stock == 'con_stock':
+        query = query.filter(Inventario.cantidad > 0)
+    elif filtro_stock == 'bajo':
+        query = query.filter(Inventario.cantidad <= 20, Inventario.cantidad > 0)
+    elif filtro_stock == 'critico':
+        query = query.filter(Inventario.cantidad <= 5)
+    return query
+
+
+def consulta_inventario(texto='', filtro_stock='todos'):
+    """Piezas del inventario filtradas por texto y nivel de stock."""
+    return filtrar_inventario(Inventario.query, texto, filtro_stock).order_by(Inventario.id.desc())
+
+
+def _rango_fechas(query, columna, desde=None, hasta=None):
+    # `hasta` es inclusiva: se compara contra el inicio del día siguiente
+    if desde:
+        query = query.filter(columna >= datetime.combine(desde, time.min))
+    if hasta:
+        query = query.filter(columna < datetime.combine(hasta + timedelta(days=1), time.min))
+    return query
+
+
+def filtrar_ordenes(query, estado='todas', texto='', desde=None, hasta=None):
+    """Filtros del listado de órdenes (la consulta ya debe incluir el JOIN a vehículo y cliente)."""
+    if estado != 'todas':
+        query = query.filter(OrdenTrabajo.estado == estado)
+
+    if texto:
+        query = busqueda.filtrar_ordenes(query, texto)
+
+    return _rango_fechas(query, OrdenTrabajo.fecha_creacion, desde, hasta)
+
+
+def consulta_ordenes(estado='todas', texto='', desde=None, hasta=None):
+    """Órdenes con vehículo y cliente cargados en el mismo JOIN."""
+    query = (
+        OrdenTrabajo.query
+        .join(OrdenTrabajo.vehiculo)
+        .join(Vehiculo.cliente)
+        .options(contains_eager(OrdenTrabajo.vehiculo).contains_eager(Vehiculo.cliente))
+    )
+    query = filtrar_ordenes(query, estado, texto, desde, hasta)
+    return query.order_by(desc(OrdenTrabajo.fecha_creacion))
+
+
+def filtrar_compras(query, proveedor='', desde=None, hasta=None):
+    if proveedor:
+        query = query.filter(OrdenCompra.proveedor.ilike(f'%{proveedor}%'))
+    return _rango_fechas(query, OrdenCompra.fecha, desde, hasta)
+
+
+def consulta_compras(proveedor='', desde=None, hasta=None):
+    """Órdenes de compra filtradas por proveedor y rango de fechas."""
+    return filtrar_compras(OrdenCompra.query, proveedor, desde, hasta).order_by(OrdenCompra.id.desc())
+
+
+# ────────────────────────────────────────────────
+#          Autocompletado (ver /*/sugerencias)
+# ────────────────────────────────────────────────
+
+LIMITE_SUGERENCIAS = 10
+MAX_SUGERENCIAS = 50
+
+
+def _limite_sugerencias(limite):
+    try:
+        return max(1, min(int(limite), MAX_SUGERENCIAS))
+    except (TypeError, ValueError):
+        return LIMITE_SUGERENCIAS
+
+
+def sugerencias_clientes(texto='', cursor=None, limite=None):
+    """
+    Página de clientes cuyo nombre, teléfono o email empieza con las palabras
+    de `texto` (índice de búsqueda), ordenados por nombre con cursor.
+    """
+    query = Cliente.query.options(load_only(Cliente.id, Cliente.nombre, Cliente.telefono))
+    if texto:
+        query = busqueda.filtrar_clientes(query, texto)
+    return paginar(query, [Cliente.nombre, Cliente.id], cursor=cursor, por_pagina=_limite_sugerencias(limite))
+
+
+def sugerencias_partes(texto='', cursor=None, limite=None, solo_con_stock=False):
+    """Igual que sugerencias_clientes, para piezas del inventario (por nombre o número de parte)."""
+    query = Inventario.query.options(
+        load_only(Inventario.id, Inventario.nombre_parte, Inventario.numero_parte, Inventario.cantidad)
+    ).filter(Inventario.nombre_parte.isnot(None))
+    if texto:
+        query = busqueda.filtrar_inventario(query, texto)
+    if solo_con_stock:
+        query = query.filter(Inventario.cantidad > 0)
+    return paginar(query, [Inventario.nombre_parte, Inventario.id], cursor=cursor,
+                   por_pagina=_limite_sugerencias(limite))
+
+
+def fecha_param(valor):
+    """Fecha de un parámetro del query string (AAAA-MM-DD) o None si no es válida."""
+    try:
+        return date.fromisoformat(valor) if valor else None
+    except ValueError:
+        return None
+
+
+# ────────────────────────────────────────────────
+#        Presupuesto de consultas por vista
+# ────────────────────────────────────────────────
+
+class PresupuestoConsultasExcedido(AssertionError):
+    """Una vista ejecutó más consultas SQL de las permitidas."""
+
+
+def _contar_consulta(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.consultas_sql = g.get('consultas_sql', 0) + 1
+
+
+def activar_conteo():
+    """
+    Cuenta las consultas de cada request en g.consultas_sql. Se registra
+    solo al verificar presupuestos (pruebas, benchmarks): en producción no
+    hay listener por consulta.
+    """
+    if not event.contains(Engine, 'before_cursor_execute', _contar_consulta):
+        event.listen(Engine, 'before_cursor_execute', _contar_consulta)
+
+
+def presupuesto_consultas(maximo):
+    """
+    Limita las consultas SQL que puede ejecutar una vista (incluye el render).
+    Solo se verifica con VERIFICAR_PRESUPUESTO_CONSULTAS o en modo testing,
+    así una regresión N+1 rompe las pruebas en vez de llegar a producción.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            verificar = current_app.config.get('VERIFICAR_PRESUPUESTO_CONSULTAS', current_app.testing)
+            if not verificar:
+                return vista(*args, **kwargs)
+            activar_conteo()
+            inicio = g.get('consultas_sql', 0)
+            respuesta = vista(*args, **kwargs)
+            usadas = g.get('consultas_sql', 0) - inicio
+            if usadas > maximo:
+                raise PresupuestoConsultasExcedido(
+                    f'{vista.__name__} ejecutó {usadas} consultas (máximo {maximo})'
+                )
+            return respuesta
+        return envoltura
+    return decorador
@@ -0,0 +1,189 @@
+# contadores.py
+# Contadores de los tableros (órdenes, inventario, clientes) en caché con TTL.
+# Se calculan con una o dos consultas agregadas por grupo y se invalidan al
+# hacer commit de escrituras que los afectan (estado de órdenes, cantidad de
+# piezas, altas/bajas). La caché es por proceso: con varios workers de
+# gunicorn, el TTL (CONTADORES_TTL) acota lo desactualizado que puede estar
+# un worker que no hizo la escritura.
+#
+# Los totales de listados filtrados se guardan por texto de búsqueda: la
+# caché es un LRU de hasta CONTADORES_MAX entradas y las vencidas se sacan
+# al consultarlas, así no crece con cada búsqueda distinta.
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import case, event, func, inspect
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import Cliente, Vehiculo, Inventario, OrdenTrabajo, OrdenCompra, MovimientoInventario
+
+TTL_POR_DEFECTO = 30  # segundos
+MAX_POR_DEFECTO = 500  # entradas en caché por proceso
+
+_candado = threading.Lock()
+_cache = OrderedDict()  # grupo o (grupo, clave) -> (expira, dia, valores)
+
+
+def _contar_ordenes():
+    por_estado = dict(
+        db.session.query(OrdenTrabajo.estado, func.count(OrdenTrabajo.id))
+        .group_by(OrdenTrabajo.estado)
+        .all()
+    )
+    completadas_hoy = OrdenTrabajo.query.filter(
+        OrdenTrabajo.estado == 'Completado',
+        OrdenTrabajo.fecha_entrega == date.today()
+    ).count()
+    pendientes = por_estado.get('Pendiente', 0)
+    en_progreso = por_estado.get('En progreso', 0)
+    return {
+        'pendientes': pendientes,
+        'en_progreso': en_progreso,
+        'completadas_hoy': completadas_hoy,
+        'abiertas': pendientes + en_progreso,
+    }
+
+
+def _contar_inventario():
+    fila = db.session.query(
+        func.count(Inventario.id),
+        func.coalesce(func.sum(Inventario.cantidad * Inventario.precio), 0),
+        func.coalesce(func.sum(case((Inventario.cantidad.between(1, 20), 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Inventario.cantidad <= 5, 1), else_=0)), 0),
+    ).one()
+    return {
+        'total_piezas': fila[0],
+        'valor_stock': fila[1],
+        'bajo_stock': fila[2],
+        'critico_stock': fila[3],
+    }
+
+
+def _contar_clientes():
+    total_clientes = db.session.query(func.count(Cliente.id)).scalar()
+    total_vehiculos, con_vehiculos = db.session.query(
+        func.count(Vehiculo.id),
+        func.count(Vehiculo.cliente_id.distinct())
+    ).one()
+    return {
+        'total_clientes': total_clientes,
+        'con_vehiculos': con_vehiculos,
+        'sin_vehiculos': total_clientes - con_vehiculos,
+        'total_vehiculos': total_vehiculos,
+    }
+
+
+_GRUPOS = {
+    'ordenes': _contar_ordenes,
+    'inventario': _contar_inventario,
+    'clientes': _contar_clientes,
+}
+
+
+def _en_cache(llave, calcular):
+    ahora = time.monotonic()
+    hoy = date.today()
+    with _candado:
+        entrada = _cache.get(llave)
+        if entrada and entrada[0] > ahora and entrada[1] == hoy:
+            _cache.move_to_end(llave)
+            return entrada[2]
+        if entrada:
+            del _cache[llave]  # Vencida
+
+    valores = calcular()
+    ttl = current_app.config.get('CONTADORES_TTL', TTL_POR_DEFECTO)
+    maximo = current_app.config.get('CONTADORES_MAX', MAX_POR_DEFECTO)
+    with _candado:
+        _cache[llave] = (ahora + ttl, hoy, valores)
+        _cache.move_to_end(llave)
+        while len(_cache) > maximo:
+            _cache.popitem(last=False)
+    return valores
+
+
+def obtener(grupo):
+    """Devuelve los contadores de un grupo, recalculándolos si expiraron."""
+    return _en_cache(grupo, _GRUPOS[grupo])
+
+
+def total(grupo, clave, query):
+    """
+    COUNT de un listado filtrado, en caché bajo `grupo` con la misma TTL e
+    invalidación que los contadores del grupo. `clave` identifica el filtro.
+    """
+    return _en_cache((grupo, clave), lambda: query.order_by(None).count())
+
+
+def invalidar(*grupos):
+    """Descarta los grupos indicados (todos si no se indica ninguno)."""
+    with _candado:
+        if not grupos:
+            _cache.clear()
+            return
+        for llave in list(_cache):
+            if llave in grupos or (isinstance(llave, tuple) and llave[0] in grupos):
+                del _cache[llave]
+
+
+def dashboard():
+    """Contadores globales que se inyectan en todas las plantillas."""
+    ordenes = obtener('ordenes')
+    return {
+        'pendientes': ordenes['pendientes'],
+        'en_progreso': ordenes['en_progreso'],
+        'critico_stock': obtener('inventario')['critico_stock'],
+    }
+
+
+# ────────────────────────────────────────────────
+#      Invalidación al hacer commit de escrituras
+# ────────────────────────────────────────────────
+
+# Atributos que cambian cada grupo cuando se modifican en una fila existente
+# (los de búsqueda también: cambian los totales de los listados filtrados)
+_ATRIBUTOS = {
+    OrdenTrabajo: (('ordenes', ('estado', 'fecha_entrega', 'folio')),),
+    Inventario: (('inventario', ('cantidad', 'precio', 'nombre_parte', 'numero_parte')),),
+    Vehiculo: (('clientes', ('cliente_id', 'placa', 'marca', 'modelo')), ('ordenes', ('placa',))),
+    Cliente: (('clientes', ('nombre', 'telefono', 'email')), ('ordenes', ('nombre',))),
+    # almacen.py cambia el stock con UPDATE directo, pero siempre deja un movimiento
+    MovimientoInventario: (('inventario', ()),),
+    OrdenCompra: (('compras', ()),),  # Solo totales de listado: contadores.total('compras', ...)
+}
+
+
+def _grupos_afectados(session):
+    grupos = set()
+    for obj in list(session.new) + list(session.deleted):
+        for grupo, _ in _ATRIBUTOS.get(type(obj), ()):
+            grupos.add(grupo)
+    for obj in session.dirty:
+        if type(obj) not in _ATRIBUTOS:
+            continue
+        estado = inspect(obj)
+        for grupo, atributos in _ATRIBUTOS[type(obj)]:
+            if any(estado.attrs[a].history.has_changes() for a in atributos):
+                grupos.add(grupo)
+    return grupos
+
+
+@event.listens_for(Session, 'before_flush')
+def _registrar_cambios(session, flush_context, instances):
+    session.info.setdefault('contadores_pendientes', set()).update(_grupos_afectados(session))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar_al_confirmar(session):
+    grupos = session.info.pop('contadores_pendientes', None)
+    if grupos:
+        invalidar(*grupos)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar_al_revertir(session, previous_transaction):
+    session.info.pop('contadores_pendientes', None)
@@ -0,0 +1,72 @@
+# cooperativo.py
+# Workers gevent de gunicorn (Procfile, Dockerfile; ver tablero.py).
+#
+# Un worker gevent atiende todos sus requests en un solo hilo: lo que no
+# cede el control detiene a los demás, incluidos los streams SSE del tablero.
+# - psycopg2 es una extensión en C que monkey.patch_all() no alcanza: sin
+#   callback de espera cada consulta a PostgreSQL bloquea el worker entero.
+#   init_worker() (gunicorn.conf.py, post_worker_init) instala uno que
+#   espera el socket de la conexión con gevent, como psycogreen.
+# - scrypt (login, cambio de contraseña) suelta el GIL: en_hilo() lo corre
+#   en el threadpool del hub y los demás greenlets siguen mientras tanto.
+# - Los ciclos largos en Python (exportar, importar) llaman a ceder() cada
+#   lote. El PDF de la cotización va por la cola de trabajos (trabajos.py).
+# Fuera de gevent (flask run, workers síncronos, CLI) nada de esto cambia
+# el comportamiento.
+
+
+def activo():
+    """True en un proceso con monkey-patch de gevent (worker gevent de gunicorn)."""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+
+def _esperar(conexion, timeout=None):
+    """Callback de espera de psycopg2: cede al hub mientras el servidor responde."""
+    from gevent.socket import wait_read, wait_write
+    from psycopg2 import OperationalError, extensions
+
+    while True:
+        estado = conexion.poll()
+        if estado == extensions.POLL_OK:
+            break
+        if estado == extensions.POLL_READ:
+            wait_read(conexion.fileno(), timeout=timeout)
+        elif estado == extensions.POLL_WRITE:
+            wait_write(conexion.fileno(), timeout=timeout)
+        else:
+            raise OperationalError(f'Estado de poll inesperado: {estado!r}')
+
+
+def init_worker():
+    """Hace cooperativo a psycopg2 si el worker corre con gevent. Sin gevent o sin psycopg2 no hace nada."""
+    if not activo():
+        return False
+    try:
+        from psycopg2 import extensions
+    except ImportError:
+        return False
+    extensions.set_wait_callback(_esperar)
+    return True
+
+
+def en_hilo(funcion, *args, **kwargs):
+    """
+    `funcion(*args, **kwargs)` en el threadpool de gevent (solo código que
+    suelta el GIL y no usa el contexto de Flask, p. ej. scrypt); sin gevent,
+    la llama directo.
+    """
+    if not activo():
+        return funcion(*args, **kwargs)
+    from gevent import get_hub
+    return get_hub().threadpool.apply(funcion, args, kwargs)
+
+
+def ceder():
+    """Deja correr a los demás greenlets (en ciclos largos); sin gevent no hace nada."""
+    if activo():
+        import gevent
+        gevent.sleep(0)
@@ -0,0 +1,143 @@
+# cotizaciones.py
+# Cotización de una orden: refacciones con precio congelado y totales en SQL.
+#
+# - Al agregar una refacción a la orden se guarda el precio al público de
+#   ese momento en orden_trabajo_partes.precio_unitario: la cotización ya
+#   no cambia si después cambia el precio del inventario.
+# - Subtotal, IVA y total salen de una sola consulta agregada sobre
+#   orden_trabajo_partes (SUM(cantidad * precio_unitario)), redondeados a
+#   centavos en la base.
+# - OrdenTrabajo.version sube con cada cambio de la orden o de sus
+#   refacciones. La cotización calculada se guarda en memoria del proceso
+#   por (orden, versión), así la vista HTML, el PDF y el trabajo en segundo
+#   plano comparten un solo cálculo y una versión nueva nunca ve la vieja.
+import threading
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy import Float, Numeric, cast, event, func, select, update
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import Inventario, OrdenTrabajo, orden_trabajo_partes
+
+IVA = 0.16
+MAX_CACHE = 256  # cotizaciones en memoria por proceso
+
+Linea = namedtuple('Linea', 'parte_id nombre_parte numero_parte cantidad precio_unitario importe')
+
+_candado = threading.Lock()
+_cache = OrderedDict()  # (orden_id, version) -> Cotizacion
+
+
+class Cotizacion:
+    """Refacciones y totales de una orden en una versión dada."""
+
+    def __init__(self, orden_id, version, lineas, subtotal, iva, total):
+        self.orden_id = orden_id
+        self.version = version
+        self.lineas = lineas
+        self.subtotal = subtotal
+        self.iva = iva
+        self.total = total
+
+
+# ────────────────────────────────────────────────
+#            Refacciones y versión de la orden
+# ────────────────────────────────────────────────
+
+def agregar_refaccion(orden_id, parte_id, cantidad):
+    """
+    Suma `cantidad` de la pieza a la orden (en la transacción de la sesión).
+    La primera vez congela el precio al público actual; si la pieza ya
+    estaba, conserva el precio con el que se cotizó.
+    """
+    actualizada = db.session.execute(
+        orden_trabajo_partes.update()
+        .where(orden_trabajo_partes.c.orden_id == orden_id, orden_trabajo_partes.c.parte_id == parte_id)
+        .values(cantidad_usada=orden_trabajo_partes.c.cantidad_usada + cantidad)
+    ).rowcount
+    if not actualizada:
+        precio = select(Inventario.precio).where(Inventario.id == parte_id).scalar_subquery()
+        db.session.execute(orden_trabajo_partes.insert().values(
+            orden_id=orden_id, parte_id=parte_id, cantidad_usada=cantidad, precio_unitario=precio))
+    nueva_version(orden_id)
+
+
+def nueva_version(orden_id):
+    """Sube la versión de la orden tras cambiar sus refacciones con SQL directo."""
+    # Con el ORM: el objeto que ya esté en la sesión queda con la versión nueva
+    db.session.execute(
+        update(OrdenTrabajo).where(OrdenTrabajo.id == orden_id).values(version=OrdenTrabajo.version + 1)
+    )
+
+
+@event.listens_for(Session, 'before_flush')
+def _subir_version(session, flush_context, instances):
+    for obj in session.dirty:
+        if isinstance(obj, OrdenTrabajo) and session.is_modified(obj, include_collections=False):
+            obj.version = (obj.version or 0) + 1
+
+
+# ────────────────────────────────────────────────
+#                    Cálculo
+# ────────────────────────────────────────────────
+
+def _centavos(expresion):
+    # round(numeric, int) existe en PostgreSQL y SQLite; round(double, int) solo en SQLite
+    return func.round(cast(expresion, Numeric), 2, type_=Float)
+
+
+def calcular(orden_id, version=None):
+    """Cotización de la orden leída de la base (sin caché)."""
+    otp = orden_trabajo_partes.c
+    precio = func.coalesce(otp.precio_unitario, Inventario.precio)  # Filas sin precio guardado
+    importe = otp.cantidad_usada * precio
+
+    lineas = [Linea(*fila) for fila in db.session.execute(
+        select(otp.parte_id, Inventario.nombre_parte, Inventario.numero_parte, otp.cantidad_usada,
+               precio, _centavos(importe))
+        .join(Inventario, Inventario.id == otp.parte_id)
+        .where(otp.orden_id == orden_id)
+        .order_by(Inventario.nombre_parte, otp.parte_id)
+    )]
+
+    subtotal = func.coalesce(func.sum(importe), 0)
+    fila = db.session.execute(
+        select(_centavos(subtotal), _centavos(subtotal * IVA),
+               _centavos(_centavos(subtotal) + _centavos(subtotal * IVA)))  # total = suma de lo impreso
+        .select_from(orden_trabajo_partes)
+        .join(Inventario, Inventario.id == otp.parte_id)
+        .where(otp.orden_id == orden_id)
+    ).one()
+    return Cotizacion(orden_id, version, lineas, *fila)
+
+
+def subtotales(*condiciones):
+    """SELECT (orden_id, subtotal) de las órdenes que cumplen `condiciones`, igual que calcular()."""
+    otp = orden_trabajo_partes.c
+    importe = otp.cantidad_usada * func.coalesce(otp.precio_unitario, Inventario.precio)
+    return (select(otp.orden_id, _centavos(func.sum(importe)).label('subtotal'))
+            .join(Inventario, Inventario.id == otp.parte_id)
+            .where(*condiciones)
+            .group_by(otp.orden_id))
+
+
+def obtener(orden):
+    """Cotización de `orden` (OrdenTrabajo), calculada una vez por versión."""
+    llave = (orden.id, orden.version)
+    with _candado:
+        cotizacion = _cache.get(llave)
+        if cotizacion is not None:
+            _cache.move_to_end(llave)
+            return cotizacion
+    cotizacion = calcular(orden.id, orden.version)
+    with _candado:
+        _cache[llave] = cotizacion
+        while len(_cache) > MAX_CACHE:
+            _cache.popitem(last=False)
+    return cotizacion
+
+
+def limpiar_cache():
+    with _candado:
+        _cache.clear()
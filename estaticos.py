@@ -0,0 +1,178 @@
+# estaticos.py
+# Estáticos con huella (hash en el nombre) y precomprimidos.
+#
+# `flask estaticos construir` (en el despliegue, después de copiar el código):
+# - Optimiza los PNG con Pillow (sin pérdida; solo si el resultado es menor).
+# - Copia cada archivo de static/ a static/dist/ con el hash de su contenido
+#   en el nombre: styles.css -> dist/styles.3f9a1c0b2d.css
+# - Para CSS/JS/SVG genera también .br (brotli) y .gz (zopfli, compatible
+#   con gzip) con la máxima compresión: se hace una vez, no en cada request.
+# - Escribe static/dist/manifest.json con original -> nombre con hash.
+#
+# Con el manifiesto presente, url_for('static', filename='styles.css') apunta
+# al archivo con hash, y la vista de estáticos manda la variante .br o .gz
+# que acepte el navegador con Cache-Control immutable de un año (el nombre
+# cambia cuando cambia el contenido). En modo debug no se usa el manifiesto.
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import shutil
+
+import click
+from flask import current_app, request, send_from_directory
+from flask.cli import AppGroup
+
+DIRECTORIO_SALIDA = 'dist'
+MANIFIESTO = 'manifest.json'
+COMPRIMIBLES = {'.css', '.js', '.svg', '.json', '.txt', '.map'}
+UN_ANO = 365 * 24 * 3600
+CACHE_INMUTABLE = f'public, max-age={UN_ANO}, immutable'
+
+_manifiesto = {}
+
+
+# ────────────────────────────────────────────────
+#                  Construcción
+# ────────────────────────────────────────────────
+
+def _optimizar_png(contenido):
+    from PIL import Image
+
+    imagen = Image.open(io.BytesIO(contenido))
+    salida = io.BytesIO()
+    imagen.save(salida, format='PNG', optimize=True)
+    optimizado = salida.getvalue()
+    return optimizado if len(optimizado) < len(contenido) else contenido
+
+
+def _brotli(contenido):
+    import brotli
+    return brotli.compress(contenido, quality=11)
+
+
+def _zopfli(contenido):
+    import zopfli.gzip
+    return zopfli.gzip.compress(contenido)
+
+
+def _nombre_con_hash(relativa, contenido):
+    base, extension = os.path.splitext(relativa)
+    huella = hashlib.sha256(contenido).hexdigest()[:10]
+    return f'{base}.{huella}{extension}'
+
+
+def _escribir(ruta, contenido):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, 'wb') as f:
+        f.write(contenido)
+
+
+def _archivos_fuente(carpeta):
+    for directorio, subdirectorios, archivos in os.walk(carpeta):
+        if directorio == carpeta and DIRECTORIO_SALIDA in subdirectorios:
+            subdirectorios.remove(DIRECTORIO_SALIDA)  # No procesar lo ya construido
+        for nombre in sorted(archivos):
+            ruta = os.path.join(directorio, nombre)
+            yield ruta, os.path.relpath(ruta, carpeta).replace(os.sep, '/')
+
+
+def construir(carpeta, optimizar_png=True, comprimir=True, mostrar=lambda texto: None):
+    """Regenera static/dist y su manifiesto. Regresa el manifiesto."""
+    salida = os.path.join(carpeta, DIRECTORIO_SALIDA)
+    shutil.rmtree(salida, ignore_errors=True)
+
+    manifiesto = {}
+    for ruta, relativa in _archivos_fuente(carpeta):
+        with open(ruta, 'rb') as f:
+            contenido = original = f.read()
+        extension = os.path.splitext(relativa)[1].lower()
+
+        if optimizar_png and extension == '.png':
+            contenido = _optimizar_png(contenido)
+
+        destino = _nombre_con_hash(relativa, contenido)
+        ruta_destino = os.path.join(salida, destino)
+        _escribir(ruta_destino, contenido)
+        manifiesto[relativa] = f'{DIRECTORIO_SALIDA}/{destino}'
+
+        tamanos = [f'{len(original):,} B']
+        if len(contenido) != len(original):
+            tamanos.append(f'png {len(contenido):,} B')
+        if comprimir and extension in COMPRIMIBLES:
+            for sufijo, compresor in (('.br', _brotli), ('.gz', _zopfli)):
+                comprimido = compresor(contenido)
+                _escribir(ruta_destino + sufijo, comprimido)
+                tamanos.append(f'{sufijo[1:]} {len(comprimido):,} B')
+        mostrar(f'{relativa} -> {manifiesto[relativa]} ({", ".join(tamanos)})')
+
+    _escribir(os.path.join(salida, MANIFIESTO), json.dumps(manifiesto, indent=2, sort_keys=True).encode())
+    return manifiesto
+
+
+def cargar_manifiesto(carpeta):
+    try:
+        with open(os.path.join(carpeta, DIRECTORIO_SALIDA, MANIFIESTO), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# ────────────────────────────────────────────────
+#             url_for y vista de estáticos
+# ────────────────────────────────────────────────
+
+def _con_hash(endpoint, valores):
+    if endpoint == 'static' and _manifiesto and 'filename' in valores:
+        valores['filename'] = _manifiesto.get(valores['filename'], valores['filename'])
+
+
+def _servir(filename):
+    app = current_app
+    if not filename.startswith(DIRECTORIO_SALIDA + '/'):
+        return app.send_static_file(filename)
+
+    carpeta = app.static_folder
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    codificaciones = request.accept_encodings
+    for sufijo, codificacion in (('.br', 'br'), ('.gz', 'gzip')):
+        if codificaciones[codificacion] and os.path.isfile(os.path.join(carpeta, filename + sufijo)):
+            respuesta = send_from_directory(carpeta, filename + sufijo, mimetype=mimetype, max_age=UN_ANO)
+            respuesta.headers['Content-Encoding'] = codificacion
+            break
+    else:
+        respuesta = send_from_directory(carpeta, filename, mimetype=mimetype, max_age=UN_ANO)
+    respuesta.headers['Cache-Control'] = CACHE_INMUTABLE
+    respuesta.vary.add('Accept-Encoding')
+    return respuesta
+
+
+def init_app(app):
+    """Activa las URLs con hash si existe el manifiesto (y no se está en debug)."""
+    global _manifiesto
+    if app.debug or not app.config.get('ESTATICOS_CON_HASH', True):
+        return
+    _manifiesto = cargar_manifiesto(app.static_folder)
+    app.url_defaults(_con_hash)
+    app.view_functions['static'] = _servir
+
+
+# ────────────────────────────────────────────────
+#                  Comandos CLI
+# ────────────────────────────────────────────────
+
+cli = AppGroup('estaticos', help='Estáticos con hash y precomprimidos.')
+
+
+@cli.command('construir')
+@click.option('--sin-png', is_flag=True, help='No optimizar imágenes PNG.')
+@click.option('--sin-comprimir', is_flag=True, help='No generar variantes .br y .gz.')
+def construir_comando(sin_png, sin_comprimir):
+    """Genera static/dist con nombres con hash, variantes .br/.gz y el manifiesto."""
+    global _manifiesto
+    manifiesto = construir(current_app.static_folder, optimizar_png=not sin_png,
+                           comprimir=not sin_comprimir, mostrar=click.echo)
+    if _manifiesto:
+        _manifiesto = manifiesto
+    click.echo(f'{len(manifiesto)} archivos en {os.path.join(current_app.static_folder, DIRECTORIO_SALIDA)}')
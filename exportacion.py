@@ -0,0 +1,186 @@
+# exportacion.py
+# Exportación de órdenes, inventario y compras a CSV o Excel.
+#
+# Las filas se leen con un cursor del lado del servidor (yield_per) y se van
+# escribiendo a la respuesta conforme llegan, así la memoria no crece con el
+# tamaño de la tabla. Se seleccionan solo las columnas del archivo (no se
+# crean objetos del ORM) y los filtros son los mismos de los listados
+# (ver consultas.py).
+#
+# CSV: se genera en streaming directo (con BOM para que Excel respete acentos).
+# XLSX: openpyxl en modo write_only escribe a un archivo temporal sin guardar
+# las filas en memoria; al terminar, el archivo se manda por bloques.
+#
+# Los textos libres (falla reportada, descripción...) que empiezan con
+# = + - @ Excel los abriría como fórmula (CSV injection): en el CSV llevan un
+# apóstrofo delante y en el XLSX van como celda de texto, nunca de fórmula.
+import csv
+import os
+import tempfile
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import select
+
+from consultas import filtrar_ordenes, filtrar_inventario, filtrar_compras
+from extensions import db
+import cooperativo
+from models import Cliente, Vehiculo, Inventario, OrdenTrabajo, OrdenCompra
+
+INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+FILAS_POR_LOTE = 1000  # Filas que se traen del cursor a la vez
+BLOQUE_ARCHIVO = 64 * 1024
+
+
+class ErrorExportacion(Exception):
+    pass
+
+
+# ────────────────────────────────────────────────
+#            Columnas y consultas por tabla
+# ────────────────────────────────────────────────
+
+_COLUMNAS = {
+    'ordenes': [
+        ('Folio', OrdenTrabajo.folio),
+        ('Fecha', OrdenTrabajo.fecha_creacion),
+        ('Estado', OrdenTrabajo.estado),
+        ('Cliente', Cliente.nombre),
+        ('Teléfono', Cliente.telefono),
+        ('Placa', Vehiculo.placa),
+        ('Marca', Vehiculo.marca),
+        ('Modelo', Vehiculo.modelo),
+        ('Falla reportada', OrdenTrabajo.falla_reportada),
+        ('Trabajo realizado', OrdenTrabajo.trabajo_realizado),
+        ('Fecha compromiso', OrdenTrabajo.fecha_compromiso),
+        ('Fecha entrega', OrdenTrabajo.fecha_entrega),
+    ],
+    'inventario': [
+        ('ID', Inventario.id),
+        ('Nombre', Inventario.nombre_parte),
+        ('Número de parte', Inventario.numero_parte),
+        ('Proveedor', Inventario.proveedor),
+        ('Cantidad', Inventario.cantidad),
+        ('Costo', Inventario.costo),
+        ('Precio', Inventario.precio),
+        ('Descripción', Inventario.descripcion),
+    ],
+    'compras': [
+        ('ID', OrdenCompra.id),
+        ('Proveedor', OrdenCompra.proveedor),
+        ('Fecha', OrdenCompra.fecha),
+        ('Total', OrdenCompra.total),
+    ],
+}
+
+TABLAS = tuple(_COLUMNAS)
+FORMATOS = ('csv', 'xlsx')
+
+
+def _consulta(tabla, filtros):
+    columnas = [columna for _, columna in _COLUMNAS[tabla]]
+    if tabla == 'ordenes':
+        consulta = select(*columnas).select_from(OrdenTrabajo).join(OrdenTrabajo.vehiculo).join(Vehiculo.cliente)
+        consulta = filtrar_ordenes(consulta, filtros.get('estado', 'todas'), filtros.get('busqueda', ''),
+                                   filtros.get('desde'), filtros.get('hasta'))
+        return consulta.order_by(OrdenTrabajo.fecha_creacion.desc(), OrdenTrabajo.id.desc())
+    if tabla == 'inventario':
+        consulta = filtrar_inventario(select(*columnas), filtros.get('busqueda', ''),
+                                      filtros.get('filtro_stock', 'todos'))
+        return consulta.order_by(Inventario.id.desc())
+    consulta = filtrar_compras(select(*columnas), filtros.get('proveedor', ''),
+                               filtros.get('desde'), filtros.get('hasta'))
+    return consulta.order_by(OrdenCompra.id.desc())
+
+
+def filas(tabla, filtros):
+    """Genera las filas de `tabla` con un cursor del servidor, de a FILAS_POR_LOTE."""
+    lote = int(current_app.config.get('EXPORTACION_LOTE', FILAS_POR_LOTE))
+    resultado = db.session.execute(_consulta(tabla, filtros).execution_options(yield_per=lote))
+    try:
+        for numero, fila in enumerate(resultado, start=1):
+            if numero % lote == 0:
+                cooperativo.ceder()  # Worker gevent: no acaparar el proceso con un archivo grande
+            yield fila
+    finally:
+        resultado.close()
+
+
+def encabezados(tabla):
+    return [titulo for titulo, _ in _COLUMNAS[tabla]]
+
+
+def nombre_archivo(tabla, formato):
+    return f'{tabla}_{date.today():%Y%m%d}.{formato}'
+
+
+# ────────────────────────────────────────────────
+#                    Formatos
+# ────────────────────────────────────────────────
+
+class _Linea:
+    """Destino para csv.writer que solo regresa lo escrito."""
+
+    def write(self, texto):
+        return texto
+
+
+def _es_formula(valor):
+    return isinstance(valor, str) and valor.startswith(INICIO_FORMULA)
+
+
+def _texto_csv(valor):
+    return "'" + valor if _es_formula(valor) else valor
+
+
+def generar_csv(tabla, filtros):
+    escritor = csv.writer(_Linea())
+    yield '\ufeff' + escritor.writerow(encabezados(tabla))
+    for fila in filas(tabla, filtros):
+        yield escritor.writerow([_texto_csv(valor) for valor in fila])
+
+
+def _celda_xlsx(hoja, valor):
+    if not _es_formula(valor):
+        return valor
+    from openpyxl.cell import WriteOnlyCell
+
+    celda = WriteOnlyCell(hoja, value=valor)
+    celda.data_type = 's'  # openpyxl guardaría '=...' como fórmula
+    return celda
+
+
+def generar_xlsx(tabla, filtros):
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(tabla.capitalize())
+    hoja.append(encabezados(tabla))
+    for fila in filas(tabla, filtros):
+        hoja.append([_celda_xlsx(hoja, valor) for valor in fila])
+
+    fd, ruta = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        libro.save(ruta)
+        with open(ruta, 'rb') as f:
+            while bloque := f.read(BLOQUE_ARCHIVO):
+                yield bloque
+    finally:
+        os.remove(ruta)
+
+
+def generar(tabla, formato, filtros):
+    """Generador con el contenido del archivo; valida tabla y formato antes de empezar."""
+    if tabla not in _COLUMNAS:
+        raise ErrorExportacion(f'No se puede exportar {tabla}')
+    if formato == 'csv':
+        return generar_csv(tabla, filtros)
+    if formato == 'xlsx':
+        # Revisar la dependencia antes de empezar a responder
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            raise ErrorExportacion('Para exportar a Excel instala openpyxl (pip install openpyxl)')
+        return generar_xlsx(tabla, filtros)
+    raise ErrorExportacion(f'Formato no soportado: {formato} (usa csv o xlsx)')
@@ -1,6 +1,4 @@
 # extensions.py
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 
-db = SQLAlchemy()
-migrate = Migrate()  # Para usar con init_app más adelante
\ No newline at end of file
+db = SQLAlchemy()
\ No newline at end of file
@@ -0,0 +1,84 @@
+# folios.py
+# Asignación de folios para órdenes de trabajo.
+#
+# El último número entregado vive en una fila de `folio_contador` y se avanza
+# con un solo UPDATE ... RETURNING en una transacción corta e independiente
+# de la del request: no hay que leer la última orden, y dos workers nunca
+# reciben el mismo número (el UPDATE serializa sobre esa fila).
+#
+# Con FOLIO_BLOQUE > 1 cada proceso reserva un bloque de números de una vez
+# y los reparte en memoria; así la fila se toca una vez cada N órdenes. Los
+# números de un bloque que no se use (reinicio del worker, orden que falla al
+# guardarse) se pierden: los folios son únicos y crecientes por worker, pero
+# pueden tener huecos.
+import os
+import threading
+
+from flask import current_app
+from sqlalchemy import func, select, update, insert
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import FolioContador, OrdenTrabajo
+
+SERIE_ORDENES = 'orden_trabajo'
+
+_candado = threading.Lock()
+_bloques = {}  # serie -> [siguiente, limite]
+
+
+def _olvidar_bloques():
+    # Un proceso hijo no debe repartir los mismos números que su padre
+    _bloques.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_olvidar_bloques)
+
+
+def _reservar(serie, cantidad):
+    """Avanza el contador `cantidad` números y devuelve el último reservado."""
+    tabla = FolioContador.__table__
+    for _ in range(2):
+        with db.engine.begin() as conn:
+            ultimo = conn.execute(
+                update(tabla)
+                .where(tabla.c.serie == serie)
+                .values(valor=tabla.c.valor + cantidad)
+                .returning(tabla.c.valor)
+            ).scalar()
+            if ultimo is not None:
+                return ultimo
+        # Primera vez: la serie arranca después del id más alto existente
+        # (el esquema anterior numeraba con id + 1)
+        try:
+            with db.engine.begin() as conn:
+                inicial = conn.execute(select(func.coalesce(func.max(OrdenTrabajo.id), 0))).scalar()
+                conn.execute(insert(tabla).values(serie=serie, valor=inicial + cantidad))
+                return inicial + cantidad
+        except IntegrityError:
+            continue  # Otro worker creó la fila al mismo tiempo; reintentar el UPDATE
+    raise RuntimeError(f'No se pudo reservar folio para la serie {serie}')
+
+
+def siguiente_numero(serie=SERIE_ORDENES):
+    bloque = max(1, int(current_app.config.get('FOLIO_BLOQUE', 1)))
+    with _candado:
+        actual = _bloques.get(serie)
+        if not actual or actual[0] > actual[1]:
+            limite = _reservar(serie, bloque)
+            actual = _bloques[serie] = [limite - bloque + 1, limite]
+        numero = actual[0]
+        actual[0] += 1
+        return numero
+
+
+def siguiente_folio(serie=SERIE_ORDENES):
+    """Folio con el formato visible para el usuario: F-0001, F-0002..."""
+    return f'F-{siguiente_numero(serie):04d}'
+
+
+def reservar_folios(cantidad, serie=SERIE_ORDENES):
+    """`cantidad` folios consecutivos con una sola reserva (cargas masivas)."""
+    ultimo = _reservar(serie, cantidad)
+    return [f'F-{numero:04d}' for numero in range(ultimo - cantidad + 1, ultimo + 1)]
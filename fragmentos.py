@@ -0,0 +1,114 @@
+# fragmentos.py
+# Caché de fragmentos de plantilla: {% cache %} ... {% endcache %}.
+#
+#   {% cache 'columnas', tablas=['orden_trabajo', 'cliente'] %} ... {% endcache %}
+#   {% cache 'checklist', orden.id, orden.version %} ... {% endcache %}
+#
+# La llave es explícita: nombre del fragmento, plantilla, los valores que se
+# pasan después del nombre, la versión de cada tabla de `tablas` (ver
+# versiones.py; una consulta por llave primaria) y la sal de despliegue
+# (plantillas y estáticos nuevos no reusan HTML viejo). Nada más entra en la
+# llave: un fragmento no debe pintar datos del usuario ni del request que no
+# estén en ella.
+#
+# El HTML se guarda en memoria del proceso, LRU acotado por número de
+# fragmentos (FRAGMENTOS_MAX) y por tamaño total (FRAGMENTOS_MAX_BYTES).
+# CACHE_FRAGMENTOS = False pinta todo siempre (ver benchmarks/plantillas.py).
+#
+# Solo conviene donde el fragmento consulta o repite mucho: el HTML estático
+# se pinta más rápido de lo que cuesta armar la llave. Si la consulta vive en
+# la vista, pásala a la plantilla como función para que no corra en un acierto
+# (así hace /tablero con columnas()).
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+import versiones
+
+MAX_FRAGMENTOS = 500
+MAX_BYTES = 8 * 1024 * 1024
+
+_candado = threading.Lock()
+_cache = OrderedDict()  # llave -> html
+_estado = {'bytes': 0, 'aciertos': 0, 'fallos': 0}
+
+
+def _guardar(llave, html):
+    maximo = int(current_app.config.get('FRAGMENTOS_MAX', MAX_FRAGMENTOS))
+    maximo_bytes = int(current_app.config.get('FRAGMENTOS_MAX_BYTES', MAX_BYTES))
+    tamano = len(html)
+    if tamano > maximo_bytes:
+        return
+    with _candado:
+        anterior = _cache.pop(llave, None)
+        if anterior is not None:
+            _estado['bytes'] -= len(anterior)
+        _cache[llave] = html
+        _estado['bytes'] += tamano
+        while len(_cache) > maximo or _estado['bytes'] > maximo_bytes:
+            _, sacado = _cache.popitem(last=False)
+            _estado['bytes'] -= len(sacado)
+
+
+def _buscar(llave):
+    with _candado:
+        html = _cache.get(llave)
+        if html is None:
+            _estado['fallos'] += 1
+            return None
+        _cache.move_to_end(llave)
+        _estado['aciertos'] += 1
+        return html
+
+
+def estadisticas():
+    with _candado:
+        return dict(_estado, fragmentos=len(_cache))
+
+
+def limpiar():
+    with _candado:
+        _cache.clear()
+        _estado.update(bytes=0, aciertos=0, fallos=0)
+
+
+class CacheFragmentos(Extension):
+    """Etiqueta {% cache nombre[, valor...][, tablas=[...]] %}."""
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        valores = [parser.parse_expression()]
+        tablas = nodes.List([])
+        while parser.stream.skip_if('comma'):
+            if parser.stream.current.type == 'name' and parser.stream.look().type == 'assign':
+                nombre = next(parser.stream).value
+                if nombre != 'tablas':
+                    parser.fail(f'Argumento desconocido de cache: {nombre}', lineno)
+                parser.stream.expect('assign')
+                tablas = parser.parse_expression()
+            else:
+                valores.append(parser.parse_expression())
+        cuerpo = parser.parse_statements(['name:endcache'], drop_needle=True)
+        llamada = self.call_method('_pintar', [nodes.Const(parser.name), nodes.List(valores), tablas])
+        return nodes.CallBlock(llamada, [], [], cuerpo).set_lineno(lineno)
+
+    def _pintar(self, plantilla, valores, tablas, caller):
+        if not current_app.config.get('CACHE_FRAGMENTOS', True):
+            return caller()
+        version_tablas = versiones.obtener(*tablas) if tablas else {}
+        llave = '|'.join([plantilla or '', versiones._SAL] + [repr(valor) for valor in valores] +
+                         [f'{tabla}:{version_tablas[tabla][0]}' for tabla in sorted(version_tablas)])
+        html = _buscar(llave)
+        if html is None:
+            html = str(caller())
+            _guardar(llave, html)
+        return Markup(html)
+
+
+def init_app(app):
+    app.jinja_env.add_extension(CacheFragmentos)
@@ -0,0 +1,203 @@
+# generador_pdf.py
+# Render de PDFs de cotizaciones con pool de procesos y caché por contenido.
+#
+# - Caché: cada PDF se guarda como <sha256>.pdf en PDF_CACHE_DIR (por defecto
+#   instance/pdf_cache). La clave sale de lo que se imprime (orden, cliente,
+#   vehículo, refacciones con cantidad y precio congelado) más la plantilla y el backend,
+#   así que una cotización sin cambios se sirve directo del disco. Cada
+#   edición deja un PDF nuevo: al escribir uno se borran (a lo más cada
+#   PDF_CACHE_PODA segundos) los que llevan más de PDF_CACHE_DIAS días sin
+#   usarse y, si el directorio pasa de PDF_CACHE_MAX_MB, los menos usados.
+# - Pool: los renders se mandan a un ProcessPoolExecutor (PDF_WORKERS, por
+#   defecto 2; 0 = render en línea), que saca el render del hilo del request
+#   y limita cuántos corren a la vez. Sus procesos importan el backend al
+#   arrancar; con wkhtmltopdf cada PDF sigue lanzando el ejecutable.
+# - /cotizacion/pdf solo sirve aciertos; si el PDF no está, encola el
+#   trabajo 'cotizacion_pdf' (ver trabajos.py) y responde 202, así ningún
+#   request web espera un render.
+# - Backends (PDF_BACKEND): 'wkhtmltopdf' (pdfkit, el de siempre) o
+#   'weasyprint' (en proceso, sin lanzar un ejecutable por PDF).
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app, render_template
+
+import cotizaciones
+
+PLANTILLA = 'cotizacion_pdf.html'
+BACKEND_POR_DEFECTO = 'wkhtmltopdf'
+CACHE_DIAS = 30
+CACHE_MAX_MB = 200
+CACHE_PODA = 300  # segundos entre podas por proceso
+
+_pool = None
+_pool_pid = None
+_plantilla_hash = {}  # ruta -> (mtime, sha)
+_candado = threading.Lock()
+_ultima_poda = 0.0
+
+
+# ────────────────────────────────────────────────
+#              Backends (corren en el pool)
+# ────────────────────────────────────────────────
+
+def _calentar(backend):
+    # Importar el backend una sola vez por proceso del pool
+    if backend == 'weasyprint':
+        import weasyprint  # noqa: F401
+    else:
+        import pdfkit  # noqa: F401
+
+
+def _renderizar(backend, html, base_url):
+    if backend == 'weasyprint':
+        from weasyprint import HTML
+        return HTML(string=html, base_url=base_url).write_pdf()
+    import pdfkit
+    return pdfkit.from_string(html, False)
+
+
+def _obtener_pool(backend, workers):
+    global _pool, _pool_pid
+    # Cada worker de gunicorn crea su propio pool después del fork
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = ProcessPoolExecutor(max_workers=workers, initializer=_calentar, initargs=(backend,))
+        _pool_pid = os.getpid()
+    return _pool
+
+
+# ────────────────────────────────────────────────
+#                     Caché
+# ────────────────────────────────────────────────
+
+def _hash_plantilla():
+    ruta = os.path.join(current_app.root_path, current_app.template_folder, PLANTILLA)
+    mtime = os.path.getmtime(ruta)
+    guardado = _plantilla_hash.get(ruta)
+    if not guardado or guardado[0] != mtime:
+        with open(ruta, 'rb') as f:
+            guardado = _plantilla_hash[ruta] = (mtime, hashlib.sha256(f.read()).hexdigest())
+    return guardado[1]
+
+
+def clave_cotizacion(orden, cotizacion):
+    """Hash de todo lo que aparece en el PDF de la cotización."""
+    vehiculo = orden.vehiculo
+    contenido = {
+        'orden': [orden.id, orden.folio, orden.falla_reportada],
+        'cliente': vehiculo.cliente.nombre,
+        'vehiculo': [vehiculo.marca, vehiculo.modelo, vehiculo.placa],
+        'partes': [list(linea) for linea in cotizacion.lineas],
+        'totales': [cotizacion.subtotal, cotizacion.iva, cotizacion.total],
+        'plantilla': _hash_plantilla(),
+        'backend': current_app.config.get('PDF_BACKEND', BACKEND_POR_DEFECTO),
+    }
+    return hashlib.sha256(json.dumps(contenido, default=str).encode()).hexdigest()
+
+
+def _directorio_cache():
+    directorio = current_app.config.get('PDF_CACHE_DIR') or os.path.join(current_app.instance_path, 'pdf_cache')
+    os.makedirs(directorio, exist_ok=True)
+    return directorio
+
+
+def _guardar(ruta, pdf):
+    # Escritura atómica: otro worker nunca ve un PDF a medias
+    fd, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(pdf)
+    os.replace(temporal, ruta)
+
+
+def podar(directorio=None, dias=None, max_mb=None):
+    """
+    Borra los PDFs sin usar en `dias` días y, si aún pasan de `max_mb`, los
+    usados hace más tiempo (el mtime se renueva en cada acierto). Regresa
+    cuántos borró.
+    """
+    directorio = directorio or _directorio_cache()
+    dias = current_app.config.get('PDF_CACHE_DIAS', CACHE_DIAS) if dias is None else dias
+    max_mb = current_app.config.get('PDF_CACHE_MAX_MB', CACHE_MAX_MB) if max_mb is None else max_mb
+    archivos = []
+    for entrada in os.scandir(directorio):
+        if entrada.name.endswith('.pdf') and entrada.is_file():
+            estado = entrada.stat()
+            archivos.append((estado.st_mtime, estado.st_size, entrada.path))
+    archivos.sort()  # Los menos usados primero
+
+    limite = time.time() - dias * 86400
+    total = sum(tamano for _, tamano, _ in archivos)
+    borrados = 0
+    for mtime, tamano, ruta in archivos:
+        if mtime >= limite and total <= max_mb * 1024 * 1024:
+            break
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass  # Otro worker lo borró primero
+        total -= tamano
+        borrados += 1
+    return borrados
+
+
+def _podar_si_toca(directorio):
+    global _ultima_poda
+    ahora = time.monotonic()
+    with _candado:
+        if ahora - _ultima_poda < current_app.config.get('PDF_CACHE_PODA', CACHE_PODA):
+            return
+        _ultima_poda = ahora
+    podar(directorio)
+
+
+def renderizar(html):
+    """Genera el PDF en el pool (o en línea si PDF_WORKERS es 0)."""
+    backend = current_app.config.get('PDF_BACKEND', BACKEND_POR_DEFECTO)
+    workers = int(current_app.config.get('PDF_WORKERS', 2))
+    base_url = current_app.static_folder
+    if workers <= 0:
+        return _renderizar(backend, html, base_url)
+    return _obtener_pool(backend, workers).submit(_renderizar, backend, html, base_url).result()
+
+
+def en_cache(clave):
+    """Ruta del PDF de `clave` si ya está en caché (y lo marca como recién usado), o None."""
+    ruta = os.path.join(_directorio_cache(), f'{clave}.pdf')
+    try:
+        os.utime(ruta)  # Acierto: lo marca como recién usado para la poda
+    except FileNotFoundError:
+        return None
+    return ruta
+
+
+def obtener_pdf(clave, generar_html):
+    """
+    Ruta del PDF para `clave`. Si no está en caché, llama a `generar_html()`
+    y lo renderiza; en un acierto no se toca la plantilla ni el backend.
+    """
+    ruta = en_cache(clave)
+    if ruta is None:
+        directorio = _directorio_cache()
+        ruta = os.path.join(directorio, f'{clave}.pdf')
+        _podar_si_toca(directorio)  # Antes de escribir: el nuevo no entra en la poda
+        _guardar(ruta, renderizar(generar_html()))
+    return ruta
+
+
+def cotizacion_en_cache(orden):
+    """(clave, ruta) del PDF de cotización de `orden`; ruta es None si hay que generarlo."""
+    clave = clave_cotizacion(orden, cotizaciones.obtener(orden))
+    return clave, en_cache(clave)
+
+
+def pdf_cotizacion(orden):
+    """(clave, ruta) del PDF de cotización de `orden`; lo genera si hace falta."""
+    cotizacion = cotizaciones.obtener(orden)
+    clave = clave_cotizacion(orden, cotizacion)
+    ruta = obtener_pdf(clave, lambda: render_template(PLANTILLA, orden=orden, cotizacion=cotizacion))
+    return clave, ruta
@@ -0,0 +1,10 @@
+# gunicorn.conf.py
+# gunicorn lo lee solo desde el directorio de trabajo (Procfile, Dockerfile);
+# las opciones de arranque siguen en la línea de comandos.
+import cooperativo
+
+
+def post_worker_init(worker):
+    # Después del monkey-patch de gevent y de cargar la app, antes de atender
+    if cooperativo.init_worker():
+        worker.log.info('psycopg2 en modo cooperativo (gevent)')
@@ -0,0 +1,420 @@
+# importacion.py
+# Carga masiva de clientes, vehículos e inventario desde CSV o Excel.
+#
+# El archivo se lee fila por fila (no se carga completo en memoria) y se
+# procesa en lotes de IMPORTACION_LOTE filas: cada lote se valida, se
+# insertan todas sus filas con un solo INSERT executemany y se hace commit.
+# Una fila con error no detiene la carga: se reporta con su número de fila.
+#
+# Las placas repetidas (dentro del archivo o contra la base) se omiten y se
+# reportan; el INSERT además usa ON CONFLICT DO NOTHING sobre el índice
+# único, por si otra carga inserta la misma placa al mismo tiempo.
+#
+# Columnas (el encabezado no distingue mayúsculas ni acentos):
+#   clientes:   nombre, telefono, email [, marca, modelo, ano, placa, kms_actual]
+#   vehiculos:  cliente_id, marca, modelo, ano, placa [, kms_actual]
+#   inventario: nombre_parte [, numero_parte, descripcion, proveedor, cantidad, costo, precio]
+#
+# Los CSV pueden venir en UTF-8 o en cp1252 (Excel en español guarda así
+# con "CSV (delimitado por comas)").
+import codecs
+import csv
+import io
+import os
+import unicodedata
+import zipfile
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import insert, select
+
+from extensions import db
+from models import Cliente, Vehiculo, Inventario, MovimientoInventario
+import contadores
+import cooperativo
+
+LOTE_POR_DEFECTO = 1000
+MAX_ERRORES = 200  # Errores que se guardan en el resultado (el resto solo se cuenta)
+
+# Nombres alternos de columnas que aparecen en los Excels del taller
+_ALIAS = {
+    'cliente': 'nombre',
+    'tel': 'telefono',
+    'correo': 'email',
+    'anio': 'ano',
+    'modelo_ano': 'ano',
+    'kms': 'kms_actual',
+    'kilometraje': 'kms_actual',
+    'pieza': 'nombre_parte',
+    'parte': 'nombre_parte',
+    'no_parte': 'numero_parte',
+    'precio_publico': 'precio',
+    'existencia': 'cantidad',
+    'stock': 'cantidad',
+}
+
+
+class ErrorImportacion(Exception):
+    pass
+
+
+class ResultadoImportacion:
+    """Resumen de una carga: filas insertadas, omitidas y errores por fila."""
+
+    def __init__(self):
+        self.leidas = 0
+        self.insertadas = 0
+        self.duplicadas = 0
+        self.con_error = 0
+        self.errores = []  # (numero_fila, mensaje)
+
+    def error(self, fila, mensaje):
+        self.con_error += 1
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append((fila, mensaje))
+
+    def __str__(self):
+        return (f'{self.leidas} filas leídas: {self.insertadas} insertadas, '
+                f'{self.duplicadas} duplicadas, {self.con_error} con error')
+
+
+# ────────────────────────────────────────────────
+#                Lectura de archivos
+# ────────────────────────────────────────────────
+
+def _normalizar_encabezado(texto):
+    texto = unicodedata.normalize('NFKD', str(texto or '')).encode('ascii', 'ignore').decode()
+    texto = texto.strip().lower().replace(' ', '_').replace('.', '')
+    return _ALIAS.get(texto, texto)
+
+
+def _codificacion(archivo):
+    """'utf-8-sig' si todo el archivo es UTF-8 válido; si no, 'cp1252'. Lee por bloques y regresa al inicio."""
+    decodificador = codecs.getincrementaldecoder('utf-8-sig')()
+    try:
+        for bloque in iter(lambda: archivo.read(1 << 16), b''):
+            decodificador.decode(bloque)
+        decodificador.decode(b'', final=True)
+        return 'utf-8-sig'
+    except UnicodeDecodeError:
+        return 'cp1252'
+    finally:
+        archivo.seek(0)
+
+
+def _filas_csv(archivo):
+    codificacion = _codificacion(archivo)
+    try:
+        texto = io.TextIOWrapper(archivo, encoding=codificacion, newline='')
+        muestra = texto.read(4096)
+        texto.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+        except csv.Error:
+            dialecto = csv.excel
+        lector = csv.reader(texto, dialecto)
+        encabezado = [_normalizar_encabezado(c) for c in next(lector, [])]
+        for valores in lector:
+            if any(v.strip() for v in valores):
+                yield dict(zip(encabezado, valores))
+            else:
+                yield None  # Fila vacía: cuenta para la numeración pero se ignora
+    except UnicodeDecodeError:
+        # Bytes que ni cp1252 define: no es un CSV de texto
+        raise ErrorImportacion('El archivo no es un CSV de texto (guárdalo como CSV UTF-8)')
+
+
+def _filas_excel(archivo):
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise ErrorImportacion('Para importar Excel instala openpyxl (pip install openpyxl)')
+    try:
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError):
+        raise ErrorImportacion('El archivo no es un Excel válido (.xlsx); ábrelo y guárdalo de nuevo')
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        encabezado = [_normalizar_encabezado(c) for c in next(filas, ())]
+        for valores in filas:
+            if any(v not in (None, '') for v in valores):
+                yield dict(zip(encabezado, valores))
+            else:
+                yield None
+    except zipfile.BadZipFile:
+        raise ErrorImportacion('El archivo Excel está dañado')
+    finally:
+        libro.close()
+
+
+def leer_filas(archivo, nombre):
+    """
+    Filas del archivo como diccionarios con las columnas normalizadas.
+    `archivo` es un archivo binario abierto; `nombre` decide el formato.
+    """
+    extension = os.path.splitext(nombre or '')[1].lower()
+    if extension in ('.xlsx', '.xlsm'):
+        return _filas_excel(archivo)
+    if extension in ('.csv', '.txt', ''):
+        return _filas_csv(archivo)
+    raise ErrorImportacion(f'Formato no soportado: {extension} (usa CSV o XLSX)')
+
+
+# ────────────────────────────────────────────────
+#                   Validación
+# ────────────────────────────────────────────────
+
+def _texto(fila, campo, requerido=False, largo=None):
+    valor = fila.get(campo)
+    valor = '' if valor is None else str(valor).strip()
+    if requerido and not valor:
+        raise ValueError(f'falta {campo}')
+    if largo and len(valor) > largo:
+        raise ValueError(f'{campo} excede {largo} caracteres')
+    return valor or None
+
+
+def _entero(fila, campo, requerido=False, defecto=None):
+    valor = fila.get(campo)
+    if valor in (None, ''):
+        if requerido:
+            raise ValueError(f'falta {campo}')
+        return defecto
+    try:
+        return int(float(str(valor).replace(',', '')))
+    except ValueError:
+        raise ValueError(f'{campo} no es un número: {valor!r}')
+
+
+def _decimal(fila, campo, defecto=0.0):
+    valor = fila.get(campo)
+    if valor in (None, ''):
+        return defecto
+    try:
+        return float(str(valor).replace('$', '').replace(',', ''))
+    except ValueError:
+        raise ValueError(f'{campo} no es un número: {valor!r}')
+
+
+def _placa(valor):
+    return (valor or '').replace(' ', '').upper() or None
+
+
+def _validar_vehiculo(fila):
+    return {
+        'marca': _texto(fila, 'marca', requerido=True, largo=50),
+        'modelo': _texto(fila, 'modelo', requerido=True, largo=50),
+        'ano': _entero(fila, 'ano', requerido=True),
+        'placa': _placa(_texto(fila, 'placa', requerido=True, largo=20)),
+        'kms_actual': _entero(fila, 'kms_actual', defecto=0),
+    }
+
+
+def _validar_cliente(fila):
+    cliente = {
+        'nombre': _texto(fila, 'nombre', requerido=True, largo=100),
+        'telefono': _texto(fila, 'telefono', largo=20),
+        'email': _texto(fila, 'email', largo=100),
+    }
+    # El vehículo es opcional, pero si viene la placa debe venir completo
+    vehiculo = _validar_vehiculo(fila) if _texto(fila, 'placa') else None
+    return cliente, vehiculo
+
+
+def _validar_inventario(fila):
+    pieza = {
+        'nombre_parte': _texto(fila, 'nombre_parte', requerido=True, largo=100),
+        'numero_parte': _texto(fila, 'numero_parte', largo=50),
+        'descripcion': _texto(fila, 'descripcion'),
+        'proveedor': _texto(fila, 'proveedor', largo=100),
+        'cantidad': _entero(fila, 'cantidad', defecto=0),
+        'costo': _decimal(fila, 'costo'),
+        'precio': _decimal(fila, 'precio'),
+    }
+    if pieza['cantidad'] < 0 or pieza['costo'] < 0 or pieza['precio'] < 0:
+        raise ValueError('cantidad, costo y precio no pueden ser negativos')
+    return pieza
+
+
+# ────────────────────────────────────────────────
+#                Inserción por lotes
+# ────────────────────────────────────────────────
+
+def _insert_ignorando_duplicados(modelo, columna):
+    """INSERT ... ON CONFLICT (columna) DO NOTHING en SQLite y PostgreSQL."""
+    dialecto = db.engine.dialect.name
+    if dialecto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as insert_dialecto
+    elif dialecto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as insert_dialecto
+    else:
+        return insert(modelo)
+    return insert_dialecto(modelo).on_conflict_do_nothing(index_elements=[columna])
+
+
+def _placas_existentes(placas):
+    if not placas:
+        return set()
+    return set(db.session.scalars(select(Vehiculo.placa).where(Vehiculo.placa.in_(placas))))
+
+
+def _lotes(filas, validar, resultado, tamano):
+    """Agrupa las filas válidas en lotes de (numero_fila, datos)."""
+    lote = []
+    for numero, fila in enumerate(filas, start=2):  # La fila 1 es el encabezado
+        if fila is None:
+            continue
+        resultado.leidas += 1
+        try:
+            lote.append((numero, validar(fila)))
+        except ValueError as e:
+            resultado.error(numero, str(e))
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+            cooperativo.ceder()  # Worker gevent: los demás requests corren entre lotes
+    if lote:
+        yield lote
+
+
+def _filtrar_placas(lote, placa_de, vistas, resultado):
+    """Quita del lote las placas repetidas en el archivo o ya registradas."""
+    existentes = _placas_existentes([placa_de(datos) for _, datos in lote if placa_de(datos)])
+    nuevas = []
+    for numero, datos in lote:
+        placa = placa_de(datos)
+        if placa and (placa in vistas or placa in existentes):
+            resultado.duplicadas += 1
+            resultado.error(numero, f'placa {placa} ya registrada')
+            continue
+        if placa:
+            vistas.add(placa)
+        nuevas.append((numero, datos))
+    return nuevas
+
+
+def _insertar_vehiculos(vehiculos):
+    if not vehiculos:
+        return 0
+    consulta = _insert_ignorando_duplicados(Vehiculo, 'placa').returning(Vehiculo.id)
+    return len(db.session.scalars(consulta, vehiculos).all())
+
+
+def _importar_clientes(filas, resultado, tamano):
+    vistas = set()
+    for lote in _lotes(filas, _validar_cliente, resultado, tamano):
+        lote = _filtrar_placas(lote, lambda datos: datos[1] and datos[1]['placa'], vistas, resultado)
+        if not lote:
+            continue
+        # Un solo INSERT con RETURNING para obtener los ids en el orden del lote
+        ids = db.session.scalars(
+            insert(Cliente).returning(Cliente.id, sort_by_parameter_order=True),
+            [cliente for _, (cliente, _) in lote]
+        ).all()
+        vehiculos = [dict(vehiculo, cliente_id=cliente_id)
+                     for cliente_id, (_, (_, vehiculo)) in zip(ids, lote) if vehiculo]
+        insertados = _insertar_vehiculos(vehiculos)
+        resultado.duplicadas += len(vehiculos) - insertados
+        db.session.commit()
+        resultado.insertadas += len(ids)
+
+
+def _importar_vehiculos(filas, resultado, tamano):
+    vistas = set()
+
+    def validar(fila):
+        return dict(_validar_vehiculo(fila), cliente_id=_entero(fila, 'cliente_id', requerido=True))
+
+    for lote in _lotes(filas, validar, resultado, tamano):
+        lote = _filtrar_placas(lote, lambda datos: datos['placa'], vistas, resultado)
+        clientes = set(db.session.scalars(
+            select(Cliente.id).where(Cliente.id.in_({datos['cliente_id'] for _, datos in lote}))
+        ))
+        vehiculos = []
+        for numero, datos in lote:
+            if datos['cliente_id'] in clientes:
+                vehiculos.append(datos)
+            else:
+                resultado.error(numero, f"el cliente {datos['cliente_id']} no existe")
+        insertados = _insertar_vehiculos(vehiculos)
+        resultado.duplicadas += len(vehiculos) - insertados
+        db.session.commit()
+        resultado.insertadas += insertados
+
+
+def _importar_inventario(filas, resultado, tamano):
+    for lote in _lotes(filas, _validar_inventario, resultado, tamano):
+        piezas = [datos for _, datos in lote]
+        ids = db.session.scalars(
+            insert(Inventario).returning(Inventario.id, sort_by_parameter_order=True), piezas
+        ).all()
+        # La existencia inicial entra al historial de movimientos (ver almacen.py)
+        ahora = datetime.utcnow()
+        db.session.execute(insert(MovimientoInventario), [
+            {'parte_id': parte_id, 'fecha': ahora, 'tipo': 'inicial', 'cantidad': pieza['cantidad'],
+             'existencia': pieza['cantidad'], 'costo_unitario': pieza['costo'], 'nota': 'Importación'}
+            for parte_id, pieza in zip(ids, piezas)
+        ])
+        db.session.commit()
+        resultado.insertadas += len(ids)
+
+
+_IMPORTADORES = {
+    'clientes': (_importar_clientes, 'clientes'),
+    'vehiculos': (_importar_vehiculos, 'clientes'),
+    'inventario': (_importar_inventario, 'inventario'),
+}
+
+TIPOS = tuple(_IMPORTADORES)
+
+
+def importar(tipo, archivo, nombre, tamano=None):
+    """Importa `archivo` (binario) como `tipo`; regresa un ResultadoImportacion."""
+    if tipo not in _IMPORTADORES:
+        raise ErrorImportacion(f'Tipo de importación desconocido: {tipo}')
+    importador, grupo = _IMPORTADORES[tipo]
+    tamano = tamano or int(current_app.config.get('IMPORTACION_LOTE', LOTE_POR_DEFECTO))
+    resultado = ResultadoImportacion()
+    try:
+        importador(leer_filas(archivo, nombre), resultado, tamano)
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        # Los INSERT directos no pasan por los eventos del ORM
+        if resultado.insertadas:
+            contadores.invalidar(grupo)
+    return resultado
+
+
+# ────────────────────────────────────────────────
+#                  Comandos CLI
+# ────────────────────────────────────────────────
+
+cli = AppGroup('importar', help='Carga masiva desde CSV o Excel.')
+
+
+def _comando(tipo):
+    @click.argument('archivo', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--lote', type=int, default=None, help=f'Filas por transacción (por defecto {LOTE_POR_DEFECTO}).')
+    def comando(archivo, lote):
+        inicio = datetime.now()
+        with open(archivo, 'rb') as f:
+            try:
+                resultado = importar(tipo, f, archivo, lote)
+            except ErrorImportacion as e:
+                raise click.ClickException(str(e))
+        for fila, mensaje in resultado.errores:
+            click.echo(f'Fila {fila}: {mensaje}', err=True)
+        segundos = (datetime.now() - inicio).total_seconds()
+        click.echo(f'{resultado} en {segundos:.1f}s')
+
+    comando.__doc__ = f'Importa {tipo} desde un archivo CSV o XLSX.'
+    return cli.command(tipo)(comando)
+
+
+for _tipo in TIPOS:
+    _comando(_tipo)
@@ -0,0 +1,117 @@
+"""Índices de búsqueda (FTS5 en SQLite, trigram + unaccent en PostgreSQL)
+
+Revision ID: 7895a7b29747
+Revises: 4514a3c01f14
+Create Date: 2026-10-18 10:12:41.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# Copia fija del DDL de busqueda.py al crear esta revisión: la migración no
+# debe cambiar si después cambia el módulo.
+TABLAS = {
+    'cliente': ('nombre', 'telefono', 'email'),
+    'vehiculo': ('placa', 'marca', 'modelo'),
+    'inventario': ('nombre_parte', 'numero_parte'),
+    'orden_trabajo': ('folio',),
+}
+
+DDL_SQLITE = [
+    'CREATE VIRTUAL TABLE IF NOT EXISTS cliente_fts USING fts5(nombre, telefono, email, '
+    "content='cliente', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    'CREATE TRIGGER IF NOT EXISTS cliente_fts_ai AFTER INSERT ON cliente BEGIN '
+    'INSERT INTO cliente_fts(rowid, nombre, telefono, email) VALUES (new.id, new.nombre, new.telefono, new.email); '
+    'END',
+    'CREATE TRIGGER IF NOT EXISTS cliente_fts_ad AFTER DELETE ON cliente BEGIN '
+    "INSERT INTO cliente_fts(cliente_fts, rowid, nombre, telefono, email) VALUES ('delete', old.id, old.nombre, old.telefono, old.email); "
+    'END',
+    'CREATE TRIGGER IF NOT EXISTS cliente_fts_au AFTER UPDATE OF nombre, telefono, email ON cliente BEGIN '
+    "INSERT INTO cliente_fts(cliente_fts, rowid, nombre, telefono, email) VALUES ('delete', old.id, old.nombre, old.telefono, old.email); "
+    'INSERT INTO cliente_fts(rowid, nombre, telefono, email) VALUES (new.id, new.nombre, new.telefono, new.email); '
+    'END',
+    'CREATE VIRTUAL TABLE IF NOT EXISTS vehiculo_fts USING fts5(placa, marca, modelo, '
+    "content='vehiculo', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    'CREATE TRIGGER IF NOT EXISTS vehiculo_fts_ai AFTER INSERT ON vehiculo BEGIN '
+    'INSERT INTO vehiculo_fts(rowid, placa, marca, modelo) VALUES (new.id, new.placa, new.marca, new.modelo); '
+    'END',
+    'CREATE TRIGGER IF NOT EXISTS vehiculo_fts_ad AFTER DELETE ON vehiculo BEGIN '
+    "INSERT INTO vehiculo_fts(vehiculo_fts, rowid, placa, marca, modelo) VALUES ('delete', old.id, old.placa, old.marca, old.modelo); "
+    'END',
+    'CREATE TRIGGER IF NOT EXISTS vehiculo_fts_au AFTER UPDATE OF placa, marca, modelo ON vehiculo BEGIN '
+    "INSERT INTO vehiculo_fts(vehiculo_fts, rowid, placa, marca, modelo) VALUES ('delete', old.id, old.placa, old.marca, old.modelo); "
+    'INSERT INTO vehiculo_fts(rowid, placa, marca, modelo) VALUES (new.id, new.placa, new.marca, new.modelo); '
+    'END',
+    'CREATE VIRTUAL TABLE IF NOT EXISTS inventario_fts USING fts5(nombre_parte, numero_parte, '
+    "content='inventario', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    'CREATE TRIGGER IF NOT EXISTS inventario_fts_ai AFTER INSERT ON inventario BEGIN '
+    'INSERT INTO inventario_fts(rowid, nombre_parte, numero_parte) VALUES (new.id, new.nombre_parte, new.numero_parte); '
+    'END',
+    'CREATE TRIGGER IF NOT EXISTS inventario_fts_ad AFTER DELETE ON inventario BEGIN '
+    "INSERT INTO inventario_fts(inventario_fts, rowid, nombre_parte, numero_parte) VALUES ('delete', old.id, old.nombre_parte, old.numero_parte); "
+    'END',
+    'CREATE TRIGGER IF NOT EXISTS inventario_fts_au AFTER UPDATE OF nombre_parte, numero_parte ON inventario BEGIN '
+    "INSERT INTO inventario_fts(inventario_fts, rowid, nombre_parte, numero_parte) VALUES ('delete', old.id, old.nombre_parte, old.numero_parte); "
+    'INSERT INTO inventario_fts(rowid, nombre_parte, numero_parte) VALUES (new.id, new.nombre_parte, new.numero_parte); '
+    'END',
+    'CREATE VIRTUAL TABLE IF NOT EXISTS orden_trabajo_fts USING fts5(folio, '
+    "content='orden_trabajo', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    'CREATE TRIGGER IF NOT EXISTS orden_trabajo_fts_ai AFTER INSERT ON orden_trabajo BEGIN '
+    'INSERT INTO orden_trabajo_fts(rowid, folio) VALUES (new.id, new.folio); '
+    'END',
+    'CREATE TRIGGER IF NOT EXISTS orden_trabajo_fts_ad AFTER DELETE ON orden_trabajo BEGIN '
+    "INSERT INTO orden_trabajo_fts(orden_trabajo_fts, rowid, folio) VALUES ('delete', old.id, old.folio); "
+    'END',
+    'CREATE TRIGGER IF NOT EXISTS orden_trabajo_fts_au AFTER UPDATE OF folio ON orden_trabajo BEGIN '
+    "INSERT INTO orden_trabajo_fts(orden_trabajo_fts, rowid, folio) VALUES ('delete', old.id, old.folio); "
+    'INSERT INTO orden_trabajo_fts(rowid, folio) VALUES (new.id, new.folio); '
+    'END',
+]
+
+DDL_POSTGRESQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE EXTENSION IF NOT EXISTS unaccent',
+    'CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text AS '
+    "$$ SELECT public.unaccent('public.unaccent', $1) $$ "
+    'LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT',
+    'CREATE INDEX IF NOT EXISTS ix_cliente_nombre_trgm ON cliente USING gin (f_unaccent(nombre) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_cliente_telefono_trgm ON cliente USING gin (f_unaccent(telefono) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_cliente_email_trgm ON cliente USING gin (f_unaccent(email) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_vehiculo_placa_trgm ON vehiculo USING gin (f_unaccent(placa) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_vehiculo_marca_trgm ON vehiculo USING gin (f_unaccent(marca) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_vehiculo_modelo_trgm ON vehiculo USING gin (f_unaccent(modelo) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_inventario_nombre_parte_trgm ON inventario USING gin (f_unaccent(nombre_parte) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_inventario_numero_parte_trgm ON inventario USING gin (f_unaccent(numero_parte) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_orden_trabajo_folio_trgm ON orden_trabajo USING gin (f_unaccent(folio) gin_trgm_ops)',
+]
+
+
+# revision identifiers, used by Alembic.
+revision = '7895a7b29747'
+down_revision = '4514a3c01f14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialecto = op.get_bind().dialect.name
+    for sentencia in {'sqlite': DDL_SQLITE, 'postgresql': DDL_POSTGRESQL}.get(dialecto, []):
+        op.execute(sentencia)
+    if dialecto == 'sqlite':
+        # Indexa las filas que ya existían antes de crear las triggers
+        for tabla in TABLAS:
+            op.execute(f"INSERT INTO {tabla}_fts({tabla}_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialecto = op.get_bind().dialect.name
+    for tabla, columnas in TABLAS.items():
+        if dialecto == 'sqlite':
+            for sufijo in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {tabla}_fts_{sufijo}')
+            op.execute(f'DROP TABLE IF EXISTS {tabla}_fts')
+        elif dialecto == 'postgresql':
+            for c in columnas:
+                op.execute(f'DROP INDEX IF EXISTS ix_{tabla}_{c}_trgm')
+    if dialecto == 'postgresql':
+        op.execute('DROP FUNCTION IF EXISTS f_unaccent(text)')
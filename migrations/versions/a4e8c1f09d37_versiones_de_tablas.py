@@ -0,0 +1,29 @@
+"""Versiones por tabla para la caché HTTP
+
+Revision ID: a4e8c1f09d37
+Revises: f7b3d9a2c6e5
+Create Date: 2026-10-18 19:03:27.551840
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4e8c1f09d37'
+down_revision = 'f7b3d9a2c6e5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('versiones_tabla',
+    sa.Column('tabla', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('actualizado', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('tabla')
+    )
+
+
+def downgrade():
+    op.drop_table('versiones_tabla')
@@ -0,0 +1,52 @@
+"""Tablas de resumen para reportes (órdenes, entregas y consumo de piezas)
+
+Revision ID: a7c2e9f4b318
+Revises: d3a9f6c2b817
+Create Date: 2026-10-19 00:12:37.418206
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c2e9f4b318'
+down_revision = 'd3a9f6c2b817'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('resumen_ordenes_dia',
+    sa.Column('fecha', sa.Date(), nullable=False),
+    sa.Column('estado', sa.String(length=50), nullable=False),
+    sa.Column('ordenes', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('fecha', 'estado')
+    )
+    op.create_table('resumen_entregas_dia',
+    sa.Column('fecha', sa.Date(), nullable=False),
+    sa.Column('entregadas', sa.Integer(), nullable=False),
+    sa.Column('dias_entrega', sa.Integer(), nullable=False),
+    sa.Column('con_compromiso', sa.Integer(), nullable=False),
+    sa.Column('a_tiempo', sa.Integer(), nullable=False),
+    sa.Column('ingresos', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('fecha')
+    )
+    op.create_table('consumo_partes_mes',
+    sa.Column('mes', sa.Date(), nullable=False),
+    sa.Column('parte_id', sa.Integer(), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.Column('importe', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['parte_id'], ['inventario.id'], ),
+    sa.PrimaryKeyConstraint('mes', 'parte_id')
+    )
+
+    # Llenar los resúmenes con el historial existente (lo mismo que `flask reportes reconciliar`)
+    import reportes
+    reportes.reconciliar(conn=op.get_bind())
+
+
+def downgrade():
+    op.drop_table('consumo_partes_mes')
+    op.drop_table('resumen_entregas_dia')
+    op.drop_table('resumen_ordenes_dia')
@@ -0,0 +1,33 @@
+"""Contador de folios para órdenes de trabajo
+
+Revision ID: b3e61f0c92d4
+Revises: 7895a7b29747
+Create Date: 2026-10-18 11:02:17.503921
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e61f0c92d4'
+down_revision = '7895a7b29747'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('folio_contador',
+    sa.Column('serie', sa.String(length=50), nullable=False),
+    sa.Column('valor', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('serie')
+    )
+    # La numeración continúa después del id más alto (esquema anterior: id + 1)
+    op.execute(
+        "INSERT INTO folio_contador (serie, valor) "
+        "SELECT 'orden_trabajo', COALESCE(MAX(id), 0) FROM orden_trabajo"
+    )
+
+
+def downgrade():
+    op.drop_table('folio_contador')
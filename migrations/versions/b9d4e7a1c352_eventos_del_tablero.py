@@ -0,0 +1,36 @@
+"""Eventos del tablero de órdenes en vivo
+
+Revision ID: b9d4e7a1c352
+Revises: e6b2a7d4f813
+Create Date: 2026-10-18 22:41:09.183264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9d4e7a1c352'
+down_revision = 'e6b2a7d4f813'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('eventos_tablero',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('fecha', sa.DateTime(), nullable=False),
+    sa.Column('tipo', sa.String(length=20), nullable=False),
+    sa.Column('orden_id', sa.Integer(), nullable=False),
+    sa.Column('datos', sa.JSON(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('eventos_tablero', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_eventos_tablero_fecha'), ['fecha'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('eventos_tablero', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_eventos_tablero_fecha'))
+
+    op.drop_table('eventos_tablero')
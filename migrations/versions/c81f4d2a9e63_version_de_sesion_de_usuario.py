@@ -0,0 +1,26 @@
+"""Versión de sesión de usuario
+
+Revision ID: c81f4d2a9e63
+Revises: a4e8c1f09d37
+Create Date: 2026-10-18 21:12:40.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81f4d2a9e63'
+down_revision = 'a4e8c1f09d37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sesion_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('sesion_version')
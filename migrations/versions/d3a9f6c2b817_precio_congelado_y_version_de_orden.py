@@ -0,0 +1,42 @@
+"""Precio congelado en refacciones de la orden y versión de la orden
+
+Revision ID: d3a9f6c2b817
+Revises: b9d4e7a1c352
+Create Date: 2026-10-18 23:18:52.604913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a9f6c2b817'
+down_revision = 'b9d4e7a1c352'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('orden_trabajo_partes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('precio_unitario', sa.Float(), nullable=True))
+
+    with op.batch_alter_table('orden_trabajo', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+    # Las refacciones ya agregadas se quedan con el precio de hoy
+    op.execute(
+        'UPDATE orden_trabajo_partes SET precio_unitario = '
+        '(SELECT precio FROM inventario WHERE inventario.id = orden_trabajo_partes.parte_id) '
+        'WHERE precio_unitario IS NULL'
+    )
+    # En SQLite batch_alter_table recrea las tablas y se pierden sus estadísticas del planificador
+    op.execute('ANALYZE orden_trabajo')
+    op.execute('ANALYZE orden_trabajo_partes')
+
+
+def downgrade():
+    with op.batch_alter_table('orden_trabajo', schema=None) as batch_op:
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('orden_trabajo_partes', schema=None) as batch_op:
+        batch_op.drop_column('precio_unitario')
@@ -0,0 +1,46 @@
+"""Cola de trabajos en segundo plano
+
+Revision ID: d5a8c27e4b19
+Revises: b3e61f0c92d4
+Create Date: 2026-10-18 13:40:52.118406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a8c27e4b19'
+down_revision = 'b3e61f0c92d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('trabajos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tipo', sa.String(length=50), nullable=False),
+    sa.Column('parametros', sa.JSON(), nullable=True),
+    sa.Column('estado', sa.String(length=20), nullable=False),
+    sa.Column('intentos', sa.Integer(), nullable=False),
+    sa.Column('max_intentos', sa.Integer(), nullable=False),
+    sa.Column('disponible_en', sa.DateTime(), nullable=False),
+    sa.Column('vence_en', sa.DateTime(), nullable=True),
+    sa.Column('worker', sa.String(length=100), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('resultado_ruta', sa.String(length=500), nullable=True),
+    sa.Column('resultado_nombre', sa.String(length=200), nullable=True),
+    sa.Column('resultado_mimetype', sa.String(length=100), nullable=True),
+    sa.Column('creado', sa.DateTime(), nullable=True),
+    sa.Column('terminado', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('trabajos', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_trabajos_estado'), ['estado'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('trabajos', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_trabajos_estado'))
+
+    op.drop_table('trabajos')
@@ -0,0 +1,72 @@
+"""Movimientos de inventario y cortes de existencias
+
+Revision ID: e2c94f1b7a30
+Revises: d5a8c27e4b19
+Create Date: 2026-10-18 15:12:08.774512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2c94f1b7a30'
+down_revision = 'd5a8c27e4b19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('movimientos_inventario',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('parte_id', sa.Integer(), nullable=False),
+    sa.Column('fecha', sa.DateTime(), nullable=False),
+    sa.Column('tipo', sa.String(length=20), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.Column('existencia', sa.Integer(), nullable=False),
+    sa.Column('costo_unitario', sa.Float(), nullable=True),
+    sa.Column('orden_trabajo_id', sa.Integer(), nullable=True),
+    sa.Column('orden_compra_id', sa.Integer(), nullable=True),
+    sa.Column('usuario_id', sa.Integer(), nullable=True),
+    sa.Column('nota', sa.String(length=200), nullable=True),
+    sa.ForeignKeyConstraint(['orden_compra_id'], ['orden_compra.id'], ),
+    sa.ForeignKeyConstraint(['orden_trabajo_id'], ['orden_trabajo.id'], ),
+    sa.ForeignKeyConstraint(['parte_id'], ['inventario.id'], ),
+    sa.ForeignKeyConstraint(['usuario_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('movimientos_inventario', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_movimientos_inventario_fecha'), ['fecha'], unique=False)
+        batch_op.create_index(batch_op.f('ix_movimientos_inventario_parte_id'), ['parte_id'], unique=False)
+
+    op.create_table('cortes_inventario',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('fecha', sa.DateTime(), nullable=False),
+    sa.Column('ultimo_movimiento_id', sa.Integer(), nullable=False),
+    sa.Column('parte_id', sa.Integer(), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.Column('costo', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['parte_id'], ['inventario.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('cortes_inventario', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_cortes_inventario_fecha'), ['fecha'], unique=False)
+
+    # El stock que ya existe entra al historial como movimiento inicial
+    op.execute(
+        "INSERT INTO movimientos_inventario (parte_id, fecha, tipo, cantidad, existencia, costo_unitario, nota) "
+        "SELECT id, CURRENT_TIMESTAMP, 'inicial', cantidad, cantidad, costo, 'Existencia al crear el historial' "
+        "FROM inventario"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('cortes_inventario', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_cortes_inventario_fecha'))
+
+    op.drop_table('cortes_inventario')
+    with op.batch_alter_table('movimientos_inventario', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_movimientos_inventario_parte_id'))
+        batch_op.drop_index(batch_op.f('ix_movimientos_inventario_fecha'))
+
+    op.drop_table('movimientos_inventario')
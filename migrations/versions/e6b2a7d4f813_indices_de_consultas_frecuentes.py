@@ -0,0 +1,40 @@
+"""Índices para listados, filtros y contadores
+
+Revision ID: e6b2a7d4f813
+Revises: c81f4d2a9e63
+Create Date: 2026-10-18 22:04:11.927354
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b2a7d4f813'
+down_revision = 'c81f4d2a9e63'
+branch_labels = None
+depends_on = None
+
+INDICES = [
+    ('ix_vehiculo_cliente_id', 'vehiculo', ['cliente_id']),
+    ('ix_inventario_cantidad_precio', 'inventario', ['cantidad', 'precio']),
+    ('ix_orden_compra_fecha', 'orden_compra', ['fecha']),
+    ('ix_orden_trabajo_partes_parte_id', 'orden_trabajo_partes', ['parte_id']),
+    ('ix_orden_trabajo_vehiculo_id', 'orden_trabajo', ['vehiculo_id']),
+    ('ix_orden_trabajo_fecha_creacion_id', 'orden_trabajo', ['fecha_creacion', 'id']),
+    ('ix_orden_trabajo_estado_fecha_creacion_id', 'orden_trabajo', ['estado', 'fecha_creacion', 'id']),
+    ('ix_orden_trabajo_estado_fecha_entrega', 'orden_trabajo', ['estado', 'fecha_entrega']),
+]
+
+
+def upgrade():
+    # En PostgreSQL se crean con CONCURRENTLY (fuera de una transacción) para no bloquear escrituras
+    with op.get_context().autocommit_block():
+        for nombre, tabla, columnas in INDICES:
+            op.create_index(nombre, tabla, columnas, unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for nombre, tabla, _ in reversed(INDICES):
+            op.drop_index(nombre, table_name=tabla, postgresql_concurrently=True)
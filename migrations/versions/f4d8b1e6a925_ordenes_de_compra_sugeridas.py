@@ -0,0 +1,40 @@
+"""Estado de la orden de compra y sus partidas (sugerencias de reabasto)
+
+Revision ID: f4d8b1e6a925
+Revises: a7c2e9f4b318
+Create Date: 2026-10-19 00:58:14.260931
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4d8b1e6a925'
+down_revision = 'a7c2e9f4b318'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('orden_compra', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('estado', sa.String(length=20), server_default='Recibida', nullable=False))
+
+    op.create_table('orden_compra_partidas',
+    sa.Column('orden_compra_id', sa.Integer(), nullable=False),
+    sa.Column('parte_id', sa.Integer(), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.Column('costo_unitario', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['orden_compra_id'], ['orden_compra.id'], ),
+    sa.ForeignKeyConstraint(['parte_id'], ['inventario.id'], ),
+    sa.PrimaryKeyConstraint('orden_compra_id', 'parte_id')
+    )
+    # En SQLite batch_alter_table recrea la tabla y se pierden sus estadísticas del planificador
+    op.execute('ANALYZE orden_compra')
+
+
+def downgrade():
+    op.drop_table('orden_compra_partidas')
+
+    with op.batch_alter_table('orden_compra', schema=None) as batch_op:
+        batch_op.drop_column('estado')
@@ -0,0 +1,32 @@
+"""Índices para el orden del autocompletado de clientes y piezas
+
+Revision ID: f7b3d9a2c6e5
+Revises: e2c94f1b7a30
+Create Date: 2026-10-18 17:25:41.306117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7b3d9a2c6e5'
+down_revision = 'e2c94f1b7a30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('cliente', schema=None) as batch_op:
+        batch_op.create_index('ix_cliente_nombre_id', ['nombre', 'id'], unique=False)
+
+    with op.batch_alter_table('inventario', schema=None) as batch_op:
+        batch_op.create_index('ix_inventario_nombre_parte_id', ['nombre_parte', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('inventario', schema=None) as batch_op:
+        batch_op.drop_index('ix_inventario_nombre_parte_id')
+
+    with op.batch_alter_table('cliente', schema=None) as batch_op:
+        batch_op.drop_index('ix_cliente_nombre_id')
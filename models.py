@@ -4,28 +4,72 @@ from sqlalchemy.dialects.sqlite import JSON
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from extensions import db
+import cooperativo
+
+
+def metodo_hash():
+    """Parámetros del hash de contraseñas (HASH_CONTRASENAS), p. ej. 'scrypt:32768:8:1'."""
+    from flask import current_app
+    return current_app.config.get('HASH_CONTRASENAS', 'scrypt:32768:8:1')
+
+
+def parametros_hash(metodo):
+    """
+    Método y parámetros de un hash de Werkzeug ('scrypt:32768:8:1',
+    'pbkdf2:sha256:600000'...), con los valores por defecto de Werkzeug para
+    los que falten: 'scrypt' y 'scrypt:32768:8:1' son lo mismo.
+    """
+    from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS
+    nombre, *partes = metodo.split(':')
+    try:
+        if nombre == 'scrypt':
+            valores = [int(valor) for valor in partes]
+            return ('scrypt', *(valores + [2 ** 15, 8, 1][len(valores):]))
+        if nombre == 'pbkdf2':
+            algoritmo = partes[0] if partes else 'sha256'
+            return ('pbkdf2', algoritmo, int(partes[1]) if len(partes) > 1 else DEFAULT_PBKDF2_ITERATIONS)
+    except ValueError:
+        pass
+    return (nombre, *partes)
 
 
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
+    sesion_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Sube al cambiar la contraseña
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        if self.password_hash:
+            self.sesion_version = (self.sesion_version or 0) + 1  # Cierra las sesiones abiertas
+        self.password_hash = cooperativo.en_hilo(generate_password_hash, password, method=metodo_hash())
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return cooperativo.en_hilo(check_password_hash, self.password_hash, password)
+
+    def necesita_rehash(self):
+        return parametros_hash(self.password_hash.split('$', 1)[0]) != parametros_hash(metodo_hash())
+
+    def get_id(self):
+        # La versión va en la cookie: al cambiar la contraseña, las sesiones anteriores dejan de valer
+        return f'{self.id}:{self.sesion_version or 0}'
 
 
 class Cliente(db.Model):
+    __table_args__ = (
+        db.Index('ix_cliente_nombre_id', 'nombre', 'id'),  # Orden del listado y del autocompletado
+    )
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(100), nullable=False)
     telefono = db.Column(db.String(20))
     email = db.Column(db.String(100))
     vehiculos = db.relationship('Vehiculo', backref='cliente', lazy=True)
+    num_vehiculos = db.query_expression()  # Se llena en los listados con with_expression (ver consultas.py)
 
 class Vehiculo(db.Model):
+    __table_args__ = (
+        db.Index('ix_vehiculo_cliente_id', 'cliente_id'),  # Vehículos de un cliente y su conteo en el listado
+    )
     id = db.Column(db.Integer, primary_key=True)
     marca = db.Column(db.String(50), nullable=False)
     modelo = db.Column(db.String(50), nullable=False)
@@ -34,8 +78,13 @@ class Vehiculo(db.Model):
     kms_actual = db.Column(db.Integer)
     cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'), nullable=False)
     ordenes_trabajo = db.relationship('OrdenTrabajo', backref='vehiculo', lazy=True, cascade="all, delete-orphan")
+    num_ordenes = db.query_expression()  # Se llena en los listados con with_expression (ver consultas.py)
 
 class Inventario(db.Model):
+    __table_args__ = (
+        db.Index('ix_inventario_nombre_parte_id', 'nombre_parte', 'id'),  # Orden del autocompletado
+        db.Index('ix_inventario_cantidad_precio', 'cantidad', 'precio'),  # Filtros de stock y contadores (cubre la suma)
+    )
     id = db.Column(db.Integer, primary_key=True)
     nombre_parte = db.Column(db.String(100))
     cantidad = db.Column(db.Integer, nullable=False, default=0.0)
@@ -53,12 +102,27 @@ class Inventario(db.Model):
     )
 
 class OrdenCompra(db.Model):
+    __table_args__ = (
+        db.Index('ix_orden_compra_fecha', 'fecha'),  # Filtro por fechas del listado y la exportación
+    )
     id = db.Column(db.Integer, primary_key=True)
     proveedor = db.Column(db.String(100), nullable=False)
     fecha = db.Column(db.Date, nullable=False, default=date.today)
     total = db.Column(db.Float, nullable=False)
-    # Lógica: Al crear, puedes agregar a inventario (ejemplo en app.py)
-    
+    estado = db.Column(db.String(20), nullable=False, default='Recibida', server_default='Recibida')  # Sugerida, Pendiente, Recibida
+    # Al recibirla, todas sus partidas entran al inventario a la vez (almacen.recibir)
+    partidas = db.relationship('PartidaCompra', backref='orden_compra', lazy=True, cascade='all, delete-orphan')
+
+
+class PartidaCompra(db.Model):
+    """Pieza, cantidad y costo de una orden de compra (ver compras.py; las sugeridas las escribe reabasto.py)."""
+    __tablename__ = 'orden_compra_partidas'
+    orden_compra_id = db.Column(db.Integer, db.ForeignKey('orden_compra.id'), primary_key=True)
+    parte_id = db.Column(db.Integer, db.ForeignKey('inventario.id'), primary_key=True)
+    cantidad = db.Column(db.Integer, nullable=False)
+    costo_unitario = db.Column(db.Float, nullable=False, default=0.0)
+    parte = db.relationship('Inventario')
+
 
 # Tabla intermedia (asociación) para many-to-many con cantidad
 orden_trabajo_partes = db.Table(
@@ -66,10 +130,18 @@ orden_trabajo_partes = db.Table(
     db.Column('orden_id', db.Integer, db.ForeignKey('orden_trabajo.id'), primary_key=True),
     db.Column('parte_id', db.Integer, db.ForeignKey('inventario.id'), primary_key=True),
     db.Column('cantidad_usada', db.Integer, nullable=False, default=1),
+    db.Column('precio_unitario', db.Float),  # Precio al público al agregarla a la orden (ver cotizaciones.py)
+    db.Index('ix_orden_trabajo_partes_parte_id', 'parte_id'),  # La llave primaria ya cubre orden_id
     extend_existing=True
 )
 
 class OrdenTrabajo(db.Model):
+    __table_args__ = (
+        db.Index('ix_orden_trabajo_vehiculo_id', 'vehiculo_id'),  # Órdenes de un vehículo y su conteo
+        db.Index('ix_orden_trabajo_fecha_creacion_id', 'fecha_creacion', 'id'),  # Orden del listado y rango de fechas
+        db.Index('ix_orden_trabajo_estado_fecha_creacion_id', 'estado', 'fecha_creacion', 'id'),  # Listado por estado
+        db.Index('ix_orden_trabajo_estado_fecha_entrega', 'estado', 'fecha_entrega'),  # "Completadas hoy"
+    )
     id = db.Column(db.Integer, primary_key=True)
     folio = db.Column(db.String(20), unique=True)  # Nuevo: Folio secuencial como en Excels (ej: 'FOLIO-001')
     vehiculo_id = db.Column(db.Integer, db.ForeignKey('vehiculo.id'), nullable=False)
@@ -81,6 +153,7 @@ class OrdenTrabajo(db.Model):
     fecha_compromiso = db.Column(db.Date)  # Nuevo: Fecha compromiso entrega (de Excels)
     fecha_entrega = db.Column(db.Date)
     danios_zonas = db.Column(JSON, nullable=True)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Sube con cada cambio (ver cotizaciones.py)
     
     # Relación many-to-many con Inventario
     partes = db.relationship(
@@ -91,9 +164,8 @@ class OrdenTrabajo(db.Model):
     )
     
     def generar_folio(self):
-        ultimo = OrdenTrabajo.query.order_by(desc(OrdenTrabajo.id)).first()
-        num = (ultimo.id + 1) if ultimo else 1
-        self.folio = f"FOLIO-{num:03d}"
+        from folios import siguiente_folio  # folios.py importa este módulo
+        self.folio = siguiente_folio()
     
     def get_partes_con_cantidad(self):
         return db.session.query(
@@ -108,6 +180,119 @@ class OrdenTrabajo(db.Model):
 
     def __repr__(self):
         return f'<OrdenTrabajo {self.id} - {self.estado}>'
+
+
+class MovimientoInventario(db.Model):
+    """Entrada o salida de stock. Solo se insertan, nunca se editan (ver almacen.py)."""
+    __tablename__ = 'movimientos_inventario'
+    id = db.Column(db.Integer, primary_key=True)
+    parte_id = db.Column(db.Integer, db.ForeignKey('inventario.id'), nullable=False, index=True)
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    tipo = db.Column(db.String(20), nullable=False)  # inicial, entrada, salida, ajuste
+    cantidad = db.Column(db.Integer, nullable=False)  # Positiva en entradas, negativa en salidas
+    existencia = db.Column(db.Integer, nullable=False)  # Stock de la pieza después del movimiento
+    costo_unitario = db.Column(db.Float)
+    orden_trabajo_id = db.Column(db.Integer, db.ForeignKey('orden_trabajo.id'))
+    orden_compra_id = db.Column(db.Integer, db.ForeignKey('orden_compra.id'))
+    usuario_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    nota = db.Column(db.String(200))
+
+
+class CorteInventario(db.Model):
+    """Existencia y costo de cada pieza al momento de un corte (ver almacen.py)."""
+    __tablename__ = 'cortes_inventario'
+    id = db.Column(db.Integer, primary_key=True)
+    fecha = db.Column(db.DateTime, nullable=False, index=True)
+    ultimo_movimiento_id = db.Column(db.Integer, nullable=False)  # Movimientos hasta este id ya están sumados
+    parte_id = db.Column(db.Integer, db.ForeignKey('inventario.id'), nullable=False)
+    cantidad = db.Column(db.Integer, nullable=False)
+    costo = db.Column(db.Float)
+
+
+class VersionTabla(db.Model):
+    """Versión de cada tabla; sube en cada commit que la modifica (ver versiones.py)."""
+    __tablename__ = 'versiones_tabla'
+    tabla = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    actualizado = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class Trabajo(db.Model):
+    """Trabajo en segundo plano (PDFs, reportes, exportaciones). Ver trabajos.py."""
+    __tablename__ = 'trabajos'
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)
+    parametros = db.Column(JSON, nullable=True)
+    estado = db.Column(db.String(20), nullable=False, default='pendiente', index=True)  # pendiente, en_proceso, completado, fallido
+    intentos = db.Column(db.Integer, nullable=False, default=0)
+    max_intentos = db.Column(db.Integer, nullable=False, default=3)
+    disponible_en = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Para reintentos con espera
+    vence_en = db.Column(db.DateTime)  # Si el worker muere, el trabajo se libera al vencer
+    worker = db.Column(db.String(100))
+    error = db.Column(db.Text)
+    resultado_ruta = db.Column(db.String(500))
+    resultado_nombre = db.Column(db.String(200))
+    resultado_mimetype = db.Column(db.String(100))
+    creado = db.Column(db.DateTime, default=datetime.utcnow)
+    terminado = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'estado': self.estado,
+            'intentos': self.intentos,
+            'error': self.error,
+            'creado': self.creado.isoformat() if self.creado else None,
+            'terminado': self.terminado.isoformat() if self.terminado else None,
+        }
+
+
+class EventoTablero(db.Model):
+    """Cambio de una orden para el tablero en vivo: estado, alta, refacción (ver tablero.py)."""
+    __tablename__ = 'eventos_tablero'
+    id = db.Column(db.Integer, primary_key=True)
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    tipo = db.Column(db.String(20), nullable=False)  # nueva, estado, refaccion
+    orden_id = db.Column(db.Integer, nullable=False)  # Sin FK: el evento sobrevive a la orden
+    datos = db.Column(JSON, nullable=True)
+
+
+class FolioContador(db.Model):
+    """Último número entregado por serie de folios (ver folios.py)."""
+    __tablename__ = 'folio_contador'
+    serie = db.Column(db.String(50), primary_key=True)
+    valor = db.Column(db.Integer, nullable=False, default=0)
     
 
 
+
+
+# Resúmenes para reportes; se mantienen en cada escritura y `flask reportes reconciliar` (ver reportes.py)
+
+class ResumenOrdenesDia(db.Model):
+    """Órdenes creadas cada día, por su estado actual."""
+    __tablename__ = 'resumen_ordenes_dia'
+    fecha = db.Column(db.Date, primary_key=True)  # Día de fecha_creacion
+    estado = db.Column(db.String(50), primary_key=True)
+    ordenes = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ResumenEntregasDia(db.Model):
+    """Órdenes entregadas cada día: tiempos, cumplimiento del compromiso e ingresos."""
+    __tablename__ = 'resumen_entregas_dia'
+    fecha = db.Column(db.Date, primary_key=True)  # Día de fecha_entrega
+    entregadas = db.Column(db.Integer, nullable=False, default=0)
+    dias_entrega = db.Column(db.Integer, nullable=False, default=0)  # Suma de días de creación a entrega
+    con_compromiso = db.Column(db.Integer, nullable=False, default=0)
+    a_tiempo = db.Column(db.Integer, nullable=False, default=0)  # Entregadas en o antes de fecha_compromiso
+    ingresos = db.Column(db.Float, nullable=False, default=0)  # Subtotal de refacciones (sin IVA)
+
+
+class ConsumoPartesMes(db.Model):
+    """Piezas usadas en órdenes por mes (salidas de almacén con orden)."""
+    __tablename__ = 'consumo_partes_mes'
+    mes = db.Column(db.Date, primary_key=True)  # Primer día del mes
+    parte_id = db.Column(db.Integer, db.ForeignKey('inventario.id'), primary_key=True)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+    importe = db.Column(db.Float, nullable=False, default=0)  # Cantidad por precio congelado en la orden
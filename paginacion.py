@@ -0,0 +1,91 @@
+# paginacion.py
+# Paginación por cursor (keyset) para los listados.
+# En vez de OFFSET, cada página filtra por la clave de ordenamiento de la
+# última fila vista (WHERE (nombre, id) > (:nombre, :id) LIMIT n+1), así que
+# cuesta lo mismo en la página 1 que en la 5000. El total es aproximado: se
+# toma de la caché de contadores (ver contadores.total).
+import base64
+import json
+from datetime import date, datetime
+
+from sqlalchemy import tuple_
+
+
+def _a_json(valor):
+    if isinstance(valor, datetime):
+        return {'dt': valor.isoformat()}
+    if isinstance(valor, date):
+        return {'d': valor.isoformat()}
+    return valor
+
+
+def _de_json(valor):
+    if isinstance(valor, dict):
+        if 'dt' in valor:
+            return datetime.fromisoformat(valor['dt'])
+        if 'd' in valor:
+            return date.fromisoformat(valor['d'])
+    return valor
+
+
+def codificar_cursor(valores, direccion):
+    datos = json.dumps({'v': [_a_json(v) for v in valores], 'd': direccion}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Devuelve (valores, direccion) o (None, 'sig') si el cursor no es válido."""
+    if not cursor:
+        return None, 'sig'
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        return [_de_json(v) for v in datos['v']], ('ant' if datos['d'] == 'ant' else 'sig')
+    except (ValueError, KeyError, TypeError):
+        return None, 'sig'
+
+
+class PaginaKeyset:
+    """Página de resultados con cursores hacia la siguiente y la anterior."""
+
+    def __init__(self, items, columnas, has_next, has_prev, total=None):
+        self.items = items
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.total = total
+        self.cursor_siguiente = self._cursor(items[-1], columnas, 'sig') if items and has_next else None
+        self.cursor_anterior = self._cursor(items[0], columnas, 'ant') if items and has_prev else None
+
+    @staticmethod
+    def _cursor(item, columnas, direccion):
+        return codificar_cursor([getattr(item, c.key) for c in columnas], direccion)
+
+
+def paginar(query, columnas, descendente=False, cursor=None, por_pagina=20, total=None):
+    """
+    Pagina `query` por las `columnas` indicadas (la última debe ser única,
+    normalmente el id). Todas se ordenan en la misma dirección.
+    """
+    valores, direccion = decodificar_cursor(cursor)
+    if valores is not None and len(valores) != len(columnas):
+        valores, direccion = None, 'sig'
+
+    # Al ir hacia atrás se recorre en sentido inverso y luego se voltea
+    hacia_atras = direccion == 'ant'
+    invertir = descendente != hacia_atras
+
+    clave = tuple_(*columnas)
+    query = query.order_by(None)
+    if valores is not None:
+        limite = tuple_(*valores)
+        query = query.filter(clave < limite if invertir else clave > limite)
+    query = query.order_by(*[c.desc() if invertir else c.asc() for c in columnas])
+
+    filas = query.limit(por_pagina + 1).all()
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+
+    if hacia_atras:
+        filas.reverse()
+        return PaginaKeyset(filas, columnas, has_next=True, has_prev=hay_mas, total=total)
+    return PaginaKeyset(filas, columnas, has_next=hay_mas, has_prev=valores is not None, total=total)
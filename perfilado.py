@@ -0,0 +1,199 @@
+# perfilado.py
+# Perfilado de requests y SQL (opcional: PERFILADO=1).
+#
+# Por cada request se mide el tiempo total, cuántas consultas SQL corrió,
+# cuánto tiempo pasó en la base y cuánto en render_template. Se acumula por
+# endpoint y se guardan los últimos requests y las consultas lentas en
+# buffers circulares (memoria de cada worker; se pierden al reiniciar).
+#
+# - Respuesta: encabezado Server-Timing (lo muestran las devtools).
+# - /metrics: texto en formato Prometheus (admin o PERFILADO_TOKEN).
+# - /admin/perfilado: tabla por endpoint, últimos requests y consultas lentas.
+# - Consultas de más de PERFILADO_CONSULTA_LENTA_MS se registran en el log.
+#
+# Sin PERFILADO los listeners ni se registran: cero costo en producción.
+import hmac
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+
+from flask import (current_app, g, has_app_context, has_request_context, request, template_rendered,
+                   before_render_template)
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+CONSULTA_LENTA_MS = 100
+TAMANO_BUFFER = 200
+LARGO_SENTENCIA = 500  # Caracteres de SQL que se guardan por consulta lenta
+
+_candado = threading.Lock()
+_por_endpoint = defaultdict(lambda: {'requests': 0, 'errores': 0, 'tiempo': 0.0, 'maximo': 0.0,
+                                     'consultas': 0, 'tiempo_sql': 0.0, 'tiempo_plantillas': 0.0})
+_recientes = deque(maxlen=TAMANO_BUFFER)
+_lentas = deque(maxlen=TAMANO_BUFFER)
+_inicio_proceso = datetime.utcnow()
+
+
+def activo():
+    return current_app.config.get('PERFILADO', False)
+
+
+def es_admin(usuario=None):
+    usuario = usuario or current_user
+    return bool(usuario and usuario.is_authenticated and
+                usuario.username in current_app.config.get('PERFILADO_ADMINS', ('admin',)))
+
+
+# ────────────────────────────────────────────────
+#                   Mediciones
+# ────────────────────────────────────────────────
+
+def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    conn.info['perfil_inicio'] = time.perf_counter()
+
+
+def _despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info.pop('perfil_inicio', None)
+    if inicio is None:
+        return
+    duracion = time.perf_counter() - inicio
+    endpoint = None
+    if has_request_context():
+        g.perfil_consultas = g.get('perfil_consultas', 0) + 1
+        g.perfil_sql = g.get('perfil_sql', 0.0) + duracion
+        endpoint = request.endpoint
+    elif not has_app_context():
+        return
+
+    limite = current_app.config.get('PERFILADO_CONSULTA_LENTA_MS', CONSULTA_LENTA_MS)
+    if duracion * 1000 >= limite:
+        sentencia = ' '.join(statement.split())[:LARGO_SENTENCIA]
+        current_app.logger.warning('Consulta lenta (%.1f ms) en %s: %s', duracion * 1000, endpoint, sentencia)
+        with _candado:
+            _lentas.append({'fecha': datetime.utcnow(), 'endpoint': endpoint, 'ms': duracion * 1000,
+                            'sentencia': sentencia})
+
+
+def _antes_de_plantilla(app, template, context, **extra):
+    if has_request_context():
+        g.setdefault('perfil_plantillas_inicios', []).append(time.perf_counter())
+
+
+def _despues_de_plantilla(app, template, context, **extra):
+    if has_request_context() and g.get('perfil_plantillas_inicios'):
+        g.perfil_plantillas = g.get('perfil_plantillas', 0.0) + time.perf_counter() - g.perfil_plantillas_inicios.pop()
+
+
+def _antes_de_request():
+    g.perfil_inicio = time.perf_counter()
+
+
+def _despues_de_request(respuesta):
+    inicio = g.get('perfil_inicio')
+    if inicio is None or request.endpoint in (None, 'static'):
+        return respuesta
+    duracion = time.perf_counter() - inicio
+    consultas = g.get('perfil_consultas', 0)
+    tiempo_sql = g.get('perfil_sql', 0.0)
+    tiempo_plantillas = g.get('perfil_plantillas', 0.0)
+
+    with _candado:
+        datos = _por_endpoint[request.endpoint]
+        datos['requests'] += 1
+        datos['errores'] += respuesta.status_code >= 500
+        datos['tiempo'] += duracion
+        datos['maximo'] = max(datos['maximo'], duracion)
+        datos['consultas'] += consultas
+        datos['tiempo_sql'] += tiempo_sql
+        datos['tiempo_plantillas'] += tiempo_plantillas
+        _recientes.append({'fecha': datetime.utcnow(), 'metodo': request.method, 'ruta': request.full_path.rstrip('?'),
+                           'endpoint': request.endpoint, 'estado': respuesta.status_code, 'ms': duracion * 1000,
+                           'consultas': consultas, 'sql_ms': tiempo_sql * 1000,
+                           'plantillas_ms': tiempo_plantillas * 1000})
+
+    respuesta.headers['Server-Timing'] = (
+        f'app;dur={duracion * 1000:.1f}, sql;dur={tiempo_sql * 1000:.1f};desc="{consultas} consultas", '
+        f'tpl;dur={tiempo_plantillas * 1000:.1f}'
+    )
+    return respuesta
+
+
+# ────────────────────────────────────────────────
+#                    Consulta
+# ────────────────────────────────────────────────
+
+def resumen():
+    """Copia de los datos acumulados: (por_endpoint, recientes, lentas), lo más nuevo primero."""
+    with _candado:
+        por_endpoint = {endpoint: dict(datos) for endpoint, datos in _por_endpoint.items()}
+        return por_endpoint, list(reversed(_recientes)), list(reversed(_lentas))
+
+
+def reiniciar():
+    with _candado:
+        _por_endpoint.clear()
+        _recientes.clear()
+        _lentas.clear()
+
+
+def _etiqueta(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def metricas_texto():
+    """Métricas por endpoint en formato de texto de Prometheus."""
+    por_endpoint, _, lentas = resumen()
+    series = [
+        ('taller_requests_total', 'counter', 'Requests atendidos', 'requests'),
+        ('taller_requests_errores_total', 'counter', 'Requests con estado 5xx', 'errores'),
+        ('taller_request_segundos_total', 'counter', 'Tiempo total de los requests', 'tiempo'),
+        ('taller_request_segundos_max', 'gauge', 'Request más lento desde el arranque', 'maximo'),
+        ('taller_consultas_sql_total', 'counter', 'Consultas SQL ejecutadas', 'consultas'),
+        ('taller_sql_segundos_total', 'counter', 'Tiempo en la base de datos', 'tiempo_sql'),
+        ('taller_plantillas_segundos_total', 'counter', 'Tiempo en render_template', 'tiempo_plantillas'),
+    ]
+    lineas = []
+    for nombre, tipo, ayuda, campo in series:
+        lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} {tipo}']
+        for endpoint in sorted(por_endpoint):
+            valor = por_endpoint[endpoint][campo]
+            valor = valor if isinstance(valor, int) else f'{valor:.6f}'
+            lineas.append(f'{nombre}{{endpoint="{_etiqueta(endpoint)}"}} {valor}')
+    lineas += ['# HELP taller_consultas_lentas_recientes Consultas lentas en el buffer',
+               '# TYPE taller_consultas_lentas_recientes gauge',
+               f'taller_consultas_lentas_recientes {len(lentas)}',
+               '# HELP taller_proceso_inicio_segundos Arranque del worker (epoch)',
+               '# TYPE taller_proceso_inicio_segundos gauge',
+               f'taller_proceso_inicio_segundos {(_inicio_proceso - datetime(1970, 1, 1)).total_seconds():.0f}']
+    return '\n'.join(lineas) + '\n'
+
+
+def acceso_metricas():
+    """Admins con sesión, o PERFILADO_TOKEN en `Authorization: Bearer` (para el scraper)."""
+    token = current_app.config.get('PERFILADO_TOKEN')
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    return es_admin()
+
+
+# ────────────────────────────────────────────────
+#                   Activación
+# ────────────────────────────────────────────────
+
+def init_app(app):
+    """Registra los listeners si PERFILADO está activo."""
+    global _recientes, _lentas
+    if not app.config.get('PERFILADO', False):
+        return
+    tamano = int(app.config.get('PERFILADO_BUFFER', TAMANO_BUFFER))
+    _recientes = deque(maxlen=tamano)
+    _lentas = deque(maxlen=tamano)
+
+    event.listen(Engine, 'before_cursor_execute', _antes_de_consulta)
+    event.listen(Engine, 'after_cursor_execute', _despues_de_consulta)
+    before_render_template.connect(_antes_de_plantilla, app)
+    template_rendered.connect(_despues_de_plantilla, app)
+    app.before_request(_antes_de_request)
+    app.after_request(_despues_de_request)
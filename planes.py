@@ -0,0 +1,180 @@
+# planes.py
+# Verificación de planes de consulta (EXPLAIN) de listados y contadores.
+#
+#   flask planes verificar
+#
+# Cada caso corre la consulta real, con las mismas funciones que usan las
+# vistas (consultas.py, paginar, contadores.py). Se capturan los SELECT que
+# emite y se revisa su plan:
+# - SQLite: EXPLAIN QUERY PLAN. Falla un "SCAN tabla" sin índice y un
+#   "USE TEMP B-TREE FOR ORDER BY" (ordenar sin índice).
+# - PostgreSQL: EXPLAIN (FORMAT JSON) con enable_seqscan = off, así solo hay
+#   "Seq Scan" si ningún índice sirve para la consulta.
+# Algunas tablas se recorren a propósito por la llave primaria (ORDER BY id
+# DESC LIMIT n) y algunos filtros dejan pocas filas que conviene ordenar en
+# memoria (los vehículos de un cliente): el caso lo declara en `permitir`
+# (nombre de la tabla, o 'ORDER BY'). Sale con 1 si algún caso falla.
+# Con la base vacía o sin ANALYZE el planeador puede elegir otro plan; correr
+# sobre datos reales o sintéticos (flask sinteticos generar).
+from datetime import date, timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, text
+
+import contadores
+import reportes
+from consultas import (consulta_clientes, consulta_vehiculos, consulta_inventario, consulta_ordenes,
+                       consulta_compras, sugerencias_clientes, sugerencias_partes)
+from extensions import db
+from models import Cliente, Vehiculo, Inventario, OrdenTrabajo, OrdenCompra
+from paginacion import paginar
+
+
+def _listado(query, columnas, descendente=False, por_pagina=20):
+    paginar(query, columnas, descendente=descendente, por_pagina=por_pagina, total=query.order_by(None).count())
+
+
+def _contador(grupo):
+    contadores.invalidar(grupo)
+    contadores.obtener(grupo)
+
+
+def casos():
+    """{nombre: (función que corre la consulta, lo que el plan puede hacer sin índice)}"""
+    hoy = date.today()
+    hace_un_mes = hoy - timedelta(days=30)
+    hace_un_anio = hoy - timedelta(days=365)
+    orden_clientes = [Cliente.nombre, Cliente.id]
+    orden_vehiculos = [Vehiculo.placa, Vehiculo.id]
+    orden_ordenes = [OrdenTrabajo.fecha_creacion, OrdenTrabajo.id]
+    return {
+        'clientes': (lambda: _listado(consulta_clientes(), orden_clientes), ()),
+        'clientes con vehículos': (lambda: _listado(consulta_clientes('', 'con_vehiculos'), orden_clientes), ()),
+        'clientes sin vehículos': (lambda: _listado(consulta_clientes('', 'sin_vehiculos'), orden_clientes), ()),
+        'vehículos': (lambda: _listado(consulta_vehiculos(), orden_vehiculos), ()),
+        'vehículos de un cliente': (lambda: _listado(consulta_vehiculos('', '1'), orden_vehiculos),
+                                    ('ORDER BY',)),
+        'vehículos por cliente (API)': (lambda: Vehiculo.query.filter_by(cliente_id=1).all(), ()),
+        'inventario': (lambda: _listado(consulta_inventario(), [Inventario.id], True, 10), ('inventario',)),
+        'inventario bajo stock': (lambda: _listado(consulta_inventario('', 'bajo'), [Inventario.id], True, 10),
+                                  ('inventario', 'ORDER BY')),
+        'inventario crítico': (lambda: _listado(consulta_inventario('', 'critico'), [Inventario.id], True, 10),
+                               ('inventario',)),
+        'órdenes': (lambda: _listado(consulta_ordenes(), orden_ordenes, True, 15), ()),
+        'órdenes pendientes': (lambda: _listado(consulta_ordenes('Pendiente'), orden_ordenes, True, 15), ()),
+        'órdenes por fecha': (lambda: _listado(consulta_ordenes('todas', '', hace_un_mes, hoy), orden_ordenes, True, 15),
+                              ()),
+        'órdenes completadas por fecha': (
+            lambda: _listado(consulta_ordenes('Completado', '', hace_un_mes, hoy), orden_ordenes, True, 15), ()),
+        'refacciones de una orden': (lambda: OrdenTrabajo(id=1).get_partes_con_cantidad(), ()),
+        'compras': (lambda: _listado(consulta_compras(), [OrdenCompra.id], True), ('orden_compra',)),
+        'compras por fecha': (lambda: _listado(consulta_compras('', hace_un_mes, hoy), [OrdenCompra.id], True),
+                              ('orden_compra', 'ORDER BY')),
+        'sugerencias de clientes': (lambda: sugerencias_clientes(''), ()),
+        'sugerencias de piezas con stock': (lambda: sugerencias_partes('', solo_con_stock=True), ()),
+        'contadores de órdenes': (lambda: _contador('ordenes'), ()),
+        'contadores de inventario': (lambda: _contador('inventario'), ()),
+        'contadores de clientes': (lambda: _contador('clientes'), ()),
+        'reportes por mes': (lambda: reportes.periodos(hace_un_anio, hoy), ()),
+        'piezas más usadas': (lambda: reportes.consumo_partes(hace_un_anio, hoy), ('ORDER BY',)),
+    }
+
+
+# ────────────────────────────────────────────────
+#                 Captura y EXPLAIN
+# ────────────────────────────────────────────────
+
+def _capturar(funcion):
+    """SELECTs (sentencia, parámetros) que ejecuta `funcion`."""
+    sentencias = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and not executemany:
+            sentencias.append((statement, parameters))
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', registrar)
+    try:
+        funcion()
+    finally:
+        event.remove(engine, 'before_cursor_execute', registrar)
+        db.session.rollback()
+    return sentencias
+
+
+def _problemas_sqlite(conexion, sentencia, parametros, permitir):
+    problemas = []
+    for fila in conexion.exec_driver_sql('EXPLAIN QUERY PLAN ' + sentencia, parametros):
+        detalle = fila[-1]
+        if detalle.startswith('SCAN ') and ' USING ' not in detalle and 'VIRTUAL TABLE' not in detalle:
+            tabla = detalle.split()[1]
+            if tabla not in permitir:
+                problemas.append(detalle)
+        elif 'TEMP B-TREE FOR' in detalle and 'ORDER BY' in detalle and 'ORDER BY' not in permitir:
+            problemas.append(detalle)
+    return problemas
+
+
+def _nodos(plan):
+    yield plan
+    for hijo in plan.get('Plans', ()):
+        yield from _nodos(hijo)
+
+
+def _problemas_postgresql(conexion, sentencia, parametros, permitir):
+    conexion.execute(text('SET LOCAL enable_seqscan = off'))
+    plan = conexion.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + sentencia, parametros).scalar()
+    return [
+        f"Seq Scan on {nodo['Relation Name']}"
+        for nodo in _nodos(plan[0]['Plan'])
+        if nodo['Node Type'] == 'Seq Scan' and nodo['Relation Name'] not in permitir
+    ]
+
+
+def verificar(mostrar=lambda texto: None):
+    """{caso: [(sentencia, problemas)]} de los casos con algún plan sin índice."""
+    dialecto = db.engine.dialect.name
+    if dialecto == 'sqlite':
+        revisar = _problemas_sqlite
+    elif dialecto == 'postgresql':
+        revisar = _problemas_postgresql
+    else:
+        raise click.ClickException(f'No se revisan planes para {dialecto}')
+
+    fallas = {}
+    for nombre, (funcion, permitir) in casos().items():
+        sentencias = _capturar(funcion)
+        encontrados = []
+        conexion = db.session.connection()
+        for sentencia, parametros in sentencias:
+            problemas = revisar(conexion, sentencia, parametros, permitir)
+            if problemas:
+                encontrados.append((sentencia, problemas))
+        db.session.rollback()
+        mostrar(f"{'FALLA' if encontrados else 'ok   '} {nombre} ({len(sentencias)} consultas)")
+        if encontrados:
+            fallas[nombre] = encontrados
+    return fallas
+
+
+# ────────────────────────────────────────────────
+#                  Comandos CLI
+# ────────────────────────────────────────────────
+
+cli = AppGroup('planes', help='Revisión de planes de consulta (EXPLAIN).')
+
+
+@cli.command('verificar')
+def verificar_comando():
+    """Revisa que listados y contadores usen índices."""
+    fallas = verificar(mostrar=click.echo)
+    for nombre, encontrados in fallas.items():
+        click.echo(f'\n{nombre}:')
+        for sentencia, problemas in encontrados:
+            click.echo(f"  {' '.join(sentencia.split())[:200]}")
+            for problema in problemas:
+                click.echo(f'    -> {problema}')
+    if fallas:
+        raise SystemExit(1)
+    click.echo('Todas las consultas usan índices')
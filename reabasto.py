@@ -0,0 +1,225 @@
+# reabasto.py
+# Pronóstico de consumo y sugerencias de compra para todo el inventario.
+#
+#   flask reabasto sugerir --semanas 26 --cobertura 14 --nivel-servicio 0.95
+#
+# En una sola pasada, sin recorrer piezas con el ORM:
+# - El consumo sale de orden_trabajo_partes con la fecha de su orden (una
+#   consulta, sin GROUP BY: ordenar cientos de miles de filas en la base
+#   cuesta más que sumarlas) y se acumula en una matriz piezas x semanas
+#   con NumPy.
+# - Demanda semanal por pieza: promedio móvil exponencial de las semanas
+#   (ALFA), como producto matriz-vector; su desviación, igual.
+# - Tiempo de entrega por proveedor: días promedio de la fecha de la orden de
+#   compra a su primera entrada de almacén; TIEMPO_ENTREGA_DIAS si no hay
+#   historial.
+# - Punto de reorden = demanda diaria x tiempo de entrega + z x desviación
+#   diaria x raíz(tiempo de entrega). Se compara la posición de inventario
+#   (existencia + lo pedido en órdenes de compra 'Pendiente'): las piezas en
+#   o bajo su punto de reorden se piden hasta cubrir además `cobertura` días
+#   de demanda. Así una pieza ya pedida no se vuelve a sugerir cada noche.
+# - Se escribe una OrdenCompra 'Sugerida' por proveedor con sus partidas.
+#   Cada corrida reemplaza las sugeridas anteriores; las demás no se tocan.
+#
+# NumPy se importa solo al calcular: los workers web no lo cargan.
+import math
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from statistics import NormalDist
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import Date, Integer, cast, delete, func, insert, select
+
+from extensions import db
+from models import Inventario, MovimientoInventario, OrdenCompra, OrdenTrabajo, PartidaCompra, orden_trabajo_partes
+
+SEMANAS = 26  # Historial de consumo
+ALFA = 0.2  # Peso de la semana más reciente en el promedio móvil exponencial
+COBERTURA_DIAS = 14  # Demanda que se pide además del punto de reorden
+NIVEL_SERVICIO = 0.95  # Probabilidad de no quedarse sin stock mientras llega el pedido
+TIEMPO_ENTREGA_DIAS = 7  # Proveedores sin historial de entregas
+SIN_PROVEEDOR = 'Sin proveedor'
+
+Resultado = namedtuple('Resultado', 'piezas sugeridas ordenes segundos')
+
+
+# ────────────────────────────────────────────────
+#             Lectura en bloque
+# ────────────────────────────────────────────────
+
+def _dias_desde(fecha, desde):
+    if db.engine.dialect.name == 'sqlite':
+        return cast(func.julianday(fecha) - func.julianday(desde.isoformat()), Integer)
+    return cast(fecha, Date) - desde  # PostgreSQL: date - date = entero
+
+
+def _consumo(desde):
+    """(parte_id, día desde `desde`, cantidad) de cada refacción usada en órdenes desde `desde`."""
+    otp = orden_trabajo_partes.c
+    # Por la conexión y no por la sesión: cientos de miles de filas sin pasar por el ORM
+    return db.session.connection().execute(
+        select(otp.parte_id, _dias_desde(OrdenTrabajo.fecha_creacion, desde), otp.cantidad_usada)
+        .join(OrdenTrabajo, OrdenTrabajo.id == otp.orden_id)
+        .where(OrdenTrabajo.fecha_creacion >= datetime.combine(desde, datetime.min.time()),
+               OrdenTrabajo.estado != 'Cancelado')
+    ).all()
+
+
+def _en_camino():
+    """(parte_id, cantidad) pedida en órdenes de compra 'Pendiente' (aún sin recibir)."""
+    return db.session.connection().execute(
+        select(PartidaCompra.parte_id, func.sum(PartidaCompra.cantidad))
+        .join(OrdenCompra, OrdenCompra.id == PartidaCompra.orden_compra_id)
+        .where(OrdenCompra.estado == 'Pendiente')
+        .group_by(PartidaCompra.parte_id)
+    ).all()
+
+
+def _indices(ids, parte):
+    """Posición de cada `parte` en `ids` (ordenado) y máscara de las que existen."""
+    import numpy as np
+
+    indice = np.searchsorted(ids, parte)
+    valida = (indice < len(ids)) & (ids[np.minimum(indice, len(ids) - 1)] == parte)
+    return indice, valida
+
+
+def tiempos_entrega(desde):
+    """{proveedor: días promedio de la orden de compra a su primera entrada de almacén}."""
+    primera = (
+        select(MovimientoInventario.orden_compra_id, func.min(MovimientoInventario.fecha).label('llegada'))
+        .where(MovimientoInventario.fecha >= datetime.combine(desde, datetime.min.time()),
+               MovimientoInventario.tipo == 'entrada', MovimientoInventario.orden_compra_id.isnot(None))
+        .group_by(MovimientoInventario.orden_compra_id)
+        .subquery()
+    )
+    dias = {}
+    for proveedor, fecha, llegada in db.session.execute(
+        select(OrdenCompra.proveedor, OrdenCompra.fecha, primera.c.llegada)
+        .join(primera, primera.c.orden_compra_id == OrdenCompra.id)
+    ):
+        dias.setdefault(proveedor, []).append(max((llegada.date() - fecha).days, 0))
+    return {proveedor: sum(valores) / len(valores) for proveedor, valores in dias.items()}
+
+
+# ────────────────────────────────────────────────
+#                    Cálculo
+# ────────────────────────────────────────────────
+
+def calcular(semanas=SEMANAS, cobertura=COBERTURA_DIAS, nivel_servicio=NIVEL_SERVICIO, hoy=None):
+    """
+    Punto de reorden y cantidad sugerida de cada pieza. Regresa un dict de
+    arreglos de NumPy alineados por pieza: ids, proveedor, costo, existencia,
+    en_camino, demanda_diaria, punto_reorden, sugerida.
+    """
+    import numpy as np
+
+    hoy = hoy or date.today()
+    desde = hoy - timedelta(weeks=semanas)
+
+    piezas = db.session.connection().execute(
+        select(Inventario.id, Inventario.cantidad, Inventario.costo, Inventario.proveedor).order_by(Inventario.id)
+    ).all()
+    ids = np.fromiter((fila[0] for fila in piezas), dtype=np.int64, count=len(piezas))
+    existencia = np.fromiter((fila[1] or 0 for fila in piezas), dtype=np.float64, count=len(piezas))
+    costo = np.fromiter((fila[2] or 0 for fila in piezas), dtype=np.float64, count=len(piezas))
+    proveedor = np.array([(fila[3] or '').strip() or SIN_PROVEEDOR for fila in piezas], dtype=object)
+
+    # Matriz piezas x semanas (la última columna es la semana que termina hoy)
+    consumo = np.zeros((len(ids), semanas))
+    filas = _consumo(desde)
+    if filas and len(ids):
+        parte, dia, cantidad = (np.array(columna, dtype=np.int64) for columna in zip(*filas))
+        indice, valida = _indices(ids, parte)
+        semana = np.clip(dia // 7, 0, semanas - 1)
+        np.add.at(consumo, (indice[valida], semana[valida]), cantidad[valida])
+
+    # Lo ya pedido y sin recibir cuenta como existencia para decidir si pedir
+    en_camino = np.zeros(len(ids))
+    pedidas = _en_camino()
+    if pedidas and len(ids):
+        parte, cantidad = (np.array(columna, dtype=np.int64) for columna in zip(*pedidas))
+        indice, valida = _indices(ids, parte)
+        en_camino[indice[valida]] = cantidad[valida]
+
+    pesos = (1 - ALFA) ** np.arange(semanas)[::-1]
+    pesos /= pesos.sum()
+    demanda_semanal = consumo @ pesos
+    desviacion_semanal = np.sqrt(((consumo - demanda_semanal[:, None]) ** 2) @ pesos)
+
+    # Tiempo de entrega de cada pieza según su proveedor
+    nombres, por_pieza = np.unique(proveedor.astype(str), return_inverse=True)
+    historial = tiempos_entrega(hoy - timedelta(days=365))
+    entrega = np.array([max(historial.get(nombre, TIEMPO_ENTREGA_DIAS), 1) for nombre in nombres])[por_pieza]
+
+    z = NormalDist().inv_cdf(nivel_servicio)
+    demanda_diaria = demanda_semanal / 7
+    punto_reorden = demanda_diaria * entrega + z * (desviacion_semanal / math.sqrt(7)) * np.sqrt(entrega)
+    objetivo = punto_reorden + demanda_diaria * cobertura
+    posicion = existencia + en_camino
+    pedir = (demanda_diaria > 0) & (posicion <= punto_reorden)
+    sugerida = np.where(pedir, np.ceil(np.maximum(objetivo - posicion, 0)), 0).astype(np.int64)
+
+    return {
+        'ids': ids, 'proveedor': proveedor, 'costo': costo, 'existencia': existencia, 'en_camino': en_camino,
+        'demanda_diaria': demanda_diaria, 'punto_reorden': punto_reorden, 'sugerida': sugerida,
+    }
+
+
+# ────────────────────────────────────────────────
+#            Órdenes de compra sugeridas
+# ────────────────────────────────────────────────
+
+def sugerir(semanas=SEMANAS, cobertura=COBERTURA_DIAS, nivel_servicio=NIVEL_SERVICIO):
+    """Reemplaza las órdenes de compra 'Sugerida' con una por proveedor (en la sesión, sin commit)."""
+    import numpy as np
+
+    inicio = time.perf_counter()
+    datos = calcular(semanas, cobertura, nivel_servicio)
+    sugeridas = np.flatnonzero(datos['sugerida'] > 0)
+
+    anteriores = select(OrdenCompra.id).where(OrdenCompra.estado == 'Sugerida')
+    db.session.execute(delete(PartidaCompra).where(PartidaCompra.orden_compra_id.in_(anteriores)))
+    db.session.execute(delete(OrdenCompra).where(OrdenCompra.estado == 'Sugerida'))
+
+    por_proveedor = {}
+    for i in sugeridas.tolist():
+        por_proveedor.setdefault(datos['proveedor'][i], []).append(i)
+    partidas = []
+    for proveedor in sorted(por_proveedor):
+        indices = por_proveedor[proveedor]
+        cantidades, costos = datos['sugerida'][indices], datos['costo'][indices]
+        orden = OrdenCompra(proveedor=proveedor[:100], estado='Sugerida',
+                            total=round(float(cantidades @ costos), 2))
+        db.session.add(orden)
+        db.session.flush()  # Un INSERT por proveedor; las partidas van juntas abajo
+        partidas += [{'orden_compra_id': orden.id, 'parte_id': parte_id, 'cantidad': cantidad,
+                      'costo_unitario': costo_unitario}
+                     for parte_id, cantidad, costo_unitario
+                     in zip(datos['ids'][indices].tolist(), cantidades.tolist(), costos.tolist())]
+    if partidas:
+        db.session.execute(insert(PartidaCompra.__table__), partidas)
+    return Resultado(len(datos['ids']), len(partidas), len(por_proveedor), time.perf_counter() - inicio)
+
+
+# ────────────────────────────────────────────────
+#                  Comandos CLI
+# ────────────────────────────────────────────────
+
+cli = AppGroup('reabasto', help='Pronóstico de consumo y órdenes de compra sugeridas.')
+
+
+@cli.command('sugerir')
+@click.option('--semanas', default=SEMANAS, show_default=True, help='Semanas de historial de consumo.')
+@click.option('--cobertura', default=COBERTURA_DIAS, show_default=True,
+              help='Días de demanda a pedir además del punto de reorden.')
+@click.option('--nivel-servicio', default=NIVEL_SERVICIO, show_default=True,
+              help='Probabilidad de no quedarse sin stock mientras llega el pedido.')
+def sugerir_comando(semanas, cobertura, nivel_servicio):
+    """Calcula puntos de reorden y escribe las órdenes de compra sugeridas."""
+    resultado = sugerir(semanas, cobertura, nivel_servicio)
+    db.session.commit()
+    click.echo(f'{resultado.piezas} piezas analizadas en {resultado.segundos:.2f} s: '
+               f'{resultado.sugeridas} por pedir en {resultado.ordenes} órdenes sugeridas')
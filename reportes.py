@@ -0,0 +1,357 @@
+# reportes.py
+# Indicadores del taller sobre tablas de resumen, sin recorrer las órdenes.
+#
+# - resumen_ordenes_dia: órdenes creadas por día y estado actual.
+# - resumen_entregas_dia: por día de entrega, cuántas se entregaron, días de
+#   creación a entrega (suma, para el promedio), cuántas tenían compromiso y
+#   cuántas lo cumplieron, e ingresos (subtotal de refacciones sin IVA).
+# - consumo_partes_mes: piezas usadas en órdenes por mes y pieza. Es mensual
+#   y no diaria: por día sería casi tan grande como las salidas de almacén;
+#   por mes crece con el catálogo, no con el volumen de órdenes.
+#
+# Se mantienen en la misma transacción que el cambio: altas, cambios de
+# estado y de fecha de entrega de OrdenTrabajo se detectan en el flush (se
+# resta lo que aportaba la orden antes y se suma lo que aporta ahora); las
+# refacciones, que van por UPDATE directo, llaman a `refaccion_agregada`.
+# Las cargas masivas (sinteticos.py) y cualquier deriva se corrigen con
+# `flask reportes reconciliar` (cron nocturno), que recalcula desde las
+# órdenes y solo reescribe las filas que no coinciden.
+#
+# La página /reportes solo lee estas tablas: un año son ~365 filas por
+# tabla diaria más las piezas usadas por mes, sin importar cuántas órdenes haya.
+from collections import Counter, defaultdict
+from datetime import date, datetime, time, timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import Date, Integer, and_, bindparam, case, cast, delete, event, func, insert, inspect, select, text, update
+from sqlalchemy.orm import Session
+
+import cotizaciones
+from extensions import db
+from models import (ConsumoPartesMes, Inventario, MovimientoInventario, OrdenTrabajo, ResumenEntregasDia,
+                    ResumenOrdenesDia, orden_trabajo_partes)
+
+_ORDENES = ResumenOrdenesDia.__table__
+_ENTREGAS = ResumenEntregasDia.__table__
+_CONSUMO = ConsumoPartesMes.__table__
+_CAMPOS = ('fecha_creacion', 'estado', 'fecha_compromiso', 'fecha_entrega')
+ESTADOS = ('Pendiente', 'En progreso', 'Completado', 'Cancelado')  # Columnas de la página
+
+
+# ────────────────────────────────────────────────
+#            Sumas a los resúmenes
+# ────────────────────────────────────────────────
+
+def _insert_dialecto(conn):
+    dialecto = conn.dialect.name
+    if dialecto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as insert_dialecto
+    elif dialecto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as insert_dialecto
+    else:
+        return None
+    return insert_dialecto
+
+
+def _sumar(conn, tabla, incrementos):
+    """Suma {llave: {columna: incremento}} a `tabla` (llave en el orden de la llave primaria)."""
+    llave = [columna.name for columna in tabla.primary_key.columns]
+    valores = [columna.name for columna in tabla.columns if not columna.primary_key]
+    # Mismo orden en todos los workers: dos commits no se bloquean en cruz
+    filas = [dict(zip(llave, clave), **{columna: cambios.get(columna, 0) for columna in valores})
+             for clave, cambios in sorted(incrementos.items()) if any(cambios.values())]
+    if not filas:
+        return
+    insert_dialecto = _insert_dialecto(conn)
+    if insert_dialecto is not None:
+        consulta = insert_dialecto(tabla)
+        conn.execute(consulta.on_conflict_do_update(
+            index_elements=llave,
+            set_={columna: tabla.c[columna] + consulta.excluded[columna] for columna in valores},
+        ), filas)
+        return
+    for fila in filas:
+        cambiadas = conn.execute(
+            update(tabla)
+            .where(*(tabla.c[columna] == fila[columna] for columna in llave))
+            .values({columna: tabla.c[columna] + fila[columna] for columna in valores})
+        ).rowcount
+        if not cambiadas:
+            conn.execute(insert(tabla).values(fila))
+
+
+def _foto(orden, antes):
+    """(creación, estado, compromiso, entrega) de la orden antes o después del flush."""
+    valores = []
+    for campo in _CAMPOS:
+        historial = inspect(orden).attrs[campo].history
+        if antes and historial.has_changes():
+            valores.append(historial.deleted[0] if historial.deleted else None)
+        else:
+            valores.append(getattr(orden, campo))
+    return tuple(valores)
+
+
+def _aportar(incrementos, foto, signo, ingresos):
+    creacion, estado, compromiso, entrega = foto
+    if creacion is None:
+        return
+    incrementos[_ORDENES][creacion.date(), estado or 'Pendiente'].update({'ordenes': signo})
+    if entrega is None:
+        return
+    incrementos[_ENTREGAS][entrega,].update({
+        'entregadas': signo,
+        'dias_entrega': signo * (entrega - creacion.date()).days,
+        'con_compromiso': signo * (compromiso is not None),
+        'a_tiempo': signo * (compromiso is not None and entrega <= compromiso),
+        'ingresos': signo * ingresos,
+    })
+
+
+@event.listens_for(Session, 'after_flush')
+def _actualizar_resumenes(session, flush_context):
+    # En after_flush new/dirty/deleted y el historial aún son los del flush
+    cambios = [(None, orden) for orden in session.new if isinstance(orden, OrdenTrabajo)]
+    cambios += [(orden, orden) for orden in session.dirty if isinstance(orden, OrdenTrabajo)]
+    cambios += [(orden, None) for orden in session.deleted if isinstance(orden, OrdenTrabajo)]
+    if not cambios:
+        return
+    conn = session.connection()
+    incrementos = defaultdict(lambda: defaultdict(Counter))
+    for antes, despues in cambios:
+        foto_antes = _foto(antes, antes=True) if antes is not None else None
+        foto_despues = _foto(despues, antes=False) if despues is not None else None
+        if foto_antes == foto_despues:
+            continue
+        ingresos = 0
+        if (foto_antes and foto_antes[3]) or (foto_despues and foto_despues[3]):
+            orden_id = (antes or despues).id
+            ingresos = conn.execute(
+                select(cotizaciones.subtotales(orden_trabajo_partes.c.orden_id == orden_id).subquery().c.subtotal)
+            ).scalar() or 0
+        if foto_antes:
+            _aportar(incrementos, foto_antes, -1, ingresos)
+        if foto_despues:
+            _aportar(incrementos, foto_despues, 1, ingresos)
+    for tabla, filas in incrementos.items():
+        _sumar(conn, tabla, filas)
+
+
+def refaccion_agregada(orden_id, parte_id, cantidad):
+    """Suma la refacción al consumo del mes (en la transacción de la sesión, ya agregada a la orden)."""
+    otp = orden_trabajo_partes.c
+    precio = db.session.execute(
+        select(func.coalesce(otp.precio_unitario, Inventario.precio))
+        .select_from(orden_trabajo_partes)
+        .join(Inventario, Inventario.id == otp.parte_id)
+        .where(otp.orden_id == orden_id, otp.parte_id == parte_id)
+    ).scalar() or 0
+    mes = datetime.utcnow().date().replace(day=1)  # Como la fecha de la salida de almacén
+    _sumar(db.session.connection(), _CONSUMO, {(mes, parte_id): {'cantidad': cantidad, 'importe': cantidad * precio}})
+
+
+# ────────────────────────────────────────────────
+#       Reconciliación desde las tablas de origen
+# ────────────────────────────────────────────────
+
+def _dias(conn, entrega, creacion):
+    if conn.dialect.name == 'sqlite':
+        return cast(func.julianday(entrega) - func.julianday(func.date(creacion)), Integer)
+    return entrega - cast(creacion, Date)  # PostgreSQL: date - date = entero
+
+
+def _mes(conn, fecha):
+    if conn.dialect.name == 'sqlite':
+        return func.date(fecha, 'start of month', type_=Date)
+    return cast(func.date_trunc('month', fecha), Date)
+
+
+def _calcular(conn, desde):
+    """{tabla: {llave: (valores...)}} calculado desde las órdenes y salidas de almacén."""
+    ot = OrdenTrabajo
+    dia = func.date(ot.fecha_creacion, type_=Date)
+    estado = func.coalesce(ot.estado, 'Pendiente')
+    ordenes = select(dia, estado, func.count()).group_by(dia, estado)
+
+    condiciones = [ot.fecha_entrega.isnot(None)]
+    subtotales = cotizaciones.subtotales()
+    if desde is not None:
+        ordenes = ordenes.where(ot.fecha_creacion >= datetime.combine(desde, time.min))
+        condiciones.append(ot.fecha_entrega >= desde)
+        subtotales = cotizaciones.subtotales(orden_trabajo_partes.c.orden_id.in_(select(ot.id).where(*condiciones)))
+    subtotales = subtotales.subquery()
+    entregas = (
+        select(ot.fecha_entrega, func.count(), func.coalesce(func.sum(_dias(conn, ot.fecha_entrega, ot.fecha_creacion)), 0),
+               func.count(ot.fecha_compromiso),
+               func.coalesce(func.sum(case((ot.fecha_entrega <= ot.fecha_compromiso, 1), else_=0)), 0),
+               func.coalesce(func.sum(subtotales.c.subtotal), 0))
+        .outerjoin(subtotales, subtotales.c.orden_id == ot.id)
+        .where(*condiciones)
+        .group_by(ot.fecha_entrega)
+    )
+
+    otp = orden_trabajo_partes.c
+    movimiento = MovimientoInventario
+    mes = _mes(conn, movimiento.fecha)
+    usada = -movimiento.cantidad
+    consumo = (
+        select(mes, movimiento.parte_id, func.sum(usada),
+               func.sum(usada * func.coalesce(otp.precio_unitario, Inventario.precio)))
+        .join(Inventario, Inventario.id == movimiento.parte_id)
+        .outerjoin(orden_trabajo_partes, and_(otp.orden_id == movimiento.orden_trabajo_id,
+                                              otp.parte_id == movimiento.parte_id))
+        .where(movimiento.tipo == 'salida', movimiento.orden_trabajo_id.isnot(None))
+        .group_by(mes, movimiento.parte_id)
+    )
+    if desde is not None:
+        consumo = consumo.where(movimiento.fecha >= datetime.combine(desde.replace(day=1), time.min))
+
+    resultado = {}
+    for tabla, consulta in ((_ORDENES, ordenes), (_ENTREGAS, entregas), (_CONSUMO, consumo)):
+        largo = len(tabla.primary_key.columns)
+        resultado[tabla] = {tuple(fila[:largo]): tuple(fila[largo:]) for fila in conn.execute(consulta)}
+    return resultado
+
+
+def _bloquear(conn):
+    """Detiene las sumas de otros workers hasta el commit: nada se cuenta dos veces ni se pierde."""
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text(f'LOCK TABLE {_ORDENES.name}, {_ENTREGAS.name}, {_CONSUMO.name} IN EXCLUSIVE MODE'))
+    else:
+        # SQLite: la primera escritura toma el candado de escritura de la base
+        conn.execute(update(_ORDENES).where(_ORDENES.c.ordenes < 0).values(ordenes=_ORDENES.c.ordenes))
+
+
+def _iguales(actual, calculada):
+    return len(actual) == len(calculada) and all(
+        round(a or 0, 2) == round(c or 0, 2) for a, c in zip(actual, calculada))
+
+
+def reconciliar(desde=None, conn=None):
+    """
+    Recalcula los resúmenes desde `desde` (todo el historial si es None) y
+    corrige las filas que no coinciden. Regresa {tabla: filas corregidas}.
+    """
+    conn = conn or db.session.connection()
+    _bloquear(conn)
+    corregidas = {}
+    for tabla, calculadas in _calcular(conn, desde).items():
+        llave = list(tabla.primary_key.columns)
+        valores = [columna for columna in tabla.columns if not columna.primary_key]
+        actuales = select(*llave, *valores)
+        if desde is not None:
+            actuales = actuales.where(llave[0] >= (desde.replace(day=1) if tabla is _CONSUMO else desde))
+        actuales = {tuple(fila[:len(llave)]): tuple(fila[len(llave):]) for fila in conn.execute(actuales)}
+
+        # Filas en cero (órdenes que cambiaron de estado o de entrega) se limpian sin contar como diferencia
+        vacias = [clave for clave, fila in actuales.items() if clave not in calculadas and not any(fila)]
+        borrar = [clave for clave, fila in actuales.items()
+                  if clave not in calculadas or not _iguales(fila, calculadas[clave])]
+        escribir = [clave for clave, fila in calculadas.items()
+                    if clave not in actuales or not _iguales(actuales[clave], fila)]
+        if borrar:
+            conn.execute(delete(tabla).where(*(columna == bindparam(f'b_{columna.name}') for columna in llave)),
+                         [{f'b_{columna.name}': valor for columna, valor in zip(llave, clave)} for clave in borrar])
+        if escribir:
+            conn.execute(insert(tabla), [
+                dict(zip([c.name for c in llave + valores], clave + calculadas[clave])) for clave in escribir])
+        corregidas[tabla.name] = len(set(borrar) | set(escribir)) - len(vacias)
+    return corregidas
+
+
+# ────────────────────────────────────────────────
+#              Lectura para la página
+# ────────────────────────────────────────────────
+
+class Periodo:
+    """Indicadores de un día o un mes."""
+
+    def __init__(self, inicio):
+        self.inicio = inicio
+        self.creadas = Counter()  # estado -> órdenes creadas en el periodo
+        self.entregadas = 0
+        self.dias_entrega = 0
+        self.con_compromiso = 0
+        self.a_tiempo = 0
+        self.ingresos = 0.0
+
+    @property
+    def total_creadas(self):
+        return sum(self.creadas.values())
+
+    @property
+    def promedio_dias(self):
+        return self.dias_entrega / self.entregadas if self.entregadas else None
+
+    @property
+    def cumplimiento(self):
+        return 100.0 * self.a_tiempo / self.con_compromiso if self.con_compromiso else None
+
+    def sumar(self, otro):
+        self.creadas.update(otro.creadas)
+        for campo in ('entregadas', 'dias_entrega', 'con_compromiso', 'a_tiempo', 'ingresos'):
+            setattr(self, campo, getattr(self, campo) + getattr(otro, campo))
+
+
+def periodos(desde, hasta, por_mes=True):
+    """([Periodo] de `desde` a `hasta` por día o por mes, Periodo con el total); dos consultas."""
+    def inicio(fecha):
+        return fecha.replace(day=1) if por_mes else fecha
+
+    resultado = {}
+    for fecha, estado, ordenes in db.session.execute(
+        select(ResumenOrdenesDia.fecha, ResumenOrdenesDia.estado, ResumenOrdenesDia.ordenes)
+        .where(ResumenOrdenesDia.fecha.between(desde, hasta))
+    ):
+        periodo = resultado.setdefault(inicio(fecha), Periodo(inicio(fecha)))
+        periodo.creadas[estado] += ordenes
+    for fila in db.session.execute(
+        select(ResumenEntregasDia.fecha, ResumenEntregasDia.entregadas, ResumenEntregasDia.dias_entrega,
+               ResumenEntregasDia.con_compromiso, ResumenEntregasDia.a_tiempo, ResumenEntregasDia.ingresos)
+        .where(ResumenEntregasDia.fecha.between(desde, hasta))
+    ):
+        periodo = resultado.setdefault(inicio(fila.fecha), Periodo(inicio(fila.fecha)))
+        periodo.entregadas += fila.entregadas
+        periodo.dias_entrega += fila.dias_entrega
+        periodo.con_compromiso += fila.con_compromiso
+        periodo.a_tiempo += fila.a_tiempo
+        periodo.ingresos += fila.ingresos
+
+    total = Periodo(desde)
+    for periodo in resultado.values():
+        total.sumar(periodo)
+    return [resultado[clave] for clave in sorted(resultado)], total
+
+
+def consumo_partes(desde, hasta, limite=20):
+    """Piezas más usadas en los meses de `desde` a `hasta`: (parte_id, nombre, número, cantidad, importe)."""
+    cantidad = func.sum(ConsumoPartesMes.cantidad).label('cantidad')
+    return db.session.execute(
+        select(ConsumoPartesMes.parte_id, Inventario.nombre_parte, Inventario.numero_parte, cantidad,
+               func.sum(ConsumoPartesMes.importe).label('importe'))
+        .join(Inventario, Inventario.id == ConsumoPartesMes.parte_id)
+        .where(ConsumoPartesMes.mes.between(desde.replace(day=1), hasta))
+        .group_by(ConsumoPartesMes.parte_id, Inventario.nombre_parte, Inventario.numero_parte)
+        .order_by(cantidad.desc(), ConsumoPartesMes.parte_id)
+        .limit(limite)
+    ).all()
+
+
+# ────────────────────────────────────────────────
+#                  Comandos CLI
+# ────────────────────────────────────────────────
+
+cli = AppGroup('reportes', help='Resúmenes de órdenes, entregas y consumo de piezas.')
+
+
+@cli.command('reconciliar')
+@click.option('--dias', type=int, default=None,
+              help='Solo los últimos N días (por fecha de creación, entrega o salida); por defecto todo.')
+def reconciliar_comando(dias):
+    """Recalcula los resúmenes desde las órdenes (programarlo cada noche)."""
+    desde = date.today() - timedelta(days=dias) if dias else None
+    corregidas = reconciliar(desde)
+    db.session.commit()
+    for tabla, filas in corregidas.items():
+        click.echo(f'{tabla}: {filas} filas corregidas')
@@ -0,0 +1,182 @@
+# sesiones.py
+# Carga del usuario de la sesión y login sin trabajo de más.
+#
+# - Flask-Login llama al user_loader en cada request con sesión. El usuario
+#   se guarda en memoria del proceso SESION_TTL segundos (copia ligera, sin
+#   sesión del ORM), con la llave de la cookie: "id:versión". Cambiar la
+#   contraseña sube la versión, así las cookies anteriores dejan de valer.
+#   El proceso que hace el cambio olvida al usuario en el acto; los demás
+#   workers no se enteran y lo siguen aceptando hasta que vence su copia,
+#   por eso el TTL es de pocos segundos: alcanza para las ráfagas de una
+#   página (HTML, fetch, SSE) sin dejar abierta una sesión cerrada.
+# - HASH_CONTRASENAS define método y parámetros del hash. Al entrar con una
+#   contraseña guardada con otros parámetros se vuelve a calcular (rehash),
+#   sin que el usuario haga nada. Un usuario que no existe se verifica
+#   contra un hash señuelo con los mismos parámetros: el tiempo de respuesta
+#   no dice qué usuarios existen.
+# - Verificar una contraseña cuesta ~100 ms de CPU a propósito. Para que una
+#   ráfaga de logins (cambio de turno) no acapare el proceso, solo corren
+#   LOGIN_CONCURRENTES verificaciones a la vez; las demás esperan hasta
+#   LOGIN_ESPERA segundos y si no, reciben 429. Además, un usuario con
+#   LOGIN_FALLOS_MAX intentos fallidos desde la misma IP en LOGIN_VENTANA
+#   segundos espera; los demás usuarios del taller (detrás del mismo router)
+#   siguen entrando. La IP del cliente sale de X-Forwarded-For (ProxyFix en
+#   app.py, PROXY_SALTOS).
+import secrets
+import threading
+import time
+from collections import deque
+
+from flask import current_app, request
+from flask_login import UserMixin
+from sqlalchemy import event, select
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from extensions import db
+import cooperativo
+from models import User, metodo_hash
+
+TTL_POR_DEFECTO = 5  # segundos; lo que otro worker puede tardar en ver un cambio de contraseña
+MAX_CACHE = 1000
+
+_candado = threading.Lock()
+_cache = {}  # "id:versión" -> (expira, UsuarioSesion o None)
+_fallos = {}  # (usuario, ip) -> deque de time.monotonic() de intentos fallidos
+_semaforo = None
+_senuelos = {}  # metodo_hash() -> hash de una contraseña que nadie tiene
+
+
+class DemasiadosIntentos(Exception):
+    def __init__(self, espera):
+        super().__init__(f'Demasiados intentos de inicio de sesión; intenta de nuevo en {espera} s')
+        self.espera = espera
+
+
+class UsuarioSesion(UserMixin):
+    """Lo que vistas y plantillas usan de current_user, sin objeto del ORM."""
+
+    def __init__(self, id, username, sesion_version):
+        self.id = id
+        self.username = username
+        self.sesion_version = sesion_version
+
+    def get_id(self):
+        return f'{self.id}:{self.sesion_version}'
+
+
+# ────────────────────────────────────────────────
+#               Usuario de la sesión
+# ────────────────────────────────────────────────
+
+def cargar_usuario(llave):
+    """user_loader: UsuarioSesion de la cookie, o None si ya no es válida."""
+    ahora = time.monotonic()
+    with _candado:
+        entrada = _cache.get(llave)
+    if entrada and entrada[0] > ahora:
+        return entrada[1]
+
+    # Cookies de antes de las versiones traen solo el id: versión 0
+    id_texto, _, version_texto = llave.partition(':')
+    try:
+        usuario_id, version = int(id_texto), int(version_texto or 0)
+    except ValueError:
+        return None
+    fila = db.session.execute(
+        select(User.id, User.username, User.sesion_version).where(User.id == usuario_id)
+    ).first()
+    usuario = UsuarioSesion(*fila) if fila and fila.sesion_version == version else None
+
+    ttl = current_app.config.get('SESION_TTL', TTL_POR_DEFECTO)
+    with _candado:
+        if len(_cache) >= MAX_CACHE:
+            _cache.clear()
+        _cache[llave] = (ahora + ttl, usuario)
+    return usuario
+
+
+def olvidar(usuario_id):
+    """Saca de la caché las sesiones de `usuario_id` (en este proceso)."""
+    prefijo = f'{usuario_id}:'
+    with _candado:
+        for llave in [llave for llave in _cache if llave.startswith(prefijo) or llave == str(usuario_id)]:
+            del _cache[llave]
+
+
+@event.listens_for(User.sesion_version, 'set')
+def _version_cambiada(usuario, valor, anterior, iniciador):
+    if usuario.id is not None:
+        olvidar(usuario.id)
+
+
+# ────────────────────────────────────────────────
+#                     Login
+# ────────────────────────────────────────────────
+
+def _obtener_semaforo():
+    global _semaforo
+    if _semaforo is None:
+        _semaforo = threading.BoundedSemaphore(int(current_app.config.get('LOGIN_CONCURRENTES', 2)))
+    return _semaforo
+
+
+def _revisar_fallos(llave, ahora):
+    ventana = current_app.config.get('LOGIN_VENTANA', 300)
+    maximo = current_app.config.get('LOGIN_FALLOS_MAX', 10)
+    with _candado:
+        intentos = _fallos.get(llave)
+        if not intentos:
+            return
+        while intentos and intentos[0] <= ahora - ventana:
+            intentos.popleft()
+        if len(intentos) >= maximo:
+            raise DemasiadosIntentos(int(intentos[0] + ventana - ahora) + 1)
+
+
+def _registrar_fallo(llave, ahora):
+    with _candado:
+        if len(_fallos) >= MAX_CACHE:
+            _fallos.clear()
+        _fallos.setdefault(llave, deque(maxlen=100)).append(ahora)
+
+
+def _verificar_senuelo(password):
+    """Cuesta lo mismo que verificar a un usuario real; siempre False."""
+    metodo = metodo_hash()
+    senuelo = _senuelos.get(metodo)
+    if senuelo is None:
+        senuelo = _senuelos[metodo] = cooperativo.en_hilo(generate_password_hash, secrets.token_hex(16), method=metodo)
+    cooperativo.en_hilo(check_password_hash, senuelo, password)
+    return False
+
+
+def autenticar(username, password):
+    """
+    User si las credenciales son válidas, None si no.
+    Lanza DemasiadosIntentos si el usuario debe esperar o no hay lugar para verificar.
+    """
+    llave = ((username or '').strip().lower(), request.remote_addr or '')
+    _revisar_fallos(llave, time.monotonic())
+
+    semaforo = _obtener_semaforo()
+    if not semaforo.acquire(timeout=current_app.config.get('LOGIN_ESPERA', 5)):
+        raise DemasiadosIntentos(1)
+    try:
+        usuario = User.query.filter_by(username=username).first()
+        if usuario is None:
+            valido = _verificar_senuelo(password or '')
+        else:
+            valido = usuario.check_password(password or '') and bool(password)
+        if valido and usuario.necesita_rehash():
+            # Directo a la columna: no es un cambio de contraseña, las sesiones siguen
+            usuario.password_hash = cooperativo.en_hilo(generate_password_hash, password, method=metodo_hash())
+            db.session.commit()
+    finally:
+        semaforo.release()
+
+    if not valido:
+        _registrar_fallo(llave, time.monotonic())
+        return None
+    with _candado:
+        _fallos.pop(llave, None)
+    return usuario
@@ -0,0 +1,249 @@
+# sinteticos.py
+# Datos sintéticos reproducibles para pruebas de carga.
+#
+#   flask sinteticos generar --escala 100k --semilla 7
+#
+# Llena clientes, vehículos, inventario (con su movimiento inicial), órdenes
+# de trabajo con checklist y daños como los que guarda el formulario, y las
+# refacciones usadas por cada orden con su salida de almacén. Misma semilla y
+# misma base de partida = mismos datos (fechas relativas al día en que se corre).
+#
+# Proporciones por cada N órdenes: N/4 clientes, N/2 vehículos y N/20
+# piezas (máximo 20,000). Se inserta por lotes con executemany del Core, sin
+# objetos del ORM; los ids se asignan aquí a partir del máximo existente, así
+# se puede correr sobre una base con datos.
+import random
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, func, text, update
+
+import folios
+import reportes
+from extensions import db
+from models import Cliente, Vehiculo, Inventario, OrdenTrabajo, MovimientoInventario, orden_trabajo_partes
+
+ESCALAS = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+LOTE = 5_000
+MAX_PIEZAS = 20_000
+DIAS_HISTORIAL = 730
+
+# Estado y su peso (proporción aproximada de órdenes)
+ESTADOS = [('Completado', 60), ('Pendiente', 15), ('En progreso', 15), ('Cancelado', 10)]
+
+_NOMBRES = ['José', 'Juan', 'María', 'Guadalupe', 'Luis', 'Ana', 'Carlos', 'Rosa', 'Jesús', 'Francisco',
+            'Alejandra', 'Miguel', 'Patricia', 'Jorge', 'Verónica', 'Ricardo', 'Sofía', 'Fernando',
+            'Laura', 'Héctor', 'Adriana', 'Raúl', 'Claudia', 'Óscar', 'Gabriela', 'Sergio']
+_APELLIDOS = ['Hernández', 'García', 'Martínez', 'López', 'González', 'Pérez', 'Rodríguez', 'Sánchez',
+              'Ramírez', 'Cruz', 'Flores', 'Gómez', 'Morales', 'Vázquez', 'Reyes', 'Jiménez', 'Torres',
+              'Díaz', 'Gutiérrez', 'Ruiz', 'Mendoza', 'Aguilar', 'Ortiz', 'Castillo', 'Chávez', 'Núñez']
+_VEHICULOS = {
+    'Nissan': ['Tsuru', 'Versa', 'Sentra', 'March', 'NP300', 'Frontier'],
+    'Chevrolet': ['Aveo', 'Spark', 'Silverado', 'Cavalier', 'S10', 'Beat'],
+    'Volkswagen': ['Jetta', 'Vento', 'Gol', 'Golf', 'Amarok', 'Saveiro'],
+    'Ford': ['Ranger', 'F-150', 'Fiesta', 'Focus', 'Lobo', 'Escape'],
+    'Toyota': ['Corolla', 'Hilux', 'Yaris', 'Tacoma', 'Camry', 'RAV4'],
+    'Dodge': ['Ram 1500', 'Attitude', 'Journey', 'Durango', 'Charger'],
+    'Kenworth': ['T370', 'T680', 'T880'],
+    'International': ['4300', 'LT625', 'HV607'],
+}
+_PIEZAS = ['Filtro de aceite', 'Filtro de aire', 'Filtro de gasolina', 'Balatas delanteras', 'Balatas traseras',
+           'Disco de freno', 'Bujía', 'Cable de bujía', 'Bomba de agua', 'Termostato', 'Banda de distribución',
+           'Banda serpentina', 'Amortiguador', 'Rótula', 'Terminal de dirección', 'Batería', 'Alternador',
+           'Marcha', 'Radiador', 'Manguera superior', 'Sensor de oxígeno', 'Bobina', 'Kit de clutch',
+           'Aceite 15W40 (litro)', 'Anticongelante (galón)', 'Foco H4', 'Plumas limpiaparabrisas']
+_PROVEEDORES = ['Refaccionaria del Norte', 'AutoZone', 'Partes Laguna', 'Diesel y Refacciones', 'Frenos Express',
+                'Eléctrico Automotriz']
+_FALLAS = ['No enciende', 'Ruido al frenar', 'Se calienta el motor', 'Vibración en el volante', 'Luz de check engine',
+           'Pierde potencia', 'Fuga de aceite', 'Servicio de mantenimiento', 'Falla eléctrica', 'Jala hacia un lado',
+           'Humo blanco en el escape', 'No entran los cambios', 'Afinación mayor', 'Revisión de suspensión']
+_TRABAJOS = ['Cambio de aceite y filtros', 'Cambio de balatas y rectificado de discos', 'Afinación mayor',
+             'Cambio de bomba de agua y termostato', 'Reparación de sistema eléctrico', 'Alineación y balanceo',
+             'Cambio de amortiguadores', 'Reemplazo de batería', 'Cambio de kit de clutch']
+_OBSERVACIONES = ['', '', '', 'Revisar pronto', 'Desgaste normal', 'Dañado', 'Falta', 'Cliente enterado']
+_DANIOS = ['Rayón', 'Golpe leve', 'Abolladura', 'Pintura dañada', 'Estrellado', 'Raspón']
+
+
+def _insertar(tabla, filas):
+    if filas:
+        db.session.execute(tabla.insert(), filas)
+
+
+def _siguiente_id(modelo):
+    return (db.session.query(func.max(modelo.id)).scalar() or 0) + 1
+
+
+def _en_lotes(total, lote):
+    for inicio in range(0, total, lote):
+        yield inicio, min(lote, total - inicio)
+
+
+def _checklist(rnd, items):
+    return {
+        item['key']: {'si': rnd.random() < 0.8, 'obs': rnd.choice(_OBSERVACIONES)}
+        for item in items
+    }
+
+
+def _danios(rnd, zonas):
+    elegidas = rnd.sample(zonas, k=rnd.choice([0, 0, 0, 1, 1, 2, 3]))
+    return {zona['key']: {'marcado': True, 'descripcion': rnd.choice(_DANIOS)} for zona in elegidas}
+
+
+def generar(ordenes, semilla=0, lote=LOTE, mostrar=lambda texto: None):
+    """Inserta `ordenes` órdenes con sus clientes, vehículos y piezas. Regresa {tabla: filas}."""
+    from app import CHECKLIST_ITEMS, ZONAS_VEHICULO  # app.py importa este módulo
+
+    rnd = random.Random(semilla)
+    total_clientes = max(10, ordenes // 4)
+    total_vehiculos = max(total_clientes, ordenes // 2)
+    total_piezas = min(MAX_PIEZAS, max(50, ordenes // 20))
+    conteo = {}
+
+    def paso(tabla, cantidad, inicio):
+        conteo[tabla] = conteo.get(tabla, 0) + cantidad
+        db.session.commit()
+        mostrar(f'{tabla}: {conteo[tabla]:,} ({conteo[tabla] / (time.perf_counter() - inicio):,.0f}/s)')
+
+    # Clientes
+    inicio = time.perf_counter()
+    primer_cliente = _siguiente_id(Cliente)
+    for desde, cantidad in _en_lotes(total_clientes, lote):
+        filas = []
+        for i in range(desde, desde + cantidad):
+            nombre = f'{rnd.choice(_NOMBRES)} {rnd.choice(_APELLIDOS)} {rnd.choice(_APELLIDOS)}'
+            filas.append({'id': primer_cliente + i, 'nombre': nombre, 'telefono': f'871{rnd.randrange(10**7):07d}',
+                          'email': f'cliente{primer_cliente + i}@ejemplo.mx' if rnd.random() < 0.6 else None})
+        _insertar(Cliente.__table__, filas)
+        paso('clientes', cantidad, inicio)
+
+    # Vehículos: uno por cliente y el resto repartido al azar
+    inicio = time.perf_counter()
+    primer_vehiculo = _siguiente_id(Vehiculo)
+    for desde, cantidad in _en_lotes(total_vehiculos, lote):
+        filas = []
+        for i in range(desde, desde + cantidad):
+            marca = rnd.choice(list(_VEHICULOS))
+            cliente = primer_cliente + (i if i < total_clientes else rnd.randrange(total_clientes))
+            filas.append({'id': primer_vehiculo + i, 'marca': marca, 'modelo': rnd.choice(_VEHICULOS[marca]),
+                          'ano': rnd.randint(1995, 2025), 'placa': f'SIN{primer_vehiculo + i:07d}',
+                          'kms_actual': rnd.randrange(5_000, 450_000), 'cliente_id': cliente})
+        _insertar(Vehiculo.__table__, filas)
+        paso('vehiculos', cantidad, inicio)
+
+    # Piezas: stock inicial de acuerdo al consumo esperado (~3 piezas por orden)
+    inicio = time.perf_counter()
+    hoy = datetime.utcnow().replace(microsecond=0)
+    arranque = hoy - timedelta(days=DIAS_HISTORIAL)
+    primer_pieza = _siguiente_id(Inventario)
+    consumo_esperado = 3 * ordenes / total_piezas
+    existencias = {}
+    costos = {}
+    precios = {}  # Precio al público congelado en las refacciones de cada orden
+    for desde, cantidad in _en_lotes(total_piezas, lote):
+        piezas, movimientos = [], []
+        for i in range(desde, desde + cantidad):
+            pieza_id = primer_pieza + i
+            costo = round(rnd.uniform(40, 4_000), 2)
+            stock = int(consumo_esperado * rnd.uniform(0.9, 1.4)) + rnd.randint(0, 30)
+            existencias[pieza_id] = stock
+            costos[pieza_id] = costo
+            nombre = rnd.choice(_PIEZAS)
+            piezas.append({'id': pieza_id, 'nombre_parte': f'{nombre} {rnd.choice(list(_VEHICULOS))}',
+                           'numero_parte': f'SP-{pieza_id:06d}', 'descripcion': f'{nombre} (sintético)',
+                           'proveedor': rnd.choice(_PROVEEDORES), 'cantidad': stock, 'costo': costo,
+                           'precio': round(costo * rnd.uniform(1.25, 1.8), 2)})
+            precios[pieza_id] = piezas[-1]['precio']
+            movimientos.append({'parte_id': pieza_id, 'fecha': arranque, 'tipo': 'inicial', 'cantidad': stock,
+                                'existencia': stock, 'costo_unitario': costo, 'nota': 'Datos sintéticos'})
+        _insertar(Inventario.__table__, piezas)
+        _insertar(MovimientoInventario.__table__, movimientos)
+        paso('inventario', cantidad, inicio)
+
+    # Órdenes, en orden cronológico, con sus refacciones y salidas de almacén
+    inicio = time.perf_counter()
+    primer_orden = _siguiente_id(OrdenTrabajo)
+    estados = [estado for estado, _ in ESTADOS]
+    pesos = [peso for _, peso in ESTADOS]
+    paso_tiempo = timedelta(days=DIAS_HISTORIAL) / max(ordenes, 1)
+    partes_total = 0
+    for desde, cantidad in _en_lotes(ordenes, lote):
+        numeros = folios.reservar_folios(cantidad)
+        filas, partes, salidas = [], [], []
+        for i, folio in zip(range(desde, desde + cantidad), numeros):
+            orden_id = primer_orden + i
+            creada = arranque + paso_tiempo * i + timedelta(minutes=rnd.randint(0, 240))
+            estado = rnd.choices(estados, pesos)[0]
+            # Las más recientes siguen abiertas; las viejas ya se cerraron
+            if estado in ('Pendiente', 'En progreso') and i < ordenes * 0.95:
+                estado = 'Completado'
+            compromiso = (creada + timedelta(days=rnd.randint(1, 10))).date()
+            entrega = (creada + timedelta(days=rnd.randint(0, 12))).date() if estado == 'Completado' else None
+            filas.append({
+                'id': orden_id, 'folio': folio, 'vehiculo_id': primer_vehiculo + rnd.randrange(total_vehiculos),
+                'falla_reportada': rnd.choice(_FALLAS),
+                'checklist_revision': _checklist(rnd, CHECKLIST_ITEMS),
+                'danios_zonas': _danios(rnd, ZONAS_VEHICULO),
+                'trabajo_realizado': rnd.choice(_TRABAJOS) if estado == 'Completado' else None,
+                'estado': estado, 'fecha_creacion': creada, 'fecha_compromiso': compromiso, 'fecha_entrega': entrega,
+            })
+            if estado not in ('Completado', 'En progreso'):
+                continue
+            for pieza_id in rnd.sample(range(primer_pieza, primer_pieza + total_piezas), k=rnd.choice([0, 1, 2, 2, 3, 4])):
+                usada = min(rnd.choice([1, 1, 1, 2, 4]), existencias[pieza_id])
+                if not usada:
+                    continue  # Sin stock: no se pudo usar
+                existencias[pieza_id] -= usada
+                partes.append({'orden_id': orden_id, 'parte_id': pieza_id, 'cantidad_usada': usada,
+                               'precio_unitario': precios[pieza_id]})
+                salidas.append({'parte_id': pieza_id, 'fecha': creada + timedelta(hours=2), 'tipo': 'salida',
+                                'cantidad': -usada, 'existencia': existencias[pieza_id],
+                                'costo_unitario': costos[pieza_id], 'orden_trabajo_id': orden_id})
+        _insertar(OrdenTrabajo.__table__, filas)
+        _insertar(orden_trabajo_partes, partes)
+        _insertar(MovimientoInventario.__table__, salidas)
+        partes_total += len(partes)
+        paso('ordenes', cantidad, inicio)
+
+    # Stock final de cada pieza (un UPDATE por lote con executemany)
+    tabla = Inventario.__table__
+    consulta = update(tabla).where(tabla.c.id == bindparam('pieza_id')).values(cantidad=bindparam('stock'))
+    finales = [{'pieza_id': pieza_id, 'stock': stock} for pieza_id, stock in existencias.items()]
+    for desde, cantidad in _en_lotes(len(finales), lote):
+        db.session.execute(consulta, finales[desde:desde + cantidad])
+    db.session.commit()
+    conteo['orden_trabajo_partes'] = partes_total
+
+    # El executemany no pasa por el flush del ORM: los resúmenes de reportes se recalculan
+    reportes.reconciliar()
+    db.session.commit()
+
+    # Estadísticas del planificador al día con el nuevo volumen
+    if db.engine.dialect.name in ('sqlite', 'postgresql'):
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+    return conteo
+
+
+# ────────────────────────────────────────────────
+#                  Comandos CLI
+# ────────────────────────────────────────────────
+
+cli = AppGroup('sinteticos', help='Datos sintéticos para pruebas de carga.')
+
+
+@cli.command('generar')
+@click.option('--escala', type=click.Choice(list(ESCALAS)), default='1k', show_default=True,
+              help='Número de órdenes de trabajo.')
+@click.option('--ordenes', type=int, default=None, help='Número exacto de órdenes (ignora --escala).')
+@click.option('--semilla', type=int, default=0, show_default=True)
+@click.option('--lote', type=int, default=LOTE, show_default=True, help='Filas por INSERT.')
+def generar_comando(escala, ordenes, semilla, lote):
+    """Inserta clientes, vehículos, inventario y órdenes sintéticos."""
+    ordenes = ordenes if ordenes is not None else ESCALAS[escala]
+    inicio = time.perf_counter()
+    conteo = generar(ordenes, semilla=semilla, lote=lote, mostrar=click.echo)
+    resumen = ', '.join(f'{tabla} {filas:,}' for tabla, filas in conteo.items())
+    click.echo(f'Listo en {time.perf_counter() - inicio:.1f} s: {resumen}')
@@ -5,18 +5,201 @@ document.addEventListener('DOMContentLoaded', () => {
             // Validación ejemplo: Asegura campos requeridos
             const required = form.querySelectorAll('[required]');
             let valid = true;
+            let sinElegir = false;
             required.forEach(input => {
+                // El navegador ignora `required` en inputs ocultos: el del autocompletado se
+                // revisa aquí y se marca el campo de búsqueda, que es el que ve el usuario
+                const visible = input.type === 'hidden'
+                    ? form.querySelector(`[data-destino="${input.id}"]`) || input
+                    : input;
                 if (!input.value.trim()) {
                     valid = false;
-                    input.classList.add('is-invalid');
+                    sinElegir = sinElegir || input.type === 'hidden';
+                    visible.classList.add('is-invalid');
                 } else {
-                    input.classList.remove('is-invalid');
+                    visible.classList.remove('is-invalid');
                 }
             });
             if (!valid) {
                 e.preventDefault();
-                alert('Por favor, llena todos los campos requeridos.');
+                alert(sinElegir
+                    ? 'Elige una opción de la lista en los campos de búsqueda marcados.'
+                    : 'Por favor, llena todos los campos requeridos.');
             }
         });
     });
-});
\ No newline at end of file
+});
+
+// Autocompletado con paginación por cursor (endpoints /clientes/sugerencias e /inventarios/sugerencias).
+// Uso: <input type="text" data-autocompletar="URL" data-destino="id_del_input_oculto" [data-vacio="valor"]>
+// Al elegir una opción se llena el input oculto y se dispara 'change' sobre él.
+function autocompletar(entrada) {
+    const oculto = document.getElementById(entrada.dataset.destino);
+    const url = entrada.dataset.autocompletar;
+    const vacio = entrada.dataset.vacio || '';
+    const lista = document.createElement('div');
+    lista.className = 'list-group autocompletar-lista';
+    entrada.parentNode.classList.add('position-relative');
+    entrada.after(lista);
+    entrada.setAttribute('autocomplete', 'off');
+
+    let temporizador = null;
+    let cursor = null;
+    let peticion = 0;
+
+    function opcion(texto, alElegir, clase) {
+        const boton = document.createElement('button');
+        boton.type = 'button';
+        boton.className = `list-group-item list-group-item-action ${clase || ''}`;
+        boton.textContent = texto;
+        // mousedown en vez de click: se ejecuta antes del blur del input
+        boton.addEventListener('mousedown', e => {
+            e.preventDefault();
+            alElegir();
+        });
+        lista.appendChild(boton);
+    }
+
+    function elegir(item) {
+        entrada.value = item.texto;
+        oculto.value = item.id;
+        lista.style.display = 'none';
+        oculto.dispatchEvent(new Event('change'));
+    }
+
+    function cargar(mas) {
+        const params = new URLSearchParams({q: entrada.value.trim()});
+        if (mas && cursor) params.set('cursor', cursor);
+        const numero = ++peticion;
+        fetch(`${url}${url.includes('?') ? '&' : '?'}${params}`)
+            .then(response => response.json())
+            .then(datos => {
+                if (numero !== peticion) return;  // Ya hay una búsqueda más reciente
+                if (!mas) lista.innerHTML = '';
+                lista.querySelector('.autocompletar-mas')?.remove();
+                datos.resultados.forEach(item => opcion(item.texto, () => elegir(item)));
+                cursor = datos.cursor;
+                if (cursor) opcion('Ver más…', () => cargar(true), 'autocompletar-mas text-primary');
+                if (!lista.children.length) {
+                    lista.innerHTML = '<span class="list-group-item text-muted">Sin resultados</span>';
+                }
+                lista.style.display = 'block';
+            });
+    }
+
+    entrada.addEventListener('input', () => {
+        if (oculto.value !== vacio) {
+            oculto.value = vacio;
+            oculto.dispatchEvent(new Event('change'));
+        }
+        clearTimeout(temporizador);
+        temporizador = setTimeout(() => cargar(false), 250);
+    });
+    entrada.addEventListener('focus', () => {
+        if (!oculto.value || oculto.value === vacio) cargar(false);
+    });
+    entrada.addEventListener('blur', () => {
+        lista.style.display = 'none';
+    });
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('[data-autocompletar]').forEach(autocompletar);
+});
+
+// Tablero de órdenes en vivo (/tablero, ver tablero.py). Recibe por SSE solo los cambios:
+// 'nueva' agrega la tarjeta, 'estado' la mueve de columna (o la quita si no hay columna),
+// 'refaccion' actualiza las piezas. EventSource reconecta solo y manda Last-Event-ID.
+// 'sondeo': el worker no sostiene el stream y cierra tras cada lote (ver tablero.py).
+function tablero(contenedor) {
+    const plantilla = document.getElementById('tablero-tarjeta');
+    const detalle = contenedor.dataset.detalle.replace(/0$/, '');
+    const indicador = document.getElementById('tablero-conexion');
+    const columnas = {};
+    contenedor.querySelectorAll('[data-estado]').forEach(col => { columnas[col.dataset.estado] = col; });
+
+    function contar() {
+        Object.values(columnas).forEach(col => {
+            col.closest('.card').querySelector('[data-contador]').textContent = col.children.length;
+        });
+    }
+
+    function tarjeta(ordenId) {
+        return contenedor.querySelector(`[data-orden-id="${ordenId}"]`);
+    }
+
+    function resaltar(elemento) {
+        elemento.classList.add('tablero-cambio');
+        setTimeout(() => elemento.classList.remove('tablero-cambio'), 2000);
+    }
+
+    function crear(datos) {
+        const nueva = plantilla.content.firstElementChild.cloneNode(true);
+        nueva.dataset.ordenId = datos.orden_id;
+        const folio = nueva.querySelector('[data-campo="folio"]');
+        folio.textContent = datos.folio || 'Sin folio';
+        folio.href = detalle + datos.orden_id;
+        nueva.querySelector('[data-campo="piezas"]').textContent = `${datos.piezas || 0} pzas`;
+        nueva.querySelector('[data-campo="vehiculo"]').textContent = datos.vehiculo;
+        nueva.querySelector('[data-campo="cliente"]').textContent = datos.cliente;
+        nueva.querySelector('[data-campo="falla"]').textContent = datos.falla;
+        const compromiso = nueva.querySelector('[data-campo="compromiso"]');
+        if (datos.compromiso) compromiso.textContent = `Compromiso: ${datos.compromiso}`;
+        else compromiso.remove();
+        return nueva;
+    }
+
+    const fuente = new EventSource(contenedor.dataset.tablero);
+    fuente.addEventListener('open', () => {
+        indicador.textContent = 'En vivo';
+        indicador.className = 'badge bg-success';
+    });
+    let sondeo = false;  // El servidor manda lo pendiente y cierra; el navegador vuelve a preguntar
+    fuente.addEventListener('sondeo', () => {
+        sondeo = true;
+        indicador.textContent = 'Actualizando';
+        indicador.className = 'badge bg-info text-dark';
+    });
+    fuente.addEventListener('error', () => {
+        if (sondeo && fuente.readyState === EventSource.CONNECTING) return;
+        indicador.textContent = 'Reconectando…';
+        indicador.className = 'badge bg-secondary';
+    });
+    fuente.addEventListener('recargar', () => {
+        fuente.close();
+        window.location.reload();
+    });
+    fuente.addEventListener('nueva', e => {
+        const datos = JSON.parse(e.data);
+        const columna = columnas[datos.estado];
+        if (!columna || tarjeta(datos.orden_id)) return;
+        const nueva = crear(datos);
+        columna.prepend(nueva);
+        resaltar(nueva);
+        contar();
+    });
+    fuente.addEventListener('estado', e => {
+        const datos = JSON.parse(e.data);
+        const actual = tarjeta(datos.orden_id);
+        const columna = columnas[datos.estado];
+        if (columna) {
+            const movida = actual || crear(datos);  // La orden podía no estar en el tablero
+            columna.prepend(movida);
+            resaltar(movida);
+        } else if (actual) {
+            actual.remove();  // Cancelada
+        }
+        contar();
+    });
+    fuente.addEventListener('refaccion', e => {
+        const datos = JSON.parse(e.data);
+        const actual = tarjeta(datos.orden_id);
+        if (!actual) return;
+        actual.querySelector('[data-campo="piezas"]').textContent = `${datos.piezas} pzas`;
+        resaltar(actual);
+    });
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('[data-tablero]').forEach(tablero);
+});
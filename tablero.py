@@ -0,0 +1,345 @@
+# tablero.py
+# Tablero de órdenes en vivo (kanban) con Server-Sent Events.
+#
+# En vez de recargar /ordenes_servicio (listado, contadores y clientes), la
+# página /tablero se pinta una vez y recibe por /tablero/eventos solo los
+# cambios: orden nueva, cambio de estado y refacción agregada.
+#
+# - Los cambios quedan en `eventos_tablero` en la misma transacción que los
+#   produce: altas y cambios de estado de OrdenTrabajo se detectan en el
+#   flush (cualquier vista, importación o trabajo que use el ORM); las
+#   refacciones, que van por UPDATE directo, llaman a `refaccion_agregada`.
+#   Así sirve con varios workers y varios servidores sin broker.
+# - Cada proceso tiene UN hilo que lee los eventos nuevos cada
+#   TABLERO_INTERVALO segundos y los reparte a las colas de sus
+#   suscriptores; cien pestañas abiertas cuestan una consulta por intervalo,
+#   no cien. Un suscriptor no ocupa conexión a la base mientras espera.
+# - Al reconectar, el navegador manda Last-Event-ID y recibe lo que se
+#   perdió (hasta MAX_PENDIENTES eventos; si son más, recarga la página).
+# - Una conexión SSE queda abierta minutos: con workers síncronos de
+#   gunicorn cada pestaña ocuparía un worker. Por eso el proceso `web` del
+#   Procfile y el CMD del Dockerfile corren gunicorn -k gevent: el hilo y
+#   las colas de este módulo son greenlets y miles de suscriptores inactivos
+#   caben en un proceso (lo que podría bloquear ese proceso se trata en
+#   cooperativo.py). Si el stream llega a un worker síncrono de todos
+#   modos, no se queda abierto: manda lo pendiente y cierra, y el navegador
+#   vuelve a preguntar cada SONDEO segundos (sondeo corto).
+# - `flask tablero purgar` borra eventos viejos (cron diario).
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import delete, event, func, insert, inspect, select
+from sqlalchemy.orm import Session
+
+from extensions import db
+import cooperativo
+from models import Cliente, EventoTablero, Inventario, OrdenTrabajo, Vehiculo, orden_trabajo_partes
+
+COLUMNAS = ('Pendiente', 'En progreso', 'Completado')
+INTERVALO = 1.0  # segundos entre lecturas de eventos nuevos
+LATIDO = 15  # segundos sin eventos antes de mandar un comentario (proxies cierran conexiones mudas)
+DURACION = 600  # segundos que dura una conexión; el navegador reconecta solo
+SONDEO = 5  # segundos entre peticiones cuando el worker no puede sostener el stream
+MAX_PENDIENTES = 500  # eventos en cola por suscriptor / a recuperar al reconectar
+VENTANA_IDS = 200  # En PostgreSQL un id menor puede confirmarse después de uno mayor
+
+
+# ────────────────────────────────────────────────
+#         Registro de eventos (en la transacción)
+# ────────────────────────────────────────────────
+
+def _piezas(orden_id):
+    return (select(func.coalesce(func.sum(orden_trabajo_partes.c.cantidad_usada), 0))
+            .where(orden_trabajo_partes.c.orden_id == orden_id)
+            .scalar_subquery())
+
+
+def _datos_tarjeta(conn, orden):
+    """Lo que el tablero necesita para pintar la tarjeta de `orden` (una consulta)."""
+    vehiculo = conn.execute(
+        select(Vehiculo.marca, Vehiculo.modelo, Vehiculo.placa, Cliente.nombre, _piezas(orden.id).label('piezas'))
+        .join(Cliente, Cliente.id == Vehiculo.cliente_id)
+        .where(Vehiculo.id == orden.vehiculo_id)
+    ).first()
+    return {
+        'folio': orden.folio,
+        'estado': orden.estado or 'Pendiente',
+        'falla': (orden.falla_reportada or '')[:120],
+        'vehiculo': f'{vehiculo.marca} {vehiculo.modelo} — {vehiculo.placa}' if vehiculo else '',
+        'cliente': vehiculo.nombre if vehiculo else '',
+        'compromiso': orden.fecha_compromiso.isoformat() if orden.fecha_compromiso else None,
+        'piezas': vehiculo.piezas if vehiculo else 0,
+    }
+
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_ordenes(session, flush_context):
+    # En after_flush new/dirty aún son los del flush y los ids ya existen
+    nuevas = [obj for obj in session.new if isinstance(obj, OrdenTrabajo)]
+    cambiadas = []
+    for obj in session.dirty:
+        if isinstance(obj, OrdenTrabajo):
+            historial = inspect(obj).attrs.estado.history
+            if historial.has_changes():
+                cambiadas.append((obj, historial.deleted[0] if historial.deleted else None))
+    if not nuevas and not cambiadas:
+        return
+    conn = session.connection()
+    filas = [{'tipo': 'nueva', 'orden_id': orden.id, 'datos': _datos_tarjeta(conn, orden)} for orden in nuevas]
+    # El cambio de estado lleva la tarjeta completa: la orden puede no estar en el tablero de quien lo recibe
+    filas += [
+        {'tipo': 'estado', 'orden_id': orden.id, 'datos': dict(_datos_tarjeta(conn, orden), anterior=anterior)}
+        for orden, anterior in cambiadas
+    ]
+    ahora = datetime.utcnow()
+    conn.execute(insert(EventoTablero.__table__), [dict(fila, fecha=ahora) for fila in filas])
+
+
+def refaccion_agregada(orden_id, parte_id, cantidad):
+    """Evento de refacción agregada a una orden (en la transacción de la sesión)."""
+    piezas = db.session.execute(select(_piezas(orden_id))).scalar()
+    nombre = db.session.execute(select(Inventario.nombre_parte).where(Inventario.id == parte_id)).scalar()
+    db.session.execute(insert(EventoTablero.__table__).values(
+        tipo='refaccion', orden_id=orden_id, fecha=datetime.utcnow(),
+        datos={'parte': nombre, 'cantidad': cantidad, 'piezas': piezas},
+    ))
+
+
+def ultimo_evento():
+    return db.session.execute(select(func.max(EventoTablero.id))).scalar() or 0
+
+
+def pendientes(desde_id):
+    """Eventos con id > desde_id, o None si son más de MAX_PENDIENTES (mejor recargar)."""
+    filas = db.session.execute(
+        select(EventoTablero.id, EventoTablero.tipo, EventoTablero.orden_id, EventoTablero.datos)
+        .where(EventoTablero.id > desde_id)
+        .order_by(EventoTablero.id)
+        .limit(MAX_PENDIENTES + 1)
+    ).all()
+    if len(filas) > MAX_PENDIENTES:
+        return None
+    return [tuple(fila) for fila in filas]
+
+
+# ────────────────────────────────────────────────
+#          Reparto a suscriptores (por proceso)
+# ────────────────────────────────────────────────
+
+RECARGAR = object()  # En la cola: el suscriptor se quedó atrás y debe recargar la página
+
+
+def _leer_desde(minimo):
+    return [tuple(fila) for fila in db.session.execute(
+        select(EventoTablero.id, EventoTablero.tipo, EventoTablero.orden_id, EventoTablero.datos)
+        .where(EventoTablero.id > minimo)
+        .order_by(EventoTablero.id)
+        .limit(MAX_PENDIENTES + VENTANA_IDS)
+    )]
+
+
+class _Difusor:
+    def __init__(self):
+        self.candado = threading.Lock()
+        self.suscriptores = set()
+        self.ultimo_id = None
+        self.enviados = deque(maxlen=VENTANA_IDS)  # ids ya repartidos dentro de la ventana
+        self.hilo = None
+
+    def suscribir(self, app):
+        """Cola que recibe (id, tipo, orden_id, datos) de cada evento nuevo. Llamar con app context."""
+        cola = queue.Queue(maxsize=MAX_PENDIENTES)
+        with self.candado:
+            if self.ultimo_id is None:
+                # Punto de partida: lo que ya existe lo recupera cada suscriptor con `pendientes`
+                self.enviados.clear()
+                self.enviados.extend(fila[0] for fila in _leer_desde(ultimo_evento() - VENTANA_IDS))
+                self.ultimo_id = self.enviados[-1] if self.enviados else 0
+            self.suscriptores.add(cola)
+            if self.hilo is None:
+                self.hilo = threading.Thread(target=self._ciclo, args=(app,), daemon=True, name='tablero')
+                self.hilo.start()
+        return cola
+
+    def cancelar(self, cola):
+        with self.candado:
+            self.suscriptores.discard(cola)
+
+    def _leer(self):
+        vistos = set(self.enviados)
+        nuevos = [fila for fila in _leer_desde(self.ultimo_id - VENTANA_IDS) if fila[0] not in vistos]
+        self.enviados.extend(fila[0] for fila in nuevos)
+        if nuevos:
+            self.ultimo_id = max(self.ultimo_id, nuevos[-1][0])
+        return nuevos
+
+    def _repartir(self, nuevos):
+        with self.candado:
+            colas = list(self.suscriptores)
+        for cola in colas:
+            try:
+                for fila in nuevos:
+                    cola.put_nowait(fila)
+            except queue.Full:
+                self.cancelar(cola)
+                while not cola.empty():
+                    cola.get_nowait()
+                cola.put_nowait(RECARGAR)
+
+    def _ciclo(self, app):
+        intervalo = float(app.config.get('TABLERO_INTERVALO', INTERVALO))
+        while True:
+            time.sleep(intervalo)
+            with self.candado:
+                if not self.suscriptores:
+                    self.ultimo_id = None  # Sin nadie escuchando no hay que ponerse al día
+                    continue
+            try:
+                with app.app_context():
+                    nuevos = self._leer()
+            except Exception as error:
+                app.logger.warning('Tablero: no se pudieron leer eventos: %s', error)
+                continue
+            if nuevos:
+                self._repartir(nuevos)
+
+
+_difusor = _Difusor()
+
+
+def _nuevo_difusor():
+    # Un proceso hijo (gunicorn --preload) no hereda el hilo del padre
+    global _difusor
+    _difusor = _Difusor()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_nuevo_difusor)
+
+
+# ────────────────────────────────────────────────
+#                  Stream SSE
+# ────────────────────────────────────────────────
+
+def _mensaje(fila):
+    id_evento, tipo, orden_id, datos = fila
+    return f"id: {id_evento}\nevent: {tipo}\ndata: {json.dumps(dict(datos or {}, orden_id=orden_id), ensure_ascii=False)}\n\n"
+
+
+def transmision_continua(environ):
+    """False en un worker síncrono (un proceso, un request a la vez): ahí el stream lo ocuparía entero."""
+    if environ.get('wsgi.multithread'):
+        return True  # Servidor de desarrollo, gunicorn gthread
+    return cooperativo.activo()
+
+
+def flujo(app, desde_id, continuo=True):
+    """
+    Generador de la respuesta SSE. Se llama en el request (con app context):
+    suscribe, recupera lo pendiente desde `desde_id` y suelta la sesión; el
+    generador ya no toca la base. Con `continuo=False` solo manda lo
+    pendiente y cierra (sondeo cada SONDEO segundos).
+    """
+    if not continuo:
+        perdidos = pendientes(desde_id)
+        db.session.remove()
+        return _sondeo(app, perdidos)
+    cola = _difusor.suscribir(app)
+    perdidos = pendientes(desde_id)
+    db.session.remove()
+    latido = float(app.config.get('TABLERO_LATIDO', LATIDO))
+    duracion = float(app.config.get('TABLERO_DURACION', DURACION))
+
+    def generar():
+        try:
+            yield 'retry: 3000\n\n'
+            if perdidos is None:
+                yield 'event: recargar\ndata: {}\n\n'
+                return
+            enviados = set()
+            for fila in perdidos:
+                enviados.add(fila[0])
+                yield _mensaje(fila)
+            fin = time.monotonic() + duracion
+            while time.monotonic() < fin:
+                try:
+                    fila = cola.get(timeout=latido)
+                except queue.Empty:
+                    yield ': latido\n\n'
+                    continue
+                if fila is RECARGAR:
+                    yield 'event: recargar\ndata: {}\n\n'
+                    return
+                if fila[0] not in enviados:
+                    yield _mensaje(fila)
+        finally:
+            _difusor.cancelar(cola)
+
+    return generar()
+
+
+def _sondeo(app, perdidos):
+    sondeo = int(float(app.config.get('TABLERO_SONDEO', SONDEO)) * 1000)
+    yield f'retry: {sondeo}\n\nevent: sondeo\ndata: {{}}\n\n'
+    if perdidos is None:
+        yield 'event: recargar\ndata: {}\n\n'
+        return
+    for fila in perdidos:
+        yield _mensaje(fila)
+
+
+# ────────────────────────────────────────────────
+#                Página del tablero
+# ────────────────────────────────────────────────
+
+def columnas(limite=50):
+    """{estado: [tarjeta]} de las órdenes más recientes de cada columna."""
+    tarjetas = {estado: [] for estado in COLUMNAS}
+    piezas = _piezas(OrdenTrabajo.id)
+    for estado in COLUMNAS:
+        filas = db.session.execute(
+            select(OrdenTrabajo.id, OrdenTrabajo.folio, OrdenTrabajo.estado, OrdenTrabajo.falla_reportada,
+                   OrdenTrabajo.fecha_compromiso, Vehiculo.marca, Vehiculo.modelo, Vehiculo.placa,
+                   Cliente.nombre, piezas.label('piezas'))
+            .join(Vehiculo, Vehiculo.id == OrdenTrabajo.vehiculo_id)
+            .join(Cliente, Cliente.id == Vehiculo.cliente_id)
+            .where(OrdenTrabajo.estado == estado)
+            .order_by(OrdenTrabajo.fecha_creacion.desc(), OrdenTrabajo.id.desc())
+            .limit(limite)
+        )
+        tarjetas[estado] = [{
+            'orden_id': fila.id,
+            'folio': fila.folio,
+            'estado': fila.estado,
+            'falla': (fila.falla_reportada or '')[:120],
+            'vehiculo': f'{fila.marca} {fila.modelo} — {fila.placa}',
+            'cliente': fila.nombre,
+            'compromiso': fila.fecha_compromiso.isoformat() if fila.fecha_compromiso else None,
+            'piezas': fila.piezas,
+        } for fila in filas]
+    return tarjetas
+
+
+# ────────────────────────────────────────────────
+#                  Comandos CLI
+# ────────────────────────────────────────────────
+
+cli = AppGroup('tablero', help='Tablero de órdenes en vivo.')
+
+
+@cli.command('purgar')
+@click.option('--dias', default=2, show_default=True, help='Conservar los eventos de los últimos N días')
+def purgar_comando(dias):
+    """Borra eventos del tablero más viejos que --dias (un navegador no reconecta tan tarde)."""
+    borrados = db.session.execute(
+        delete(EventoTablero).where(EventoTablero.fecha < datetime.utcnow() - timedelta(days=dias))
+    ).rowcount
+    db.session.commit()
+    click.echo(f'{borrados} eventos borrados')
@@ -0,0 +1,218 @@
+# trabajos.py
+# Cola de trabajos en segundo plano sobre la tabla `trabajos`.
+#
+# La vista encola y regresa de inmediato con el id; los workers se levantan
+# con `flask trabajos worker --concurrencia N` (N procesos) y funcionan con
+# SQLite o PostgreSQL, sin broker externo:
+#
+# - Un worker toma un trabajo con un solo UPDATE condicionado al estado, así
+#   dos procesos nunca ejecutan el mismo (en PostgreSQL además SKIP LOCKED).
+# - Cada trabajo tomado tiene un vencimiento (TRABAJOS_TIMEOUT); si el worker
+#   muere, otro lo vuelve a tomar al vencer, salvo que ya fuera su último
+#   intento: entonces queda 'fallido'.
+# - Los parámetros se revisan contra la firma de la tarea al encolar: un
+#   trabajo que no puede correr se rechaza ahí y no gasta sus reintentos.
+# - Si el trabajo falla se reintenta con espera exponencial hasta
+#   max_intentos; después queda como 'fallido' con el error guardado.
+import inspect
+import multiprocessing
+import os
+import socket
+import time
+import traceback
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import or_, select, update
+
+from extensions import db
+from models import Trabajo, OrdenTrabajo
+
+TIMEOUT_POR_DEFECTO = 300  # segundos que un worker puede tener un trabajo
+ESPERA_REINTENTO = 5  # segundos base del backoff exponencial
+
+_TAREAS = {}
+
+
+def tarea(nombre):
+    """
+    Registra una función como tipo de trabajo. Recibe los parámetros del
+    trabajo y devuelve (ruta_resultado, nombre_archivo, mimetype) o None.
+    """
+    def decorador(funcion):
+        _TAREAS[nombre] = funcion
+        return funcion
+    return decorador
+
+
+def tipos_registrados():
+    return sorted(_TAREAS)
+
+
+def encolar(tipo, parametros=None, max_intentos=3):
+    """Guarda el trabajo; ValueError si el tipo no existe o los parámetros no van con la tarea."""
+    if tipo not in _TAREAS:
+        raise ValueError(f'Tipo de trabajo desconocido: {tipo}')
+    if parametros is not None and not isinstance(parametros, dict):
+        raise ValueError('Los parámetros del trabajo deben ser un objeto JSON')
+    try:
+        inspect.signature(_TAREAS[tipo]).bind(**(parametros or {}))
+    except TypeError as e:
+        raise ValueError(f'Parámetros inválidos para {tipo}: {e}')
+    trabajo = Trabajo(tipo=tipo, parametros=parametros or {}, max_intentos=max_intentos)
+    db.session.add(trabajo)
+    db.session.commit()
+    return trabajo
+
+
+# ────────────────────────────────────────────────
+#                    Ejecución
+# ────────────────────────────────────────────────
+
+def _disponible(tabla, ahora):
+    return or_(
+        (tabla.c.estado == 'pendiente') & (tabla.c.disponible_en <= ahora),
+        (tabla.c.estado == 'en_proceso') & (tabla.c.vence_en < ahora),
+    )
+
+
+def _reclamar(worker):
+    """Toma el siguiente trabajo disponible o regresa None."""
+    ahora = datetime.utcnow()
+    timeout = current_app.config.get('TRABAJOS_TIMEOUT', TIMEOUT_POR_DEFECTO)
+    tabla = Trabajo.__table__
+    otra = tabla.alias()
+    candidato = (
+        select(otra.c.id).where(_disponible(otra, ahora)).order_by(otra.c.id).limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    # Vencidos en su último intento: no se vuelven a tomar
+    db.session.execute(
+        update(tabla)
+        .where(tabla.c.estado == 'en_proceso', tabla.c.vence_en < ahora, tabla.c.intentos >= tabla.c.max_intentos)
+        .values(estado='fallido', terminado=ahora,
+                error=f'Venció sin terminar (TRABAJOS_TIMEOUT = {timeout} s) en su último intento')
+    )
+    # La condición se repite en el UPDATE: si otro worker lo tomó primero, no hay fila
+    trabajo_id = db.session.execute(
+        update(tabla)
+        .where(tabla.c.id == candidato, _disponible(tabla, ahora))
+        .values(estado='en_proceso', worker=worker, intentos=tabla.c.intentos + 1,
+                vence_en=ahora + timedelta(seconds=timeout))
+        .returning(tabla.c.id)
+    ).scalar()
+    db.session.commit()
+    return db.session.get(Trabajo, trabajo_id) if trabajo_id else None
+
+
+def ejecutar(trabajo):
+    try:
+        resultado = _TAREAS[trabajo.tipo](**(trabajo.parametros or {}))
+    except Exception:
+        db.session.rollback()
+        trabajo.error = traceback.format_exc(limit=5)
+        if trabajo.intentos < trabajo.max_intentos:
+            espera = ESPERA_REINTENTO * 2 ** (trabajo.intentos - 1)
+            trabajo.estado = 'pendiente'
+            trabajo.disponible_en = datetime.utcnow() + timedelta(seconds=espera)
+        else:
+            trabajo.estado = 'fallido'
+            trabajo.terminado = datetime.utcnow()
+        db.session.commit()
+        return False
+
+    if resultado:
+        trabajo.resultado_ruta, trabajo.resultado_nombre, trabajo.resultado_mimetype = resultado
+    trabajo.estado = 'completado'
+    trabajo.error = None
+    trabajo.terminado = datetime.utcnow()
+    db.session.commit()
+    return True
+
+
+def procesar_pendientes(worker=None, limite=None):
+    """Ejecuta trabajos hasta vaciar la cola (o `limite`). Regresa cuántos corrió."""
+    worker = worker or f'{socket.gethostname()}:{os.getpid()}'
+    hechos = 0
+    while limite is None or hechos < limite:
+        trabajo = _reclamar(worker)
+        if trabajo is None:
+            break
+        ejecutar(trabajo)
+        hechos += 1
+    return hechos
+
+
+def _bucle(app, intervalo):
+    # El worker ya está fuera del request: los PDFs se generan aquí mismo
+    app.config['PDF_WORKERS'] = 0
+    with app.app_context():
+        db.engine.dispose(close=False)  # Conexiones propias en el proceso hijo
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        while True:
+            if not procesar_pendientes(worker):
+                time.sleep(intervalo)
+
+
+# ────────────────────────────────────────────────
+#                     Tareas
+# ────────────────────────────────────────────────
+
+@tarea('cotizacion_pdf')
+def _cotizacion_pdf(orden_id):
+    import generador_pdf
+    orden = db.session.get(OrdenTrabajo, orden_id)
+    if orden is None:
+        raise ValueError(f'La orden {orden_id} no existe')
+    _, ruta = generador_pdf.pdf_cotizacion(orden)
+    return ruta, f'cotizacion_{orden.id}.pdf', 'application/pdf'
+
+
+@tarea('sugerir_compras')
+def _sugerir_compras(semanas=None, cobertura=None, nivel_servicio=None):
+    import reabasto
+    opciones = {'semanas': semanas, 'cobertura': cobertura, 'nivel_servicio': nivel_servicio}
+    # ejecutar() hace el commit junto con el estado del trabajo
+    reabasto.sugerir(**{nombre: valor for nombre, valor in opciones.items() if valor is not None})
+
+
+# ────────────────────────────────────────────────
+#                  Comandos CLI
+# ────────────────────────────────────────────────
+
+cli = AppGroup('trabajos', help='Cola de trabajos en segundo plano.')
+
+
+@cli.command('worker')
+@click.option('--concurrencia', default=2, show_default=True, help='Procesos que ejecutan trabajos a la vez.')
+@click.option('--intervalo', default=1.0, show_default=True, help='Segundos de espera cuando la cola está vacía.')
+@click.option('--una-vez', is_flag=True, help='Vacía la cola en este proceso y termina.')
+def worker_comando(concurrencia, intervalo, una_vez):
+    """Levanta los workers que ejecutan la cola."""
+    if una_vez:
+        click.echo(f'{procesar_pendientes()} trabajos ejecutados')
+        return
+
+    app = current_app._get_current_object()
+    db.engine.dispose()
+    contexto = multiprocessing.get_context('fork')
+    procesos = [contexto.Process(target=_bucle, args=(app, intervalo)) for _ in range(concurrencia)]
+    for proceso in procesos:
+        proceso.start()
+    click.echo(f'{concurrencia} workers escuchando la cola (Ctrl+C para terminar)')
+    try:
+        for proceso in procesos:
+            proceso.join()
+    except KeyboardInterrupt:
+        for proceso in procesos:
+            proceso.terminate()
+
+
+@cli.command('estado')
+def estado_comando():
+    """Cuenta de trabajos por estado."""
+    for estado, cantidad in db.session.query(Trabajo.estado, db.func.count(Trabajo.id)).group_by(Trabajo.estado):
+        click.echo(f'{estado}: {cantidad}')
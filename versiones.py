@@ -0,0 +1,179 @@
+# versiones.py
+# Contadores de versión por tabla y caché HTTP condicional (ETag / 304).
+#
+# Cada commit que escribe en una tabla incrementa su fila en `versiones_tabla`
+# dentro de la misma transacción. Se detectan los INSERT/UPDATE/DELETE que
+# pasan por el engine (flush del ORM, session.execute con UPDATE directo,
+# executemany de importacion.py), así que no depende de que cada vista se
+# acuerde de invalidar nada.
+#
+# El decorador `cache_http(*tablas)` arma el ETag con las versiones de las
+# tablas que pinta la vista; si el navegador ya tiene esa versión responde
+# 304 con una sola consulta por llave primaria, sin correr la vista ni la
+# plantilla.
+import hashlib
+import os
+from datetime import date, datetime, time
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import event, select, update, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+from extensions import db
+from models import VersionTabla
+
+# Tablas que no se versionan (la propia de versiones y las que cambian solas)
+_IGNORADAS = {VersionTabla.__tablename__, 'trabajos', 'folio_contador', 'eventos_tablero'}
+
+
+def _sal_plantillas():
+    # Un despliegue con plantillas o estáticos nuevos no debe responder 304
+    raiz = os.path.dirname(os.path.abspath(__file__))
+    ultima = 0
+    for carpeta in ('templates', 'static'):
+        for directorio, _, archivos in os.walk(os.path.join(raiz, carpeta)):
+            for nombre in archivos:
+                ultima = max(ultima, os.path.getmtime(os.path.join(directorio, nombre)))
+    return ultima
+
+
+_SAL_FECHA = datetime.utcfromtimestamp(_sal_plantillas())
+_SAL = _SAL_FECHA.isoformat()
+
+
+# ────────────────────────────────────────────────
+#        Registro de escrituras por conexión
+# ────────────────────────────────────────────────
+
+@event.listens_for(Engine, 'before_execute')
+def _registrar_escritura(conn, clauseelement, multiparams, params, execution_options):
+    if isinstance(clauseelement, UpdateBase):
+        tabla = clauseelement.table.name
+        if tabla not in _IGNORADAS:
+            conn.info.setdefault('tablas_modificadas', set()).add(tabla)
+
+
+@event.listens_for(Engine, 'rollback')
+def _descartar_escrituras(conn):
+    conn.info.pop('tablas_modificadas', None)
+
+
+@event.listens_for(Engine, 'commit')
+def _limpiar_escrituras(conn):
+    # Transacciones fuera de la sesión (db.engine.begin()) no versionan
+    conn.info.pop('tablas_modificadas', None)
+
+
+@event.listens_for(Session, 'before_commit')
+def _incrementar_versiones(session):
+    session.flush()  # Lo pendiente también cuenta
+    if not session.in_transaction():
+        return
+    conn = session.connection()
+    tablas = conn.info.pop('tablas_modificadas', None)
+    if tablas:
+        incrementar(*tablas, conn=conn)
+
+
+def _upsert(tabla_versiones, valores):
+    """INSERT ... ON CONFLICT (tabla) DO UPDATE version = version + 1, o None si el dialecto no lo tiene."""
+    dialecto = db.engine.dialect.name
+    if dialecto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as insert_dialecto
+    elif dialecto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as insert_dialecto
+    else:
+        return None
+    return insert_dialecto(tabla_versiones).values(valores).on_conflict_do_update(
+        index_elements=[tabla_versiones.c.tabla],
+        set_={'version': tabla_versiones.c.version + 1, 'actualizado': valores[0]['actualizado']},
+    )
+
+
+def incrementar(*tablas, conn=None):
+    """Sube la versión de `tablas` (en la transacción de `conn` o de la sesión)."""
+    conn = conn or db.session.connection()
+    ahora = datetime.utcnow()
+    tabla_versiones = VersionTabla.__table__
+    # Mismo orden en todos los workers: dos commits no se bloquean en cruz
+    valores = [{'tabla': tabla, 'version': 1, 'actualizado': ahora} for tabla in sorted(tablas)]
+    consulta = _upsert(tabla_versiones, valores)
+    if consulta is not None:
+        conn.execute(consulta)
+        return
+    for fila in valores:
+        cambiadas = conn.execute(
+            update(tabla_versiones)
+            .where(tabla_versiones.c.tabla == fila['tabla'])
+            .values(version=tabla_versiones.c.version + 1, actualizado=ahora)
+        ).rowcount
+        if not cambiadas:
+            conn.execute(insert(tabla_versiones).values(fila))
+
+
+def obtener(*tablas):
+    """{tabla: (version, actualizado)} de las tablas indicadas, en una consulta."""
+    filas = db.session.execute(
+        select(VersionTabla.tabla, VersionTabla.version, VersionTabla.actualizado)
+        .where(VersionTabla.tabla.in_(tablas))
+    )
+    versiones = {tabla: (0, None) for tabla in tablas}
+    versiones.update({tabla: (version, actualizado) for tabla, version, actualizado in filas})
+    return versiones
+
+
+# ────────────────────────────────────────────────
+#              Caché HTTP condicional
+# ────────────────────────────────────────────────
+
+def cache_http(*tablas, cache_control='private, no-cache'):
+    """
+    GET condicional para vistas que solo dependen de `tablas`.
+    El ETag incluye la URL completa (filtros, cursor), el usuario, el día
+    (contadores de "hoy"), la versión de plantillas y estáticos y los
+    mensajes flash pendientes.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            if request.method != 'GET' or not current_app.config.get('CACHE_HTTP', True):
+                return vista(*args, **kwargs)
+
+            versiones = obtener(*tablas)
+            usuario = current_user.get_id() if current_user.is_authenticated else ''
+            # Los flash pendientes también: un POST que falla sin escribir redirige aquí
+            # con su mensaje y la copia del navegador no lo tiene
+            mensajes = repr(session.get('_flashes', ()))
+            firma = '|'.join([request.full_path, usuario, date.today().isoformat(), _SAL, mensajes] +
+                             [f'{tabla}:{versiones[tabla][0]}' for tabla in sorted(versiones)])
+            etag = hashlib.sha1(firma.encode()).hexdigest()
+            # Last-Modified nunca es anterior al inicio del día ni al despliegue
+            fechas = [actualizado for _, actualizado in versiones.values() if actualizado]
+            fechas += [datetime.combine(date.today(), time.min), _SAL_FECHA]
+            ultima = max(fechas).replace(microsecond=0)
+
+            if request.if_none_match:
+                no_modificado = request.if_none_match.contains(etag)
+            elif session.get('_flashes'):
+                no_modificado = False  # Last-Modified no sabe de mensajes
+            else:
+                no_modificado = bool(request.if_modified_since and
+                                     ultima <= request.if_modified_since.replace(tzinfo=None))
+
+            if no_modificado:
+                respuesta = current_app.response_class(status=304)
+            else:
+                respuesta = make_response(vista(*args, **kwargs))
+                if respuesta.status_code != 200:
+                    return respuesta
+            respuesta.last_modified = ultima
+            respuesta.set_etag(etag)
+            respuesta.headers['Cache-Control'] = cache_control
+            respuesta.vary.add('Cookie')
+            return respuesta
+        return envoltura
+    return decorador